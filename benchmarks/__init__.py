@@ -0,0 +1,7 @@
+"""
+离线基准测试
+用脚本化假模型（pydantic-ai FunctionModel）和桩 Playwright MCP Server 运行工作流和各 Agent，
+不需要 Anthropic API Key、npx、Chromium 或 Gemini 登录态
+
+用法见 benchmarks/__main__.py（python -m benchmarks --help）
+"""
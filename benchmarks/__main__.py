@@ -0,0 +1,188 @@
+"""
+基准测试 CLI
+每个场景在独立子进程中运行（峰值 RSS 按场景统计，互不影响），重复多次取中位数
+
+用法:
+    python -m benchmarks                                  # 全部场景
+    python -m benchmarks --scenario content --repeat 3
+    python -m benchmarks --llm-latency 0.5 --mcp-latency 0.2 --json bench.json
+    python -m benchmarks --baseline bench.json --tolerance 0.2   # 回归时退出码为 1
+    python -m benchmarks --scenario research --mcp-trace .cache/mcp_traces   # 回放录制的真实 MCP 流量
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+from .distributions import DISTRIBUTIONS, DIST_LOGNORMAL, LatencyProfile
+from .harness import REPO_ROOT, SCENARIOS
+
+# 取中位数的计时字段
+TIMING_FIELDS = ("wall_time", "loop_blocked", "loop_max_lag")
+
+# 与基线比较的字段及绝对容差（低于容差的变化视为噪声）
+COMPARE_FIELDS = {"wall_time": 0.05, "loop_blocked": 0.05, "peak_rss_mb": 5.0}
+
+# 子进程运行单个场景时的内部参数
+_CHILD_FLAG = "--run-one"
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    """命令行参数"""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="离线基准测试（假模型 + 桩 Playwright MCP Server）",
+    )
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                        help="运行的场景（可重复，默认全部）")
+    parser.add_argument("--repeat", type=int, default=1, help="每个场景的重复次数（计时取中位数）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="模型调用平均延迟（秒）")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="模型延迟抖动（uniform 为半宽，lognormal 为 sigma）")
+    parser.add_argument("--llm-distribution", choices=DISTRIBUTIONS, default=DIST_LOGNORMAL, help="模型延迟分布")
+    parser.add_argument("--invalid-rate", type=float, default=0.0, help="结构化输出返回非法参数的概率")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="模型调用返回 529 的概率")
+
+    parser.add_argument("--mcp-latency", type=float, default=0.0, help="MCP 工具调用平均延迟（秒）")
+    parser.add_argument("--mcp-jitter", type=float, default=0.0, help="MCP 延迟抖动")
+    parser.add_argument("--mcp-distribution", choices=DISTRIBUTIONS, default=DIST_LOGNORMAL, help="MCP 延迟分布")
+    parser.add_argument("--mcp-failure-rate", type=float, default=0.0, help="MCP 工具调用失败的概率")
+    parser.add_argument("--mcp-trace", metavar="DIR",
+                        help="回放录制的真实 MCP 流量（python -m src.main --mcp-trace record 生成）代替桩 Server")
+
+    parser.add_argument("--strategy", choices=["sequential", "parallel"], default="sequential", help="内容创作策略")
+    parser.add_argument("--no-pipeline", action="store_true", help="workflow 场景关闭阶段流水线")
+    parser.add_argument("--no-image", action="store_true", help="workflow 场景跳过配图")
+
+    parser.add_argument("--json", metavar="PATH", help="将结果写入 JSON（可作为之后的 --baseline）")
+    parser.add_argument("--baseline", metavar="PATH", help="与基线 JSON 比较，出现回归时退出码为 1")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="相对基线的允许增幅（默认 0.2 即 20%%）")
+    parser.add_argument(_CHILD_FLAG, dest="run_one", help=argparse.SUPPRESS)
+    return parser
+
+
+def _run_one(args: argparse.Namespace) -> None:
+    """子进程：运行单个场景，结果以 JSON 写到 stdout 最后一行"""
+    from .fake_model import FakeLLMConfig
+    from .harness import MCPConfig, run_benchmark
+
+    llm_config = FakeLLMConfig(
+        latency=LatencyProfile(args.llm_latency, args.llm_jitter, args.llm_distribution),
+        invalid_rate=args.invalid_rate,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    mcp_config = MCPConfig(
+        latency=LatencyProfile(args.mcp_latency, args.mcp_jitter, args.mcp_distribution),
+        failure_rate=args.mcp_failure_rate,
+        seed=args.seed,
+        trace_dir=Path(args.mcp_trace) if args.mcp_trace else None,
+    )
+    options = {"strategy": args.strategy, "pipeline": not args.no_pipeline, "image": not args.no_image}
+    result = asyncio.run(run_benchmark(args.run_one, llm_config, mcp_config, options))
+    print(json.dumps(result.to_dict(), ensure_ascii=False))
+
+
+def _spawn(scenario: str, argv: List[str]) -> Dict[str, Any]:
+    """在子进程中运行一次场景"""
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(REPO_ROOT), os.getenv("PYTHONPATH")]))}
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks", *argv, _CHILD_FLAG, scenario],
+        env=env, capture_output=True, text=True, encoding="utf-8",
+    )
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        raise RuntimeError(f"场景 {scenario} 运行失败（退出码 {proc.returncode}）:\n{proc.stderr[-2000:]}")
+    return json.loads(lines[-1])
+
+
+def _aggregate(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """多次运行合并：计时取中位数，RSS 取最大值，计数取首次"""
+    result = dict(runs[0])
+    for key in TIMING_FIELDS:
+        result[key] = round(statistics.median(run[key] for run in runs), 3)
+    for key in ("peak_rss_mb", "peak_rss_children_mb"):
+        result[key] = max(run[key] for run in runs)
+    result["repeat"] = len(runs)
+    result["errors"] = [run["error"] for run in runs if run["error"]]
+    return result
+
+
+def _print_result(result: Dict[str, Any]) -> None:
+    """打印单个场景的结果"""
+    print(f"\n📊 {result['scenario']}（{result['repeat']} 次）")
+    print(
+        f"   墙钟 {result['wall_time']:.3f}s | 事件循环阻塞 {result['loop_blocked']:.3f}s"
+        f"（{result['loop_stalls']} 次卡顿，最大 {result['loop_max_lag'] * 1000:.0f}ms）"
+    )
+    print(f"   峰值 RSS {result['peak_rss_mb']:.1f}MB（子进程 {result['peak_rss_children_mb']:.1f}MB）")
+    phases = " ".join(f"{k}={v}" for k, v in sorted(result["model_calls_by_phase"].items()))
+    print(f"   模型调用 {sum(result['model_calls'].values())}（{phases}）失败 {sum(result['model_failures'].values())}")
+    print(f"   MCP 调用 {sum(result['mcp_calls'].values())}（失败 {result['mcp_failures']}）")
+    for error in result["errors"]:
+        print(f"   ❌ {error}")
+
+
+def _compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """
+    与基线比较
+
+    Returns:
+        回归描述列表（为空表示无回归）
+    """
+    regressions = []
+    for scenario, result in results.items():
+        base = baseline.get(scenario)
+        if base is None:
+            continue
+        for key, floor in COMPARE_FIELDS.items():
+            old, new = base[key], result[key]
+            if new > old * (1 + tolerance) and new - old > floor:
+                regressions.append(f"{scenario}.{key}: {old} → {new}（+{(new - old) / old if old else 1:.0%}）")
+        old_calls, new_calls = sum(base["model_calls"].values()), sum(result["model_calls"].values())
+        if new_calls > old_calls:
+            regressions.append(f"{scenario}.model_calls: {old_calls} → {new_calls}")
+    return regressions
+
+
+def main() -> None:
+    """CLI 入口"""
+    parser = _build_parser()
+    args, _ = parser.parse_known_args()
+    if args.run_one:
+        _run_one(args)
+        return
+
+    argv = [arg for arg in sys.argv[1:]]
+    results: Dict[str, Dict[str, Any]] = {}
+    for scenario in args.scenario or SCENARIOS:
+        runs = [_spawn(scenario, argv) for _ in range(max(args.repeat, 1))]
+        results[scenario] = _aggregate(runs)
+        _print_result(results[scenario])
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n💾 结果已保存: {args.json}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = _compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ 相对基线出现回归（容差 {args.tolerance:.0%}）:")
+            for line in regressions:
+                print(f"   - {line}")
+            sys.exit(1)
+        print(f"\n✅ 无回归（容差 {args.tolerance:.0%}）")
+
+    if any(result["errors"] for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+产物写入吞吐
+用 posts/ 中的研究结果放大出不同大小的产物，在事件循环中连续写入，比较：
+
+- legacy：model_dump + json.dump 同步写入（原 save_json，无刷盘、非原子）
+- save_json：pydantic-core 序列化 + 原子替换 + 刷盘（同步）
+- writer：ArtifactWriter.write 逐个等待（线程池写入）
+- writer_submit：ArtifactWriter.submit 全部提交后 flush
+- writer_gzip：ArtifactWriter.write(compress=True)
+
+报告墙钟时间、吞吐和写入期间事件循环的最大延迟（同步写入会直接阻塞事件循环）
+
+用法:
+    python -m benchmarks.artifacts
+    python -m benchmarks.artifacts --scale 1 --scale 100 --count 20 --no-fsync
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+from src.models.schemas import ResearchResult
+from src.utils.artifact_writer import ArtifactWriter
+from src.utils.file_ops import load_model, save_json
+
+from .harness import EventLoopMonitor
+
+# 采样间隔和卡顿阈值比工作流基准更细（单次写入通常只有几毫秒）
+SAMPLE_INTERVAL = 0.001
+STALL_THRESHOLD = 0.005
+
+
+def _sample_research(posts_dir: Path, scale: int) -> ResearchResult:
+    """合并 posts/ 下所有研究结果，实体和案例重复 scale 次"""
+    runs = [load_model(path, ResearchResult) for path in sorted(posts_dir.glob("*/research.json"))]
+    if not runs:
+        raise SystemExit(f"{posts_dir} 下没有 research.json")
+    return ResearchResult(
+        summary="\n".join(r.summary for r in runs),
+        entities=[e for _ in range(scale) for r in runs for e in r.entities],
+        cases=[c for _ in range(scale) for r in runs for c in r.cases],
+        keywords=sorted({k for r in runs for k in r.keywords}),
+        data_points=sum(r.data_points for r in runs) * scale,
+        note_ids=[n for r in runs for n in r.note_ids],
+    )
+
+
+def _legacy_save(path: Path, research: ResearchResult) -> None:
+    """原 save_json：先转字典，再同步 json.dump"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(research.model_dump(), f, ensure_ascii=False, indent=2)
+
+
+async def _measure(name: str, count: int, run: Callable[[int], Awaitable[Any]]) -> Dict[str, Any]:
+    """写入 count 次并采样事件循环延迟"""
+    async with EventLoopMonitor(SAMPLE_INTERVAL, STALL_THRESHOLD) as monitor:
+        # 让采样任务先启动
+        await asyncio.sleep(SAMPLE_INTERVAL * 2)
+        start = time.perf_counter()
+        await run(count)
+        wall = time.perf_counter() - start
+        # 让采样任务记录同步写入造成的延迟后再退出
+        await asyncio.sleep(SAMPLE_INTERVAL * 2)
+    return {
+        "mode": name,
+        "wall_time": round(wall, 4),
+        "loop_max_lag": round(monitor.max_lag, 4),
+        "loop_blocked": round(monitor.blocked, 4),
+    }
+
+
+async def run(posts_dir: Path, scales: List[int], count: int, fsync: bool) -> List[Dict[str, Any]]:
+    """
+    运行全部模式
+
+    Args:
+        posts_dir: 语料目录
+        scales: 产物放大倍数
+        count: 每种模式写入次数
+        fsync: save_json / ArtifactWriter 是否刷盘
+
+    Returns:
+        每个（倍数, 模式）的结果
+    """
+    results = []
+    for scale in scales:
+        research = _sample_research(posts_dir, scale)
+        size = len(research.model_dump_json(indent=2).encode())
+
+        with tempfile.TemporaryDirectory(prefix="xhs-artifacts-") as workdir:
+            root = Path(workdir)
+            writer = ArtifactWriter(compress_over=0, fsync=fsync)
+
+            async def legacy(n: int) -> None:
+                for i in range(n):
+                    _legacy_save(root / "legacy" / f"{i}.json", research)
+
+            async def sync_atomic(n: int) -> None:
+                for i in range(n):
+                    save_json(root / "save_json" / f"{i}.json", research)
+
+            async def awaited(n: int) -> None:
+                for i in range(n):
+                    await writer.write(root / "writer" / f"{i}.json", research)
+
+            async def submitted(n: int) -> None:
+                for i in range(n):
+                    writer.submit(root / "writer_submit" / f"{i}.json", research)
+                await writer.flush()
+
+            async def gzipped(n: int) -> None:
+                for i in range(n):
+                    await writer.write(root / "writer_gzip" / f"{i}.json", research, compress=True)
+
+            modes = {
+                "legacy": legacy, "save_json": sync_atomic, "writer": awaited,
+                "writer_submit": submitted, "writer_gzip": gzipped,
+            }
+            for name, mode in modes.items():
+                result = await _measure(name, count, mode)
+                stored = sum(p.stat().st_size for p in (root / name).iterdir())
+                result.update({
+                    "scale": scale,
+                    "artifact_bytes": size,
+                    "stored_bytes": stored // count,
+                    "mb_per_second": round(size * count / result["wall_time"] / 1e6, 1),
+                })
+                results.append(result)
+
+            # 原子写入的产物可以直接读回，且与原路径输出的 JSON 一致
+            assert load_model(root / "writer" / "0.json", ResearchResult) == research
+            assert load_model(root / "writer_gzip" / "0.json", ResearchResult) == research
+            assert (root / "save_json" / "0.json").read_bytes() == (root / "legacy" / "0.json").read_bytes()
+    return results
+
+
+def main() -> None:
+    """CLI 入口"""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.artifacts",
+        description="产物写入吞吐与事件循环阻塞（原 save_json 对比 ArtifactWriter）",
+    )
+    parser.add_argument("--posts-dir", type=Path, default=Path("posts"), help="语料目录（默认 posts）")
+    parser.add_argument("--scale", type=int, action="append",
+                        help="产物放大倍数（可重复，默认 1 和 100）")
+    parser.add_argument("--count", type=int, default=20, help="每种模式写入次数（默认 20）")
+    parser.add_argument("--no-fsync", action="store_true", help="save_json / ArtifactWriter 不刷盘")
+    parser.add_argument("--json", metavar="PATH", help="将结果写入 JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.posts_dir, args.scale or [1, 100], args.count, not args.no_fsync))
+
+    print(f"{'倍数':>4} {'模式':<14} {'产物':>9} {'落盘':>9} {'墙钟':>8} {'MB/秒':>7} {'最大延迟':>9} {'阻塞':>8}")
+    for r in results:
+        print(
+            f"{r['scale']:>6} {r['mode']:<14} {r['artifact_bytes'] / 1024:>7.0f}KB {r['stored_bytes'] / 1024:>7.0f}KB "
+            f"{r['wall_time']:>7.3f}s {r['mb_per_second']:>7.1f} {r['loop_max_lag'] * 1000:>7.1f}ms "
+            f"{r['loop_blocked']:>7.3f}s"
+        )
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n💾 已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+延迟分布
+假模型和桩 MCP Server 共用（不依赖项目代码，桩 Server 子进程启动时只导入本模块）
+"""
+import math
+import random
+from dataclasses import dataclass
+
+# 分布类型
+DIST_FIXED = "fixed"
+DIST_UNIFORM = "uniform"
+DIST_LOGNORMAL = "lognormal"
+DISTRIBUTIONS = (DIST_FIXED, DIST_UNIFORM, DIST_LOGNORMAL)
+
+
+@dataclass
+class LatencyProfile:
+    """延迟分布"""
+
+    mean: float = 0.0
+    jitter: float = 0.0
+    distribution: str = DIST_LOGNORMAL
+
+    def sample(self, rng: random.Random) -> float:
+        """
+        采样一次延迟（秒）
+
+        Args:
+            rng: 随机数生成器
+
+        Returns:
+            延迟（不小于 0）
+        """
+        if self.mean <= 0:
+            return 0.0
+        if self.distribution == DIST_FIXED or self.jitter <= 0:
+            return self.mean
+        if self.distribution == DIST_UNIFORM:
+            return max(0.0, rng.uniform(self.mean - self.jitter, self.mean + self.jitter))
+        # 对数正态：均值为 mean、标准差约为 jitter 的长尾分布
+        sigma = math.sqrt(math.log1p((self.jitter / self.mean) ** 2))
+        mu = math.log(self.mean) - sigma * sigma / 2
+        return rng.lognormvariate(mu, sigma)
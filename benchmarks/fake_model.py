@@ -0,0 +1,216 @@
+"""
+脚本化假模型
+基于 pydantic-ai 的 FunctionModel，按系统提示词识别 Agent 角色并返回脚本化输出：
+
+- research.generator：先调用浏览器宏（search_notes → open_note_with_comments），再输出研究结果
+- image.gemini_operator：依次调用 Playwright 工具（navigate → type → 点击下载），再返回 SUCCESS
+- 审核角色：按对话中已有的审核轮次取评分脚本（如 62 → 78），产生真实的 Reflexion 轮次
+- 其余角色直接返回固定数据
+
+延迟和失败按配置的分布随机采样（固定随机种子，结果可复现），并按角色统计调用次数
+"""
+import asyncio
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from pydantic_ai.exceptions import ModelHTTPError
+from pydantic_ai.messages import (
+    ModelMessage, ModelRequest, ModelResponse, SystemPromptPart, TextPart, ToolCallPart,
+    ToolReturnPart, UserPromptPart
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from prompts import get_prompt_field, get_system_prompt
+
+from . import fixtures
+from .distributions import LatencyProfile
+from .stub_mcp_server import DOWNLOAD_REF
+
+# 研究 Agent 每轮打开的笔记数
+NOTES_PER_ROUND = 2
+
+
+@dataclass
+class FakeLLMConfig:
+    """假模型配置"""
+
+    latency: LatencyProfile = field(default_factory=LatencyProfile)
+    invalid_rate: float = 0.0  # 结构化输出返回非法参数（触发 Agent 内部的输出重试）
+    error_rate: float = 0.0  # 抛出 529 错误（触发方法层 with_retry）
+    research_scores: Sequence[float] = (62.0, 80.0)
+    content_scores: Sequence[float] = (64.0, 82.0)
+    entities: int = fixtures.DEFAULT_ENTITIES
+    cases: int = fixtures.DEFAULT_CASES
+    seed: int = 0
+
+
+def _role_prompts() -> Dict[str, str]:
+    """系统提示词 → 角色名"""
+    return {
+        get_system_prompt("research"): "research.generator",
+        get_system_prompt("research_review"): "research.reviewer",
+        get_system_prompt("content"): "content.generator",
+        get_system_prompt("content_review"): "content.reviewer",
+        get_system_prompt("image"): "image.prompt_generator",
+        get_prompt_field("image", "gemini_operator_prompt"): "image.gemini_operator",
+        get_system_prompt("image_review"): "image.visual_reviewer",
+    }
+
+
+def _current_turn(messages: List[ModelMessage]) -> List[ModelMessage]:
+    """
+    本轮对话：最后一条用户提示词之后的消息
+
+    不含用户提示词所在的请求（该请求可能合并了上一次运行的输出工具返回）
+    """
+    for index in range(len(messages) - 1, -1, -1):
+        message = messages[index]
+        if isinstance(message, ModelRequest) and any(isinstance(p, UserPromptPart) for p in message.parts):
+            return messages[index + 1:]
+    return messages
+
+
+def _tool_returns(messages: List[ModelMessage]) -> List[ToolReturnPart]:
+    """消息中的工具返回"""
+    return [
+        part for message in messages if isinstance(message, ModelRequest)
+        for part in message.parts if isinstance(part, ToolReturnPart)
+    ]
+
+
+class FakeLLM:
+    """按角色脚本化输出的假模型"""
+
+    def __init__(self, config: Optional[FakeLLMConfig] = None):
+        """
+        初始化假模型
+
+        Args:
+            config: 延迟、失败和评分脚本配置
+        """
+        self.config = config or FakeLLMConfig()
+        self.rng = random.Random(self.config.seed)
+        self.calls: Counter = Counter()
+        self.failures: Counter = Counter()
+        self.latency: Counter = Counter()
+        self._roles = _role_prompts()
+
+    def model(self, model_name: str = "fake") -> FunctionModel:
+        """
+        创建 FunctionModel（可按分层创建多个，统计共用）
+
+        Args:
+            model_name: 模型名（出现在路由统计中）
+
+        Returns:
+            FunctionModel
+        """
+        return FunctionModel(self._respond, model_name=f"fake:{model_name}")
+
+    def role_of(self, messages: List[ModelMessage]) -> str:
+        """按系统提示词识别角色"""
+        for message in messages:
+            if isinstance(message, ModelRequest):
+                for part in message.parts:
+                    if isinstance(part, SystemPromptPart):
+                        return self._roles.get(part.content, "unknown")
+        return "unknown"
+
+    def calls_by_phase(self) -> Dict[str, int]:
+        """按阶段（角色前缀）汇总的调用次数"""
+        phases: Counter = Counter()
+        for role, count in self.calls.items():
+            phases[role.split(".")[0]] += count
+        return dict(phases)
+
+    async def _respond(self, messages: List[ModelMessage], info: AgentInfo) -> ModelResponse:
+        """FunctionModel 回调：模拟延迟和失败，并按角色返回脚本化输出"""
+        role = self.role_of(messages)
+        self.calls[role] += 1
+
+        delay = self.config.latency.sample(self.rng)
+        self.latency[role] += delay
+        if delay:
+            await asyncio.sleep(delay)
+
+        if self.config.error_rate and self.rng.random() < self.config.error_rate:
+            self.failures[role] += 1
+            raise ModelHTTPError(status_code=529, model_name="fake", body="overloaded")
+
+        output_tool = info.output_tools[0].name if info.output_tools else None
+        if output_tool and self.config.invalid_rate and self.rng.random() < self.config.invalid_rate:
+            self.failures[role] += 1
+            return ModelResponse(parts=[ToolCallPart(output_tool, {})])
+
+        handler = getattr(self, f"_{role.replace('.', '_')}", None)
+        if handler is None:
+            return ModelResponse(parts=[TextPart("OK")])
+        return handler(messages, output_tool)
+
+    @staticmethod
+    def _output(output_tool: Optional[str], value: Any) -> ModelResponse:
+        """结构化输出（输出工具调用）"""
+        return ModelResponse(parts=[ToolCallPart(output_tool, value.model_dump(mode="json"))])
+
+    @staticmethod
+    def _review_round(messages: List[ModelMessage]) -> int:
+        """审核对话中已完成的轮次（增量审核在同一段对话中进行）"""
+        return sum(
+            1 for message in messages if isinstance(message, ModelResponse)
+            and any(isinstance(p, ToolCallPart) for p in message.parts)
+        )
+
+    def _scored_review(self, messages: List[ModelMessage], output_tool: Optional[str], scores: Sequence[float]):
+        """按评分脚本返回审核结果"""
+        round_no = self._review_round(messages)
+        score = scores[min(round_no, len(scores) - 1)]
+        return self._output(output_tool, fixtures.review_result(score, round_no))
+
+    def _research_generator(self, messages: List[ModelMessage], output_tool: Optional[str]) -> ModelResponse:
+        """搜索 → 打开笔记 → 输出研究结果"""
+        returned = len(_tool_returns(_current_turn(messages)))
+        if returned == 0:
+            return ModelResponse(parts=[ToolCallPart("search_notes", {"query": "西安 公司 避坑", "limit": 5})])
+        if returned <= NOTES_PER_ROUND:
+            url = f"https://www.xiaohongshu.com/explore/bench{returned:04d}"
+            return ModelResponse(parts=[ToolCallPart("open_note_with_comments", {"url": url, "max_comments": 20})])
+        return self._output(output_tool, fixtures.research_result(self.config.entities, self.config.cases))
+
+    def _research_reviewer(self, messages: List[ModelMessage], output_tool: Optional[str]) -> ModelResponse:
+        """研究审核"""
+        return self._scored_review(messages, output_tool, self.config.research_scores)
+
+    def _content_generator(self, messages: List[ModelMessage], output_tool: Optional[str]) -> ModelResponse:
+        """内容创作（修订轮次的内容略有变化）"""
+        revision = sum(1 for m in messages if isinstance(m, ModelResponse))
+        return self._output(output_tool, fixtures.content(self.config.entities, revision))
+
+    def _content_reviewer(self, messages: List[ModelMessage], output_tool: Optional[str]) -> ModelResponse:
+        """内容审核"""
+        return self._scored_review(messages, output_tool, self.config.content_scores)
+
+    def _image_prompt_generator(self, messages: List[ModelMessage], output_tool: Optional[str]) -> ModelResponse:
+        """配图描述"""
+        return ModelResponse(parts=[TextPart(
+            "小红书风格竖版海报，米白色背景，顶部大号黑体中文标题，下方分条列出公司名称和问题，"
+            "每条左侧配红色警示图标，整体简洁清爽"
+        )])
+
+    def _image_gemini_operator(self, messages: List[ModelMessage], output_tool: Optional[str]) -> ModelResponse:
+        """打开 Gemini → 输入提示词 → 点击下载 → 返回 SUCCESS"""
+        steps = [
+            ("playwright_browser_navigate", {"url": "https://gemini.google.com/app"}),
+            ("playwright_browser_type", {"element": "输入框", "ref": "prompt", "text": "图片描述", "submit": True}),
+            ("playwright_browser_click", {"element": "下载图片", "ref": DOWNLOAD_REF}),
+        ]
+        returned = len(_tool_returns(_current_turn(messages)))
+        if returned < len(steps):
+            name, args = steps[returned]
+            return ModelResponse(parts=[ToolCallPart(name, args)])
+        return ModelResponse(parts=[TextPart("SUCCESS: 图片已下载")])
+
+    def _image_visual_reviewer(self, messages: List[ModelMessage], output_tool: Optional[str]) -> ModelResponse:
+        """图片审核"""
+        return self._output(output_tool, fixtures.image_review_result(["cover", "detail_1", "detail_2"]))
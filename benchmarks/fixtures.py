@@ -0,0 +1,120 @@
+"""
+基准测试数据
+假模型返回的研究结果 / 内容 / 审核结果，数量和格式满足规则预审，
+审核结果只由评分脚本决定，不会因为数据本身被规则预审拦截
+"""
+from typing import Any, Dict, List
+
+from src.models.schemas import ImageReviewResult, ResearchResult, ReviewIssue, ReviewResult, XHSContent
+
+# 默认规模（与 precheck 的研究数量目标一致并略有富余）
+DEFAULT_ENTITIES = 18
+DEFAULT_CASES = 10
+
+# 通过线（与 precheck.PASS_SCORE 一致）
+PASS_SCORE = 70
+
+_ISSUES = ("试用期不交社保", "长期单休", "加班无加班费", "拖欠工资", "口头承诺不兑现", "频繁裁员")
+
+
+def entity_name(index: int) -> str:
+    """第 index 个实体的名称"""
+    return f"西安示例科技{index:02d}"
+
+
+def research_result(entities: int = DEFAULT_ENTITIES, cases: int = DEFAULT_CASES) -> ResearchResult:
+    """
+    构建研究结果
+
+    Args:
+        entities: 实体数量
+        cases: 案例数量
+
+    Returns:
+        ResearchResult
+    """
+    entity_rows: List[Dict[str, Any]] = [
+        {
+            "type": "company",
+            "name": entity_name(i),
+            "issue": _ISSUES[i % len(_ISSUES)],
+            "source": "评论区" if i % 3 == 0 else "正文",
+        }
+        for i in range(1, entities + 1)
+    ]
+    case_rows: List[Dict[str, Any]] = [
+        {
+            "company": entity_name(i % entities + 1),
+            "experience": f"入职第{i}个月发现{_ISSUES[i % len(_ISSUES)]}，多次沟通无果后离职",
+            "source": "评论区" if i % 2 else "正文",
+        }
+        for i in range(1, cases + 1)
+    ]
+    return ResearchResult(
+        summary=f"收集了 {entities} 家西安公司的求职避坑信息和 {cases} 个真实案例，主要问题集中在社保和加班",
+        entities=entity_rows,
+        cases=case_rows,
+        keywords=["西安", "求职", "避坑", "社保", "加班"],
+        credibility="high",
+        data_points=entities + cases,
+        note_ids=[f"bench{i:04d}" for i in range(1, 6)],
+    )
+
+
+def content(entities: int = DEFAULT_ENTITIES, revision: int = 0) -> XHSContent:
+    """
+    构建小红书内容（列出全部实体，标题数量与条目数一致）
+
+    Args:
+        entities: 列出的实体数量
+        revision: 修订轮次（体现在行动号召和最后一条的措辞上，便于产生差异）
+
+    Returns:
+        XHSContent
+    """
+    lines = [f"{i}. {entity_name(i)}：{_ISSUES[i % len(_ISSUES)]}" for i in range(1, entities + 1)]
+    if revision:
+        lines[-1] += f"（第{revision}次核实）"
+    return XHSContent(
+        title=f"西安{entities}家公司求职避坑清单合集",
+        body="整理了评论区和笔记里提到最多的公司：\n" + "\n".join(lines) + "\n\n面试前一定要多打听！",
+        hashtags=["西安求职", "避坑指南", "职场"],
+        call_to_action="收藏起来，面试前对照看看" if not revision else f"收藏备用，第{revision}版已更新",
+    )
+
+
+def review_result(score: float, round_no: int) -> ReviewResult:
+    """
+    构建审核结果（未通过时带一个 warning 问题，描述随轮次变化）
+
+    Args:
+        score: 评分
+        round_no: 审核轮次（从 0 开始）
+
+    Returns:
+        ReviewResult
+    """
+    passed = score >= PASS_SCORE
+    issues = [] if passed else [ReviewIssue(
+        type="data_missing",
+        severity="warning",
+        description=f"第{round_no + 1}轮：部分案例缺少具体时间",
+        suggestion="补充案例发生的时间",
+    )]
+    return ReviewResult(
+        passed=passed,
+        score=score,
+        issues=issues,
+        summary="审核通过" if passed else "存在可改进的问题",
+    )
+
+
+def image_review_result(image_types: List[str]) -> ImageReviewResult:
+    """构建通过的图片审核结果"""
+    return ImageReviewResult(
+        passed=True,
+        score=88,
+        issues=[],
+        summary="图片风格统一，文字清晰",
+        file_check={image_type: True for image_type in image_types},
+    )
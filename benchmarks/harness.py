@@ -0,0 +1,322 @@
+"""
+基准测试运行器
+在临时工作目录中用假模型和桩 MCP Server 运行工作流或单个 Agent，并采集：
+
+- 墙钟时间
+- 事件循环阻塞：按固定间隔 sleep 采样调度延迟，累计超出阈值的部分
+- 峰值 RSS（本进程和子进程，即桩 MCP Server）
+- 各阶段 / 角色的模型调用次数和失败次数，各 MCP 工具的调用次数
+
+模型和 MCP Server 通过替换模块属性接入（src.utils.model_router.get_anthropic_model、
+各 Agent 模块中的 create_mcp_server），业务代码无需任何改动；指定录制目录时改为回放
+真实运行录制的 MCP 流量（src/utils/mcp_trace.py），页面数据与生产一致
+"""
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from unittest import mock
+
+from .distributions import DIST_LOGNORMAL, LatencyProfile
+from .fake_model import FakeLLM, FakeLLMConfig
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 可运行的场景
+SCENARIO_WORKFLOW = "workflow"
+SCENARIO_RESEARCH = "research"
+SCENARIO_CONTENT = "content"
+SCENARIO_IMAGE = "image"
+SCENARIOS = (SCENARIO_WORKFLOW, SCENARIO_RESEARCH, SCENARIO_CONTENT, SCENARIO_IMAGE)
+
+# 事件循环采样间隔和阻塞阈值（秒）
+LOOP_SAMPLE_INTERVAL = 0.01
+LOOP_BLOCK_THRESHOLD = 0.05
+
+# 仓库根目录（桩 MCP Server 子进程的 PYTHONPATH）
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+@dataclass
+class MCPConfig:
+    """桩 MCP Server 配置"""
+
+    latency: LatencyProfile = field(default_factory=lambda: LatencyProfile(0.0, 0.0, DIST_LOGNORMAL))
+    failure_rate: float = 0.0
+    snapshot_chars: int = 20000
+    seed: int = 0
+    trace_dir: Optional[Path] = None  # 回放录制的真实 MCP 流量（src/utils/mcp_trace.py），代替桩 Server
+
+
+@dataclass
+class BenchmarkResult:
+    """单次场景运行的测量结果"""
+
+    scenario: str
+    wall_time: float
+    loop_blocked: float
+    loop_max_lag: float
+    loop_stalls: int
+    peak_rss_mb: float
+    peak_rss_children_mb: float
+    model_calls: Dict[str, int]
+    model_calls_by_phase: Dict[str, int]
+    model_failures: Dict[str, int]
+    mcp_calls: Dict[str, int]
+    mcp_failures: int
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化字典"""
+        data = asdict(self)
+        for key in ("wall_time", "loop_blocked", "loop_max_lag", "peak_rss_mb", "peak_rss_children_mb"):
+            data[key] = round(data[key], 3)
+        return data
+
+
+class EventLoopMonitor:
+    """事件循环阻塞采样（sleep 实际耗时超出预期的部分即为调度延迟）"""
+
+    def __init__(self, interval: float = LOOP_SAMPLE_INTERVAL, threshold: float = LOOP_BLOCK_THRESHOLD):
+        """
+        初始化
+
+        Args:
+            interval: 采样间隔（秒）
+            threshold: 单次延迟超过此值计为一次卡顿
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.blocked = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _sample(self) -> None:
+        """持续采样"""
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - start - self.interval
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                self.stalls += 1
+                self.blocked += lag
+
+    async def __aenter__(self) -> "EventLoopMonitor":
+        self._task = asyncio.create_task(self._sample())
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+
+
+def _peak_rss_mb(who: int) -> float:
+    """峰值 RSS（MB，Linux 单位为 KB，macOS 为字节）"""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _stub_server_factory(config: MCPConfig, log_path: Path):
+    """
+    替换 Agent 模块中 create_mcp_server 的工厂：保留工具前缀等参数，改为启动桩 Server
+
+    Args:
+        config: 桩 Server 配置
+        log_path: 调用日志路径
+    """
+    from pydantic_ai.mcp import MCPServerStdio
+
+    def factory(label: str, command: str, args: List[str], env: Optional[Dict[str, str]] = None, **kwargs: Any):
+        output_dir = args[args.index("--output-dir") + 1] if "--output-dir" in args else "./output/playwright-downloads"
+        stub_env = {
+            "PYTHONPATH": str(REPO_ROOT),
+            "PYTHONWARNINGS": "ignore",
+            "BENCH_MCP_LABEL": label,
+            "BENCH_MCP_LOG": str(log_path),
+            "BENCH_MCP_LATENCY": str(config.latency.mean),
+            "BENCH_MCP_JITTER": str(config.latency.jitter),
+            "BENCH_MCP_DISTRIBUTION": config.latency.distribution,
+            "BENCH_MCP_FAILURE_RATE": str(config.failure_rate),
+            "BENCH_MCP_SNAPSHOT_CHARS": str(config.snapshot_chars),
+            "BENCH_MCP_SEED": str(config.seed),
+        }
+        return MCPServerStdio(
+            sys.executable, ["-m", "benchmarks.stub_mcp_server", "--output-dir", output_dir],
+            env=stub_env, **kwargs
+        )
+
+    return factory
+
+
+def _read_mcp_log(log_path: Path) -> List[Dict[str, Any]]:
+    """读取 MCP 调用日志"""
+    if not log_path.exists():
+        return []
+    return [json.loads(line) for line in log_path.read_text(encoding="utf-8").splitlines() if line]
+
+
+def _replayed_calls() -> List[Dict[str, Any]]:
+    """回放模式下的 MCP 调用（与调用日志同格式，未命中计为失败）"""
+    from src.utils.mcp_trace import get_mcp_trace
+
+    config = get_mcp_trace()
+    entries = []
+    for label, matcher in (config.matchers.items() if config else ()):
+        stats = matcher.stats
+        entries += [{"label": label, "tool": "replay_exact", "ok": True}] * stats.exact
+        entries += [{"label": label, "tool": "replay_fallback", "ok": True}] * stats.fallback
+        entries += [{"label": label, "tool": "replay_miss", "ok": False}] * stats.misses
+    return entries
+
+
+async def _run_scenario(scenario: str, llm: FakeLLM, options: Dict[str, Any], trace_dir: Optional[Path]) -> None:
+    """在当前工作目录执行场景"""
+    from src.utils.model_router import ModelRouter, set_model_router
+    from src.utils.token_budget import TokenBudget, set_token_budget
+
+    from . import fixtures
+
+    if scenario == SCENARIO_WORKFLOW:
+        from src.main import run_workflow
+        from src.utils.telemetry import configure_telemetry
+
+        # 与 CLI 一致：工作流运行前配置 Logfire 插桩
+        configure_telemetry()
+
+        try:
+            await run_workflow(
+                "西安公司避坑指南", "求职者",
+                generate_image=options.get("image", True),
+                content_strategy=options.get("strategy", "sequential"),
+                pipeline=options.get("pipeline", True),
+                mcp_trace="replay" if trace_dir else "off",
+                mcp_trace_dir=trace_dir,
+            )
+        except SystemExit as e:
+            if e.code:
+                raise RuntimeError(f"run_workflow 退出码 {e.code}") from e
+        return
+
+    set_model_router(ModelRouter())
+    set_token_budget(TokenBudget())
+    research = fixtures.research_result(llm.config.entities, llm.config.cases)
+    content = fixtures.content(llm.config.entities)
+
+    if scenario == SCENARIO_RESEARCH:
+        from src.agents.research import ResearchAgent
+
+        agent = ResearchAgent()
+        try:
+            await agent.research("西安公司避坑指南", "求职者")
+        finally:
+            await agent.close()
+    elif scenario == SCENARIO_CONTENT:
+        from src.agents.content import ContentAgent
+
+        agent = ContentAgent(strategy=options.get("strategy", "sequential"))
+        await agent.create_content(research, "西安公司避坑指南")
+    elif scenario == SCENARIO_IMAGE:
+        from src.agents.image import ImageAgent
+
+        agent = ImageAgent()
+        try:
+            await agent.generate_image(content, research, "西安公司避坑指南", Path("posts/bench"))
+        finally:
+            await agent.close()
+    else:
+        raise ValueError(f"未知的场景: {scenario}（可选: {', '.join(SCENARIOS)}）")
+
+
+async def run_benchmark(
+    scenario: str,
+    llm_config: Optional[FakeLLMConfig] = None,
+    mcp_config: Optional[MCPConfig] = None,
+    options: Optional[Dict[str, Any]] = None,
+    quiet: bool = True
+) -> BenchmarkResult:
+    """
+    运行一个场景并测量
+
+    在临时目录中运行（posts/、output/ 等产物不会污染仓库），
+    结束后恢复原工作目录
+
+    Args:
+        scenario: 场景名（见 SCENARIOS）
+        llm_config: 假模型配置
+        mcp_config: 桩 MCP Server 配置
+        options: 场景参数（strategy / pipeline / image）
+        quiet: 屏蔽业务代码的控制台输出
+
+    Returns:
+        BenchmarkResult
+    """
+    llm = FakeLLM(llm_config)
+    mcp_config = mcp_config or MCPConfig()
+    options = options or {}
+    cwd = Path.cwd()
+
+    with tempfile.TemporaryDirectory(prefix="xhs-bench-") as workdir:
+        log_path = Path(workdir) / "mcp_calls.jsonl"
+        patches = [mock.patch("src.utils.model_router.get_anthropic_model", llm.model)]
+        if mcp_config.trace_dir is None:
+            factory = _stub_server_factory(mcp_config, log_path)
+            patches += [
+                mock.patch("src.agents.research.create_mcp_server", factory),
+                mock.patch("src.agents.image.create_mcp_server", factory),
+            ]
+        trace_dir = mcp_config.trace_dir.resolve() if mcp_config.trace_dir else None
+        if trace_dir is not None:
+            from src.utils.mcp_trace import MODE_REPLAY, configure_mcp_trace
+
+            configure_mcp_trace(MODE_REPLAY, trace_dir)
+        error: Optional[str] = None
+        os.chdir(workdir)
+        try:
+            with contextlib.ExitStack() as stack:
+                for patch in patches:
+                    stack.enter_context(patch)
+                if quiet:
+                    stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+                start = time.perf_counter()
+                async with EventLoopMonitor() as monitor:
+                    try:
+                        await _run_scenario(scenario, llm, options, trace_dir)
+                    except Exception as e:
+                        error = f"{type(e).__name__}: {e}"
+                wall_time = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+        mcp_log = _read_mcp_log(log_path) if trace_dir is None else _replayed_calls()
+
+    mcp_calls = Counter(f"{entry['label']}.{entry['tool']}" for entry in mcp_log)
+    return BenchmarkResult(
+        scenario=scenario,
+        wall_time=wall_time,
+        loop_blocked=monitor.blocked,
+        loop_max_lag=monitor.max_lag,
+        loop_stalls=monitor.stalls,
+        peak_rss_mb=_peak_rss_mb(resource.RUSAGE_SELF) if resource else 0.0,
+        peak_rss_children_mb=_peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else 0.0,
+        model_calls=dict(llm.calls),
+        model_calls_by_phase=llm.calls_by_phase(),
+        model_failures=dict(llm.failures),
+        mcp_calls=dict(sorted(mcp_calls.items())),
+        mcp_failures=sum(1 for entry in mcp_log if not entry["ok"]),
+        error=error,
+    )
@@ -0,0 +1,180 @@
+"""
+模型校验 / 序列化吞吐
+在 posts/ 语料（可复制多份模拟大量历史运行）上比较：
+
+- 校验：json.loads + model_validate（原加载方式）与 model_validate_json（load_model）
+- 序列化：json.dumps(model_dump(), indent=2)（save_json）与 model_dump_json
+- 行类型：实体 / 案例为 Entity / Case 模型（ResearchResult）与保持字典（ResearchDocument，批量加载用）对比
+- 列式表：ResearchTable 加载（按 ResearchDocument 解析）、还原的耗时和内存，并校验还原结果与原 JSON 完全一致
+
+用法:
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --posts-dir posts --copies 500 --json serialization.json
+"""
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from pydantic import BaseModel
+
+from src.models.schemas import ResearchResult, XHSContent
+from src.utils.research_table import ResearchDocument, ResearchTable
+
+# 每项计时重复次数（取最快一次，减少 GC / 调度噪声）
+ROUNDS = 3
+
+
+def _best(fn: Callable[[], Any], rounds: int = ROUNDS) -> float:
+    """多次运行取最短耗时（秒）"""
+    best = float("inf")
+    for _ in range(rounds):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _allocated(fn: Callable[[], Any]) -> int:
+    """构建结果后仍存活的内存（字节）"""
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def _load_corpus(posts_dir: Path, name: str) -> List[bytes]:
+    """读取所有运行目录下的某个 JSON 文件"""
+    return [path.read_bytes() for path in sorted(posts_dir.glob(f"*/{name}"))]
+
+
+def _throughput(label: str, count: int, size: int, seconds: float) -> Dict[str, Any]:
+    """整理一项计时结果"""
+    return {
+        "label": label,
+        "seconds": round(seconds, 4),
+        "per_second": round(count / seconds) if seconds else None,
+        "mb_per_second": round(size / seconds / 1e6, 1) if seconds else None,
+    }
+
+
+def _model_benchmarks(model: type[BaseModel], documents: List[bytes]) -> List[Dict[str, Any]]:
+    """单个模型的校验 / 序列化吞吐"""
+    size = sum(len(d) for d in documents)
+    parsed = [model.model_validate_json(d) for d in documents]
+    name = model.__name__
+    return [
+        _throughput(f"{name} json.loads + model_validate", len(documents), size,
+                    _best(lambda: [model.model_validate(json.loads(d)) for d in documents])),
+        _throughput(f"{name} model_validate_json", len(documents), size,
+                    _best(lambda: [model.model_validate_json(d) for d in documents])),
+        _throughput(f"{name} json.dumps(model_dump(), indent=2)", len(documents), size,
+                    _best(lambda: [json.dumps(p.model_dump(), ensure_ascii=False, indent=2) for p in parsed])),
+        _throughput(f"{name} model_dump_json(indent=2)", len(documents), size,
+                    _best(lambda: [p.model_dump_json(indent=2) for p in parsed])),
+    ]
+
+
+def run(posts_dir: Path, copies: int) -> Dict[str, Any]:
+    """
+    运行全部测量
+
+    Args:
+        posts_dir: 语料目录
+        copies: 语料复制份数
+
+    Returns:
+        结果字典
+    """
+    research_docs = _load_corpus(posts_dir, "research.json") * copies
+    content_docs = _load_corpus(posts_dir, "content.json") * copies
+    if not research_docs:
+        raise SystemExit(f"{posts_dir} 下没有 research.json")
+
+    results = _model_benchmarks(ResearchResult, research_docs)
+    results += _model_benchmarks(ResearchDocument, research_docs)
+    if content_docs:
+        results += _model_benchmarks(XHSContent, content_docs)
+
+    research = [ResearchResult.model_validate_json(d) for d in research_docs]
+    entity_rows = [e for r in research for e in r.entities]
+    case_rows = [c for r in research for c in r.cases]
+
+    table = _table_from(research_docs)
+    results.append(_throughput("ResearchTable 加载", len(research), 0, _best(lambda: _table_from(research_docs))))
+    results.append(_throughput(
+        "ResearchTable 还原", len(research), 0,
+        _best(lambda: [table.research(i) for i in range(len(table))]),
+    ))
+
+    # 无损校验：还原结果与原 JSON 解析结果逐字段相等，且键顺序一致
+    lossless = all(
+        table.research(i).model_dump_json() == r.model_dump_json()
+        for i, r in enumerate(research)
+    )
+
+    memory = {
+        "dict_rows": _allocated(lambda: [json.loads(d) for d in research_docs]),
+        "research_document": _allocated(lambda: [ResearchDocument.model_validate_json(d) for d in research_docs]),
+        "research_result": _allocated(lambda: [ResearchResult.model_validate_json(d) for d in research_docs]),
+        "research_table": _allocated(lambda: _table_from(research_docs)),
+    }
+    return {
+        "runs": len(research_docs),
+        "entities": len(entity_rows),
+        "cases": len(case_rows),
+        "copies": copies,
+        "lossless": lossless,
+        "throughput": results,
+        "memory_bytes": memory,
+    }
+
+
+def _table_from(documents: List[bytes]) -> ResearchTable:
+    """从 JSON 字节构建列式表（与 ResearchTable.from_files 相同，按 ResearchDocument 解析）"""
+    table = ResearchTable()
+    for i, document in enumerate(documents):
+        table.add(str(i), ResearchDocument.model_validate_json(document))
+    return table
+
+
+def main() -> None:
+    """CLI 入口"""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.serialization",
+        description="ResearchResult / XHSContent 校验与序列化吞吐、列式表内存",
+    )
+    parser.add_argument("--posts-dir", type=Path, default=Path("posts"), help="语料目录（默认 posts）")
+    parser.add_argument("--copies", type=int, default=200, help="语料复制份数，模拟大量历史运行（默认 200）")
+    parser.add_argument("--json", metavar="PATH", help="将结果写入 JSON")
+    args = parser.parse_args()
+
+    report = run(args.posts_dir, args.copies)
+
+    print(f"语料: {report['runs']} 次运行，{report['entities']} 个实体，{report['cases']} 个案例")
+    print(f"\n{'项目':<44} {'耗时':>9} {'条/秒':>10} {'MB/秒':>8}")
+    for row in report["throughput"]:
+        mb = "" if not row["mb_per_second"] else f"{row['mb_per_second']:.1f}"
+        print(f"{row['label']:<44} {row['seconds']:>8.3f}s {row['per_second'] or 0:>10} {mb:>8}")
+    print("\n存活内存:")
+    for name, size in report["memory_bytes"].items():
+        print(f"   {name:<16} {size / 1e6:>8.1f} MB")
+    print(f"\n列式表还原{'无损' if report['lossless'] else '与原 JSON 不一致'}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n💾 已写入 {args.json}")
+    if not report["lossless"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
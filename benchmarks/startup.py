@@ -0,0 +1,114 @@
+"""
+CLI 启动耗时
+每次在全新子进程中计时（不受已导入模块影响），重复多次取中位数；
+用 python -X importtime 统计导入 src.main 时各模块的自身 / 累计导入耗时
+
+用法:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --repeat 10 --top 30
+    python -m benchmarks.startup --module src.agents.research   # 查看某个模块的导入开销
+    python -m benchmarks.startup --json startup.json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+# 不从 harness 导入（harness 会加载 pydantic-ai，本脚本只启动子进程）
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# 计时的命令（参数追加在 python 之后）
+COMMANDS = {
+    "python": ["-c", "pass"],
+    "import": ["-c", "import src.main"],
+    "help": ["-m", "src.main", "--help"],
+}
+
+
+def time_command(args: List[str], repeat: int) -> Dict[str, float]:
+    """
+    在新进程中重复运行命令并计时
+
+    Args:
+        args: python 之后的参数
+        repeat: 重复次数
+
+    Returns:
+        {"median": 中位数, "min": 最小值}（秒）
+    """
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=REPO_ROOT, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - started)
+    return {"median": round(statistics.median(samples), 4), "min": round(min(samples), 4)}
+
+
+def import_times(module: str) -> List[Dict[str, Any]]:
+    """
+    用 -X importtime 统计导入模块时各模块的导入耗时
+
+    Args:
+        module: 要导入的模块
+
+    Returns:
+        [{"module", "self", "cumulative"}]（秒，按累计耗时降序）
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, check=True, capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        # 格式: "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        rows.append({
+            "module": fields[2].strip(),
+            "self": int(fields[0]) / 1e6,
+            "cumulative": int(fields[1]) / 1e6,
+        })
+    rows.sort(key=lambda row: row["cumulative"], reverse=True)
+    return rows
+
+
+def main() -> None:
+    """CLI 入口"""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.startup",
+        description="CLI 启动耗时（--help 墙钟时间 + 模块导入耗时）",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="每条命令的重复次数（取中位数）")
+    parser.add_argument("--module", default="src.main", help="统计导入耗时的模块（默认 src.main）")
+    parser.add_argument("--top", type=int, default=20, help="显示累计导入耗时最高的模块数")
+    parser.add_argument("--json", metavar="PATH", help="将结果写入 JSON")
+    args = parser.parse_args()
+
+    timings = {name: time_command(command, args.repeat) for name, command in COMMANDS.items()}
+    modules = import_times(args.module)
+
+    print(f"启动耗时（{args.repeat} 次中位数）:")
+    for name, command in COMMANDS.items():
+        print(f"   python {' '.join(command):<28} {timings[name]['median']:.3f}s（最小 {timings[name]['min']:.3f}s）")
+    print(f"\n导入 {args.module} 累计耗时最高的 {args.top} 个模块:")
+    print(f"   {'累计':>8} {'自身':>8}  模块")
+    for row in modules[:args.top]:
+        print(f"   {row['cumulative']:>7.3f}s {row['self']:>7.3f}s  {row['module']}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(
+            {"timings": timings, "imports": modules[:args.top]}, ensure_ascii=False, indent=2
+        ), encoding="utf-8")
+        print(f"\n💾 已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
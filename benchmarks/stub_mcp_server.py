@@ -0,0 +1,215 @@
+"""
+桩 Playwright MCP Server（stdio）
+实现研究和配图流程用到的 Playwright MCP 工具子集，返回与真实 Server 同格式的脚本化结果：
+
+- browser_evaluate：按页面脚本返回笔记列表 / 笔记详情 / 相关搜索（供浏览器宏解析）
+- browser_snapshot：返回指定大小的页面快照文本
+- browser_click：点击下载按钮（ref=download）时在 --output-dir 写入一张 PNG
+
+延迟和失败率由环境变量配置，每次调用追加一行 JSON 到 BENCH_MCP_LOG：
+    BENCH_MCP_LATENCY / BENCH_MCP_JITTER / BENCH_MCP_DISTRIBUTION  延迟分布（秒）
+    BENCH_MCP_FAILURE_RATE  工具返回错误的概率
+    BENCH_MCP_SNAPSHOT_CHARS  快照大小（字符）
+    BENCH_MCP_SEED / BENCH_MCP_LABEL / BENCH_MCP_LOG
+
+用法:
+    python -m benchmarks.stub_mcp_server --output-dir ./downloads
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, Optional
+
+from benchmarks.distributions import DIST_LOGNORMAL, LatencyProfile
+
+# 假 Gemini 页面的下载按钮 ref（收到点击时写入图片）
+DOWNLOAD_REF = "download"
+
+# 生成图片边长（随机像素，压缩后仍大于图片审核的最小文件大小）
+IMAGE_SIZE = 96
+
+
+def _png_bytes(rng: random.Random, size: int = IMAGE_SIZE) -> bytes:
+    """生成随机像素的 RGB PNG"""
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    rows = b"".join(b"\x00" + rng.randbytes(size * 3) for _ in range(size))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _result(value: Any) -> str:
+    """browser_evaluate 的返回格式（页面脚本 JSON.stringify 后再作为字符串输出）"""
+    encoded = json.dumps(json.dumps(value, ensure_ascii=False), ensure_ascii=False)
+    return f"### Result\n{encoded}\n\n### Ran Playwright code\n```js\nawait page.evaluate(...)\n```"
+
+
+def _notes(limit: int = 10) -> list:
+    """搜索结果页的笔记列表"""
+    return [
+        {
+            "note_id": f"bench{i:04d}",
+            "url": f"https://www.xiaohongshu.com/explore/bench{i:04d}?xsec_token=stub",
+            "title": f"西安第{i}家公司的避坑经历",
+            "author": f"用户{i}",
+            "likes": f"{i * 3}.{i}万" if i % 2 else str(i * 120),
+        }
+        for i in range(1, limit + 1)
+    ]
+
+
+def _note_detail() -> dict:
+    """笔记详情和评论"""
+    return {
+        "title": "西安公司避坑经历",
+        "desc": "入职后才发现试用期不交社保，而且长期单休。" * 8,
+        "date": "2025-01-02",
+        "likes": "1.2万",
+        "collects": "3456",
+        "comment_total": "共 120 条评论",
+        "comments": [
+            {
+                "author": f"评论用户{i}",
+                "content": f"同公司，第{i}个月还没交社保，加班也没有加班费",
+                "date": "01-03",
+                "likes": str(i * 7),
+                "is_reply": i % 4 == 0,
+            }
+            for i in range(1, 21)
+        ],
+    }
+
+
+class StubBrowser:
+    """脚本化浏览器状态（当前页面、下载计数、调用日志）"""
+
+    def __init__(self, output_dir: Path):
+        """
+        初始化
+
+        Args:
+            output_dir: 下载目录（与 Playwright MCP 的 --output-dir 一致）
+        """
+        self.output_dir = output_dir
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.url = "about:blank"
+        self.downloads = 0
+        self.latency = LatencyProfile(
+            mean=float(os.getenv("BENCH_MCP_LATENCY", "0")),
+            jitter=float(os.getenv("BENCH_MCP_JITTER", "0")),
+            distribution=os.getenv("BENCH_MCP_DISTRIBUTION", DIST_LOGNORMAL),
+        )
+        self.failure_rate = float(os.getenv("BENCH_MCP_FAILURE_RATE", "0"))
+        self.snapshot_chars = int(os.getenv("BENCH_MCP_SNAPSHOT_CHARS", "20000"))
+        self.label = os.getenv("BENCH_MCP_LABEL", "mcp")
+        self.log_path: Optional[Path] = Path(os.environ["BENCH_MCP_LOG"]) if os.getenv("BENCH_MCP_LOG") else None
+        self.rng = random.Random(int(os.getenv("BENCH_MCP_SEED", "0")))
+
+    async def call(self, tool: str) -> None:
+        """模拟一次工具调用的延迟和失败，并记录日志"""
+        delay = self.latency.sample(self.rng)
+        if delay:
+            await asyncio.sleep(delay)
+        failed = self.failure_rate > 0 and self.rng.random() < self.failure_rate
+        if self.log_path is not None:
+            with self.log_path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps({"label": self.label, "tool": tool, "latency": delay, "ok": not failed}) + "\n")
+        if failed:
+            raise RuntimeError(f"stub failure: {tool}")
+
+    def snapshot(self) -> str:
+        """页面快照文本"""
+        line = "- generic [ref=e{n}]: 西安公司避坑 笔记卡片 标题 作者 点赞\n"
+        body = "".join(line.format(n=i) for i in range(self.snapshot_chars // len(line) + 1))
+        return f"### Page state\n- Page URL: {self.url}\n- Page Snapshot:\n```yaml\n{body[:self.snapshot_chars]}```"
+
+    def download(self) -> Path:
+        """写入一张生成图片"""
+        self.downloads += 1
+        path = self.output_dir / f"gemini-image-{os.getpid()}-{self.downloads}.png"
+        path.write_bytes(_png_bytes(self.rng))
+        return path
+
+
+def build_server(output_dir: Path):
+    """
+    构建桩 Server
+
+    Args:
+        output_dir: 下载目录
+
+    Returns:
+        FastMCP 实例
+    """
+    from mcp.server.fastmcp import FastMCP
+
+    server = FastMCP("stub-playwright", log_level="WARNING")
+    browser = StubBrowser(output_dir)
+
+    @server.tool()
+    async def browser_navigate(url: str) -> str:
+        """Navigate to a URL"""
+        await browser.call("browser_navigate")
+        browser.url = url
+        return f"### Ran Playwright code\n```js\nawait page.goto('{url}');\n```\n\n{browser.snapshot()}"
+
+    @server.tool()
+    async def browser_snapshot() -> str:
+        """Capture accessibility snapshot of the current page"""
+        await browser.call("browser_snapshot")
+        return browser.snapshot()
+
+    @server.tool()
+    async def browser_evaluate(function: str, element: Optional[str] = None, ref: Optional[str] = None) -> str:
+        """Evaluate JavaScript expression on page or element"""
+        await browser.call("browser_evaluate")
+        if "maxComments" in function:
+            return _result(_note_detail())
+        if "相关搜索" in function:
+            return _result(["西安求职避坑", "西安公司黑名单", "西安社保", "西安加班"])
+        return _result(_notes())
+
+    @server.tool()
+    async def browser_click(element: str, ref: str) -> str:
+        """Perform click on a web page"""
+        await browser.call("browser_click")
+        if ref == DOWNLOAD_REF:
+            path = browser.download()
+            return f"### Result\nDownloaded file to {path}"
+        return f"### Ran Playwright code\n```js\nawait page.click('{ref}');\n```"
+
+    @server.tool()
+    async def browser_type(element: str, ref: str, text: str, submit: bool = False) -> str:
+        """Type text into editable element"""
+        await browser.call("browser_type")
+        return f"### Ran Playwright code\n```js\nawait page.fill('{ref}', {json.dumps(text, ensure_ascii=False)});\n```"
+
+    @server.tool()
+    async def browser_wait_for(time: Optional[float] = None, text: Optional[str] = None) -> str:
+        """Wait for text to appear or a specified time to pass"""
+        await browser.call("browser_wait_for")
+        return "### Result\nWaited"
+
+    return server
+
+
+def main() -> None:
+    """命令行入口（stdio 传输）"""
+    parser = argparse.ArgumentParser(description="桩 Playwright MCP Server")
+    parser.add_argument("--output-dir", default="./output/playwright-downloads", help="下载目录")
+    args, _ = parser.parse_known_args()
+    build_server(Path(args.output_dir)).run("stdio")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,138 +2,549 @@
 内容创作 Agent
 基于研究数据生成小红书内容
 内置 Reflexion 循环：生成 → 审核 → 修订 → 循环直到通过
+
+支持两种策略：
+- sequential：单稿串行 Reflexion（默认）
+- parallel：并发生成 k 个不同角度/温度的候选稿并行审核，取最优；
+  都未通过时只对最优稿继续修订
+
+流式模式（stream=True）下串行生成的标题和正文实时写入 content.partial.json 并打印，
+生成期间并发准备审核用的研究数据
 """
+import asyncio
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
 from pydantic_ai import Agent
-from pydantic_ai.messages import ModelRequest, UserPromptPart
+from pydantic_ai.messages import ModelMessage, ModelRequest, UserPromptPart
 from ..models.schemas import ResearchResult, XHSContent, ReviewResult
-from ..utils.anthropic_provider import get_anthropic_model
+from ..utils.content_stream import PartialContentWriter, partial_output
+from ..utils.llm_usage import UsageStats, estimate_tokens
+from ..utils.model_router import get_model_router, is_borderline
+from ..utils.prompt_format import format_content, format_research
+from ..utils.precheck import PASS_SCORE, check_content, build_review, merge_review, has_critical
+from ..utils.review_delta import REVIEW_CACHE_SETTINGS, ReviewSession, diff_content
+from ..utils.reflexion_control import ReflexionController, REASON_MAX_ROUNDS
 from ..utils.retry_handler import with_retry
-from prompts import get_system_prompt, get_user_prompt
+from ..utils.progress import LEVEL_WARNING, ReviewVerdict, RoundStarted, emit, note
+from ..utils.run_profile import get_run_profiler
+from ..utils.token_budget import get_token_budget
+from prompts import get_system_prompt, get_user_prompt, get_prompt_field, load_prompt
+
+STRATEGIES = ("sequential", "parallel")
+
+# 候选稿采样温度（按候选序号循环使用）
+CANDIDATE_TEMPERATURES = (0.7, 1.0, 0.85, 0.9)
+
+# 创作提示词为修订轮次（反馈 + 历史输出）预留的 token
+REVISION_RESERVE_TOKENS = 6_000
+
+# 审核提示词为待审核内容预留的 token
+REVIEW_CONTENT_RESERVE_TOKENS = 2_000
+
+
+@dataclass
+class StrategyReport:
+    """一次内容创作的策略统计（成本 / 延迟）"""
+
+    strategy: str
+    candidates: int
+    rounds: int
+    passed: bool
+    best_score: float
+    wall_time: float
+    generator: UsageStats = field(default_factory=UsageStats)
+    reviewer: UsageStats = field(default_factory=UsageStats)
+    stopping: Dict[str, Any] = field(default_factory=dict)
+    review_prompts: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def total(self) -> UsageStats:
+        """生成 + 审核合计"""
+        total = UsageStats()
+        total.merge(self.generator)
+        total.merge(self.reviewer)
+        return total
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化字典"""
+        return {
+            "strategy": self.strategy,
+            "candidates": self.candidates,
+            "rounds": self.rounds,
+            "passed": self.passed,
+            "best_score": self.best_score,
+            "wall_time": round(self.wall_time, 3),
+            "generator": self.generator.to_dict(),
+            "reviewer": self.reviewer.to_dict(),
+            "total": self.total.to_dict(),
+            "stopping": self.stopping,
+            "review_prompts": self.review_prompts,
+        }
+
+    def summary(self) -> str:
+        """单行摘要"""
+        total = self.total
+        return (
+            f"策略 {self.strategy}（候选 {self.candidates}）: "
+            f"耗时 {self.wall_time:.1f}s, LLM 调用 {total.calls} 次, "
+            f"token {total.input_tokens}/{total.output_tokens}, 成本约 ${total.cost:.4f}"
+        )
 
 
 class ContentAgent:
     """小红书内容创作 Agent（带 Reflexion 循环）"""
 
-    def __init__(self, max_iterations: int = 3):
+    def __init__(
+        self,
+        max_iterations: int = 3,
+        strategy: str = "sequential",
+        candidates: int = 3,
+        stream: bool = False,
+        partial_path: Optional[Path] = None,
+        on_draft: Optional[Callable[[XHSContent], None]] = None
+    ):
         """
         初始化内容 Agent
 
         Args:
-            max_iterations: 最大审核迭代次数
+            max_iterations: 最大审核迭代次数（parallel 策略下候选轮计为第 1 轮）
+            strategy: 创作策略：sequential / parallel
+            candidates: parallel 策略的候选稿数量
+            stream: 流式生成（串行生成时实时输出标题和正文）
+            partial_path: 流式部分输出文件（如 posts/.../content.partial.json）
+            on_draft: 每份稿件生成后、审核前的回调（下游阶段据此提前启动）
         """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"未知的创作策略: {strategy}（可选: {', '.join(STRATEGIES)}）")
+
         self.max_iterations = max_iterations
+        self.strategy = strategy
+        self.candidates = max(1, candidates)
+        self.last_report: Optional[StrategyReport] = None
+
+        # 流式输出（parallel 的并发候选稿不流式输出，避免控制台交错）
+        self.stream = stream
+        self.partial_writer = PartialContentWriter(partial_path) if stream else None
+
+        # 稿件回调（审核进行中，下游可以基于当前稿件做投机工作）
+        self.on_draft = on_draft
+
+        # 最近一次 Reflexion 的停止决策（写入策略统计）
+        self._stopping: Dict[str, Any] = {}
+
+        # 最近一次 Reflexion 的审核提示词大小（首轮全文 / 各轮差异）
+        self._review_prompts: Dict[str, Any] = {}
+
+        # 审核用研究数据（与待审核内容无关，每份研究只准备一次）
+        self._review_research: Dict[int, str] = {}
+
+        # 按角色路由模型（共享带 HTTP 重试的 Provider）
+        self.router = get_model_router()
+
+        # 按角色的 token 预算（每次模型请求前检查，超出时本地裁剪）
+        self.budget = get_token_budget()
 
-        # 获取带 HTTP 重试的 Model（max_retries=5）
-        model = get_anthropic_model()
+        # 用量统计（每次 create_content 重置）
+        self._generator_usage = UsageStats()
+        self._reviewer_usage = UsageStats()
 
         # 生成 Agent
         self.generator = Agent(
-            model=model,
+            model=self.router.model_for("content.generator"),
             output_type=XHSContent,
             instrument=True,
             system_prompt=(get_system_prompt("content"),),
+            history_processors=[self.budget.history_processor("content.generator")],
         )
 
         # 审核 Agent（复用现有的 review 提示词）
         self.reviewer = Agent(
-            model=model,
+            model=self.router.model_for("content.reviewer"),
             output_type=ReviewResult,
             instrument=True,
             retries=3,  # 添加重试机制，应对临时 API 错误
             system_prompt=(get_system_prompt("content_review"),),
+            model_settings=REVIEW_CACHE_SETTINGS,  # 修订轮次复用缓存的对话前缀
+            history_processors=[self.budget.history_processor("content.reviewer")],
         )
 
-    async def _review(self, content: XHSContent, research: ResearchResult) -> ReviewResult:
+    async def _review(
+        self,
+        content: XHSContent,
+        research: ResearchResult,
+        session: Optional[ReviewSession] = None
+    ) -> ReviewResult:
         """
         审核内容
 
+        传入 session 时审核在同一段对话中进行：首轮发送完整内容和研究数据，
+        之后只发送相对上一次审核版本的差异
+
         Args:
             content: 待审核的内容
             research: 研究数据（作为审核依据）
+            session: 修订链的审核对话
 
         Returns:
             ReviewResult: 审核结果
         """
-        review_prompt = get_user_prompt(
-            "content_review",
-            content=content.model_dump_json(indent=2),
-            research=research.model_dump_json(indent=2)
+        # 规则预审：已有 critical 问题时跳过 LLM 审核
+        rule_issues, entity_usage = check_content(content, research)
+        if has_critical(rule_issues):
+            note(f"   📏 规则预审发现 {sum(i.severity == 'critical' for i in rule_issues)} 个严重问题，跳过 LLM 审核")
+            return build_review(rule_issues, entity_usage)
+
+        review_prompt = None
+        if session is not None and session.started:
+            delta_prompt = get_prompt_field(
+                "content_review", "delta_prompt_template", diff=diff_content(session.reviewed, content)
+            )
+            if session.fits(delta_prompt, self.budget.limit("content.reviewer")):
+                review_prompt = delta_prompt
+                note(f"   🧩 增量审核: 差异 {len(review_prompt)} 字（首轮 {session.full_chars} 字）")
+            else:
+                # 继续增量会触发预算截断首轮全文，改为新对话全文审核
+                note("   🧩 审核对话加上差异将超出 content.reviewer 预算，重新发送全文审核")
+                session.restart()
+        if review_prompt is None:
+            review_prompt = get_user_prompt(
+                "content_review",
+                content=format_content(content),
+                research=await self._prepare_review(research)
+            )
+        history = session.messages if session is not None else []
+
+        # 快速模型评分处于临界区间时升级到强模型复核
+        review_result = await self.router.run(
+            "content.reviewer", self.reviewer, review_prompt,
+            needs_escalation=lambda review: is_borderline(review.score, PASS_SCORE),
+            usage_stats=self._reviewer_usage,
+            message_history=history
         )
-        review_result = await self.reviewer.run(review_prompt)
-        return review_result.output
+        if session is not None:
+            session.record(content, review_result.all_messages(), review_prompt)
+        return merge_review(review_result.output, rule_issues)
 
-    @with_retry(max_retries=5, initial_delay=5.0)
-    async def create_content(
+    async def _prepare_review(self, research: ResearchResult) -> str:
+        """
+        准备审核提示词中的研究数据（按 content.reviewer 预算裁剪并序列化）
+
+        在线程中计算，流式生成期间可并发执行
+
+        Args:
+            research: 研究结果
+
+        Returns:
+            研究数据文本
+        """
+        key = id(research)
+        if key not in self._review_research:
+            def prepare() -> str:
+                reserved = (
+                    estimate_tokens(get_system_prompt("content_review"))
+                    + estimate_tokens(get_user_prompt("content_review", content="", research=""))
+                    + REVIEW_CONTENT_RESERVE_TOKENS
+                )
+                return format_research(self.budget.fit_research("content.reviewer", research, reserved))
+
+            self._review_research[key] = await asyncio.to_thread(prepare)
+        return self._review_research[key]
+
+    def _on_stream_response(self, response: Any) -> None:
+        """流式响应快照回调"""
+        partial = partial_output(response)
+        if partial:
+            self.partial_writer.update(partial)
+
+    async def _generate(
+        self,
+        prompt: str,
+        messages: List[ModelMessage],
+        temperature: Optional[float] = None,
+        stream: bool = False
+    ) -> Tuple[XHSContent, List[ModelMessage]]:
+        """
+        执行一次生成并记录用量
+
+        Args:
+            prompt: 用户提示词
+            messages: 消息历史
+            temperature: 采样温度（None 使用模型默认值）
+            stream: 流式生成并实时输出
+
+        Returns:
+            (生成的内容, 包含本次对话的新消息历史)
+        """
+        model_settings = {"temperature": temperature} if temperature is not None else None
+        if stream and self.partial_writer is not None:
+            self.partial_writer.reset()
+            output, new_messages = await self.router.run_stream(
+                "content.generator", self.generator, prompt,
+                on_response=self._on_stream_response,
+                usage_stats=self._generator_usage,
+                message_history=messages,
+                model_settings=model_settings
+            )
+            self.partial_writer.finish(output.model_dump())
+            if self.partial_writer.first_token_at is not None:
+                note(f"      ⏱️  首个输出 {self.partial_writer.first_token_at:.1f}s")
+            return output, [*messages, *new_messages]
+
+        run_result = await self.router.run(
+            "content.generator", self.generator, prompt,
+            usage_stats=self._generator_usage,
+            message_history=messages,
+            model_settings=model_settings
+        )
+        return run_result.output, [*messages, *run_result.new_messages()]
+
+    def _generation_prompt(self, research: ResearchResult, topic: str) -> str:
+        """
+        构建创作提示词（研究数据按 content.generator 预算裁剪）
+
+        Args:
+            research: 研究结果
+            topic: 主题
+
+        Returns:
+            创作提示词
+        """
+        # 预留系统提示词、模板和后续修订轮次的空间
+        reserved = (
+            estimate_tokens(get_system_prompt("content"))
+            + estimate_tokens(get_user_prompt("content", topic=topic, research_data=""))
+            + REVISION_RESERVE_TOKENS
+        )
+        research = self.budget.fit_research("content.generator", research, reserved)
+        return get_user_prompt("content", topic=topic, research_data=format_research(research))
+
+    @staticmethod
+    def _feedback_message(review: ReviewResult, research: ResearchResult) -> str:
+        """把审核结果整理成修订反馈"""
+        feedback_message = (
+            f"内容审核未通过，请修订。\n\n"
+            f"**审核反馈**：{review.summary}\n\n"
+            f"**具体问题**：\n"
+        )
+        for issue in review.issues:
+            feedback_message += f"- [{issue.severity}] {issue.description}: {issue.suggestion}\n"
+
+        feedback_message += (
+            f"\n**研究数据参考**：\n"
+            f"- 可用实体: {len(research.entities)} 个\n"
+            f"- 可用案例: {len(research.cases)} 个\n"
+        )
+        return feedback_message
+
+    @staticmethod
+    def _report_review(content: XHSContent, review: ReviewResult, round_no: int) -> None:
+        """发布审核结论"""
+        emit(ReviewVerdict(
+            target="content", passed=review.passed, score=review.score, summary=review.summary,
+            issues=tuple((issue.severity, issue.description) for issue in review.issues),
+            details=(("标题", content.title),), round=round_no
+        ))
+
+    def _publish_draft(self, content: XHSContent) -> None:
+        """把当前稿件交给下游（回调异常不影响内容创作）"""
+        if self.on_draft is None:
+            return
+        try:
+            self.on_draft(content)
+        except Exception as e:
+            note(f"   ⚠️  稿件回调失败: {e}", LEVEL_WARNING)
+
+    async def _reflexion(
         self,
         research: ResearchResult,
-        topic: str
-    ) -> XHSContent:
+        topic: str,
+        messages: Optional[List[ModelMessage]] = None,
+        content: Optional[XHSContent] = None,
+        review: Optional[ReviewResult] = None,
+        start_round: int = 0,
+        session: Optional[ReviewSession] = None
+    ) -> Tuple[XHSContent, ReviewResult, int]:
         """
-        创作小红书内容（带 Reflexion 循环 + 外层重试）
+        串行 Reflexion 循环（评分收敛或问题重复出现时提前停止）
 
         Args:
             research: 研究结果
             topic: 主题
+            messages: 已有消息历史（从某一轮继续修订时传入）
+            content: 已有内容
+            review: 已有内容的审核结果
+            start_round: 起始轮次（0 表示从头生成）
+            session: 已有内容的审核对话（修订轮次只向审核发送差异）
 
         Returns:
-            XHSContent: 创作的内容（已通过审核或达到最大迭代次数）
+            (内容, 审核结果, 实际轮次)
         """
-        messages = []  # 消息历史
-        content = None
-        review = None
+        messages = list(messages or [])
+        session = session or ReviewSession()
+        controller = ReflexionController("content", self.max_iterations)
+        history: List[Tuple[XHSContent, ReviewResult]] = []
+
+        # 从已审核的一轮继续（parallel 的候选轮）
+        if review is not None:
+            history.append((content, review))
+            controller.observe(review)
 
-        for i in range(self.max_iterations):
+        i = start_round
+        while not (controller.decisions and controller.decisions[-1].stop):
+            get_run_profiler().enter_round(i + 1, [*messages, *session.messages])
             # 1. 生成或继续修订
             if i == 0:
-                prompt = get_user_prompt(
-                    "content",
-                    topic=topic,
-                    research_data=research.model_dump_json(indent=2)
-                )
-                print("   ✍️  开始创作内容...")
+                prompt = self._generation_prompt(research, topic)
+                emit(RoundStarted(target="content", step="generate", text="   ✍️  开始创作内容...", round=i + 1))
             else:
                 # 将审核反馈注入消息历史
-                feedback_message = (
-                    f"内容审核未通过，请修订。\n\n"
-                    f"**审核反馈**：{review.summary}\n\n"
-                    f"**具体问题**：\n"
-                )
-                for issue in review.issues:
-                    feedback_message += f"- [{issue.severity}] {issue.description}: {issue.suggestion}\n"
-
-                feedback_message += (
-                    f"\n**研究数据参考**：\n"
-                    f"- 可用实体: {len(research.entities)} 个\n"
-                    f"- 可用案例: {len(research.cases)} 个\n"
-                )
-
                 messages.append(ModelRequest(parts=[
-                    UserPromptPart(feedback_message)
+                    UserPromptPart(self._feedback_message(review, research))
                 ]))
                 prompt = "请根据反馈修订内容，确保数量一致、数据准确。"
-                print(f"   🔄 根据反馈修订内容 (第{i+1}轮)...")
+                emit(RoundStarted(
+                    target="content", step="revise", text=f"   🔄 根据反馈修订内容 (第{i+1}轮)...", round=i + 1
+                ))
 
-            # 执行生成
-            run_result = await self.generator.run(prompt, message_history=messages)
-            content = run_result.output
-            messages.extend(run_result.new_messages())  # 保留历史
+            if self.stream:
+                # 流式生成期间并发准备审核数据
+                review_prep = asyncio.create_task(self._prepare_review(research))
+                content, messages = await self._generate(prompt, messages, stream=True)
+                await review_prep
+            else:
+                content, messages = await self._generate(prompt, messages)
+            self._publish_draft(content)
 
             # 2. 审核
-            print(f"   🔍 审核内容 (第{i+1}轮)...")
-            review = await self._review(content, research)
-
-            # 3. 通过则返回
-            if review.passed:
-                print(f"   ✅ 内容审核通过 (第{i+1}轮)")
-                print(f"      - 标题: {content.title}")
-                print(f"      - 评分: {review.score:.1f}/100")
-                return content
-
-            # 未通过，打印反馈
-            print(f"   ⚠️  内容审核未通过 (第{i+1}轮): {review.summary}")
-            for issue in review.issues:
-                print(f"      - [{issue.severity}] {issue.description}")
-
-        # 达到最大迭代次数
-        print(f"   ⚠️  达到最大迭代次数 ({self.max_iterations})，返回当前结果")
+            emit(RoundStarted(target="content", step="review", text=f"   🔍 审核内容 (第{i+1}轮)...", round=i + 1))
+            review = await self._review(content, research, session)
+            self._report_review(content, review, i + 1)
+
+            # 3. 通过、收敛或问题重复时停止
+            history.append((content, review))
+            controller.observe(review)
+            i += 1
+
+        self._stopping = controller.report()
+        self._review_prompts = session.to_dict()
+        if review.passed:
+            return content, review, controller.rounds
+
+        if controller.decisions[-1].reason == REASON_MAX_ROUNDS:
+            note(f"   ⚠️  达到最大迭代次数 ({controller.limit})，返回当前结果", LEVEL_WARNING)
+
+        # 未通过时采用评分最高的一轮（修订可能让评分回落）
+        best = controller.best_round
+        if best != controller.rounds:
+            note(f"   ↩️  采用评分最高的第 {best} 轮结果（{history[best - 1][1].score:.1f}/100）")
+        content, review = history[best - 1]
+        return content, review, controller.rounds
+
+    async def _parallel(self, research: ResearchResult, topic: str) -> Tuple[XHSContent, ReviewResult, int]:
+        """
+        并行候选策略：并发生成 k 个候选稿并行审核，取最优稿；
+        都未通过时只对最优稿继续串行修订
+
+        Args:
+            research: 研究结果
+            topic: 主题
+
+        Returns:
+            (内容, 审核结果, 实际轮次)
+        """
+        base_prompt = self._generation_prompt(research, topic)
+        angles = load_prompt("content").get("candidate_angles") or [""]
+
+        prompts = []
+        for k in range(self.candidates):
+            angle = angles[k % len(angles)]
+            prompt = base_prompt
+            if angle:
+                prompt += get_prompt_field("content", "candidate_prompt_template", angle=angle)
+            prompts.append((prompt, CANDIDATE_TEMPERATURES[k % len(CANDIDATE_TEMPERATURES)]))
+
+        # 1. 并发生成候选稿
+        note(f"   ✍️  并发生成 {self.candidates} 个候选稿...")
+        results = await asyncio.gather(
+            *(self._generate(prompt, [], temperature) for prompt, temperature in prompts),
+            return_exceptions=True
+        )
+        drafts = [r for r in results if not isinstance(r, BaseException)]
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if not drafts:
+            raise errors[0]
+        if errors:
+            note(f"   ⚠️  {len(errors)} 个候选稿生成失败: {errors[0]}", LEVEL_WARNING)
+
+        # 2. 并行审核
+        note(f"   🔍 并行审核 {len(drafts)} 个候选稿...")
+        sessions = [ReviewSession() for _ in drafts]
+        reviews = await asyncio.gather(*(
+            self._review(content, research, session) for (content, _), session in zip(drafts, sessions)
+        ))
+        for k, ((content, _), review) in enumerate(zip(drafts, reviews), start=1):
+            status = "通过" if review.passed else "未通过"
+            note(f"      - 候选 {k}: {review.score:.1f}/100（{status}）{content.title}")
+
+        # 3. 取最优稿（先看是否通过，再看评分）
+        best = max(range(len(drafts)), key=lambda k: (reviews[k].passed, reviews[k].score))
+        content, messages = drafts[best]
+        review = reviews[best]
+        note(f"   🏆 选择候选 {best + 1}")
+        self._publish_draft(content)
+        self._report_review(content, review, 1)
+        if review.passed:
+            return content, review, 1
+
+        # 4. 都未通过：只修订最优稿
+        return await self._reflexion(
+            research, topic,
+            messages=messages, content=content, review=review, start_round=1,
+            session=sessions[best]
+        )
+
+    @with_retry(max_retries=5, initial_delay=5.0)
+    async def create_content(
+        self,
+        research: ResearchResult,
+        topic: str
+    ) -> XHSContent:
+        """
+        创作小红书内容（带 Reflexion 循环 + 外层重试）
+
+        Args:
+            research: 研究结果
+            topic: 主题
+
+        Returns:
+            XHSContent: 创作的内容（已通过审核或达到最大迭代次数）
+        """
+        self._generator_usage = UsageStats()
+        self._reviewer_usage = UsageStats()
+        self._review_research = {}
+        self._stopping = {}
+        self._review_prompts = {}
+        start = time.perf_counter()
+
+        if self.strategy == "parallel":
+            content, review, rounds = await self._parallel(research, topic)
+        else:
+            content, review, rounds = await self._reflexion(research, topic)
+
+        self.last_report = StrategyReport(
+            strategy=self.strategy,
+            candidates=self.candidates if self.strategy == "parallel" else 1,
+            rounds=rounds,
+            passed=review.passed,
+            best_score=review.score,
+            wall_time=time.perf_counter() - start,
+            generator=self._generator_usage,
+            reviewer=self._reviewer_usage,
+            stopping=self._stopping,
+            review_prompts=self._review_prompts,
+        )
+        note(f"   📊 {self.last_report.summary()}")
         return content
@@ -9,13 +9,17 @@ import asyncio
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict
+from typing import Dict, List, Optional, Tuple
 from pydantic_ai import Agent
-from pydantic_ai.mcp import MCPServerStdio
 from ..models.schemas import ImageResult, GeneratedImage, XHSContent, ResearchResult
-from ..utils.anthropic_provider import get_anthropic_model
+from ..utils.mcp_trace import create_mcp_server
+from ..utils.model_router import get_model_router
+from ..utils.token_budget import get_token_budget
+from ..utils.tool_metrics import instrument_toolset
 from ..utils.download_manager import DownloadManager
 from ..utils.retry_handler import with_retry
+from ..utils.progress import LEVEL_WARNING, ReviewVerdict, RoundStarted, emit, note
+from ..utils.run_profile import get_run_profiler
 from .image_review import ImageReviewAgent
 from prompts import get_system_prompt, get_user_prompt, get_prompt_field
 
@@ -30,6 +34,9 @@ class ImageAgent:
         {"type": "detail_2", "desc": "详情图2 - 清单式，列出后半部分要点"},
     ]
 
+    # 图片描述最短长度（快速模型输出更短时升级到强模型）
+    MIN_PROMPT_LENGTH = 30
+
     def __init__(
         self,
         image_count: int = 3,
@@ -45,15 +52,19 @@ class ImageAgent:
         self.image_count = min(max(image_count, 1), 3)  # 限制 1-3 张
         self.max_iterations = max_iterations
 
-        # 获取带 HTTP 重试的 Model（max_retries=5）
-        model = get_anthropic_model()
+        # 按角色路由模型（共享带 HTTP 重试的 Provider）
+        self.router = get_model_router()
+
+        # 按角色的 token 预算（每次模型请求前检查，超出时本地裁剪）
+        self.budget = get_token_budget()
 
         # Playwright 下载输出目录
         self.downloads_dir = Path('./output/playwright-downloads')
         self.downloads_dir.mkdir(parents=True, exist_ok=True)
 
         # 创建 Playwright MCP Server 实例（用于操作 Gemini）
-        self.mcp_server = MCPServerStdio(
+        self.mcp_server = create_mcp_server(
+            'image',
             command='npx',
             args=[
                 '-y', '@playwright/mcp',
@@ -72,21 +83,23 @@ class ImageAgent:
         # 提示词生成 Agent（生成 Gemini 图片描述）
         # 系统提示词从 prompts/image.yaml 的 system_prompt 读取
         self.prompt_generator = Agent(
-            model=model,
+            model=self.router.model_for("image.prompt_generator"),
             output_type=str,
             instrument=True,
             system_prompt=(get_system_prompt("image"),),
+            history_processors=[self.budget.history_processor("image.prompt_generator")],
         )
 
         # Gemini 操作 Agent（使用 Playwright 工具）
         # 系统提示词从 prompts/image.yaml 的 gemini_operator_prompt 读取
         self.gemini_operator = Agent(
-            model=model,
+            model=self.router.model_for("image.gemini_operator"),
             output_type=str,
-            toolsets=[self.mcp_server],
+            toolsets=[instrument_toolset(self.mcp_server, 'playwright')],
             instrument=True,
             retries=3,
             system_prompt=(get_prompt_field("image", "gemini_operator_prompt"),),
+            history_processors=[self.budget.history_processor("image.gemini_operator")],
         )
 
         # Gemini URL
@@ -98,6 +111,66 @@ class ImageAgent:
         # 下载文件管理器（监控 Playwright 输出目录）
         self.download_manager = DownloadManager(download_dir=self.downloads_dir)
 
+        # 预生成的图片描述 {(主题, 图片类型, 标题, 正文摘要): 描述}
+        self._prompt_cache: Dict[Tuple[str, str, str, str], str] = {}
+
+        # 预热的浏览器会话（在独立任务中持有 MCP 连接，直到 close）
+        self._session_task: Optional[asyncio.Task] = None
+        self._session_release = asyncio.Event()
+
+    async def warm_up(self) -> None:
+        """
+        预热 Gemini 浏览器会话：提前启动 Playwright MCP 并打开 Gemini 页面
+
+        会话保持到 close()，之后的 Gemini 操作复用已启动的浏览器
+        """
+        if self._session_task is not None:
+            return
+        ready = asyncio.Event()
+        self._session_release = asyncio.Event()
+        self._session_task = asyncio.create_task(self._hold_session(ready))
+
+        # 会话就绪或启动失败时返回（失败时抛出原异常）
+        waiter = asyncio.create_task(ready.wait())
+        await asyncio.wait([waiter, self._session_task], return_when=asyncio.FIRST_COMPLETED)
+        waiter.cancel()
+        if self._session_task.done():
+            task, self._session_task = self._session_task, None
+            task.result()
+        note("   🌐 Gemini 浏览器会话已预热")
+
+    async def _hold_session(self, ready: asyncio.Event) -> None:
+        """持有 MCP 连接（进入和退出必须在同一个任务中）"""
+        async with self.mcp_server:
+            await self.mcp_server.direct_call_tool("browser_navigate", {"url": self.gemini_url})
+            ready.set()
+            await self._session_release.wait()
+
+    async def close(self) -> None:
+        """关闭预热的浏览器会话"""
+        if self._session_task is None:
+            return
+        task, self._session_task = self._session_task, None
+        self._session_release.set()
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def prepare_prompts(self, content: XHSContent, topic: str) -> Dict[str, str]:
+        """
+        并发预生成所有图片类型的描述（结果缓存，generate_image 首次生成时直接使用）
+
+        Args:
+            content: 内容数据（可以是审核中的稿件）
+            topic: 主题
+
+        Returns:
+            {图片类型: 图片描述}
+        """
+        types = self.IMAGE_TYPES[:self.image_count]
+        prompts = await asyncio.gather(*(
+            self._generate_prompt(content, topic, t["type"], t["desc"]) for t in types
+        ))
+        return {t["type"]: prompt for t, prompt in zip(types, prompts)}
+
     @with_retry(max_retries=5, initial_delay=5.0)
     async def generate_image(
         self,
@@ -118,7 +191,7 @@ class ImageAgent:
         Returns:
             ImageResult: 图片结果（包含多张图片）
         """
-        print(f"   🎨 开始生成 {self.image_count} 张配图（最多重试 {self.max_iterations} 次）...")
+        note(f"   🎨 开始生成 {self.image_count} 张配图（最多重试 {self.max_iterations} 次）...")
 
         # 存储已生成的图片 {image_type: GeneratedImage}
         generated_images: Dict[str, GeneratedImage] = {}
@@ -129,23 +202,30 @@ class ImageAgent:
         for iteration in range(self.max_iterations):
             if not pending_types:
                 break
+            get_run_profiler().enter_round(iteration + 1)
 
-            print(f"\n   🔄 第 {iteration + 1} 次生成（待生成: {pending_types}）")
+            emit(RoundStarted(
+                target="image", step="generate",
+                text=f"\n   🔄 第 {iteration + 1} 次生成（待生成: {pending_types}）", round=iteration + 1
+            ))
 
             # 1. 生成待处理的图片
             for image_type in pending_types:
                 image_type_info = next(t for t in self.IMAGE_TYPES if t["type"] == image_type)
                 image_desc = image_type_info["desc"]
 
-                print(f"\n      [{image_type}] {image_desc}")
+                note(f"\n      [{image_type}] {image_desc}")
 
                 # 生成 Gemini 提示词
-                print(f"         📝 生成图片描述提示词...")
-                prompt = await self._generate_prompt(content, topic, image_type, image_desc)
-                print(f"         ✅ 提示词: {prompt[:60]}...")
+                note(f"         📝 生成图片描述提示词...")
+                # 首次生成复用预生成的描述；审核未通过重新生成时不走缓存
+                prompt = await self._generate_prompt(
+                    content, topic, image_type, image_desc, use_cache=(iteration == 0)
+                )
+                note(f"         ✅ 提示词: {prompt[:60]}...")
 
                 # 使用 Playwright 操作 Gemini 生成图片
-                print(f"         🌐 启动 Gemini 图片生成...")
+                note(f"         🌐 启动 Gemini 图片生成...")
                 image_path = await self._generate_via_gemini(prompt, output_dir, image_type)
 
                 generated_images[image_type] = GeneratedImage(
@@ -154,15 +234,22 @@ class ImageAgent:
                     image_type=image_type
                 )
 
-                print(f"         ✅ {image_type} 生成完成")
+                note(f"         ✅ {image_type} 生成完成")
 
             # 2. 审核所有图片
             all_images = list(generated_images.values())
             review = await self.reviewer.review(all_images, topic, self.image_count)
 
+            emit(ReviewVerdict(
+                target="image", passed=review.passed, score=review.score, summary=review.summary,
+                issues=tuple(
+                    (issue.severity, f"{issue.image_type}: {issue.description}") for issue in review.issues
+                ),
+                details=(("图片", f"{len(all_images)} 张"),), round=iteration + 1
+            ))
+
             # 3. 检查是否通过
             if review.passed:
-                print(f"\n   ✅ 图片审核通过（评分: {review.score:.1f}）")
                 return ImageResult(
                     images=all_images,
                     total_count=len(all_images),
@@ -170,20 +257,16 @@ class ImageAgent:
                 )
 
             # 4. 未通过，找出有问题的图片类型
-            print(f"\n   ⚠️ 审核未通过（评分: {review.score:.1f}）")
-            for issue in review.issues:
-                print(f"      - [{issue.severity}] {issue.image_type}: {issue.description}")
-
             # 5. 获取需要重新生成的图片类型
             pending_types = self.reviewer.get_failed_image_types(review)
 
             if not pending_types:
                 # 没有明确失败的图片，但审核未通过（可能是 warning 级别问题）
                 # 不再重试，接受当前结果
-                print(f"\n   ℹ️ 无 critical 问题，接受当前结果")
+                note(f"\n   ℹ️ 无 critical 问题，接受当前结果")
                 break
 
-            print(f"\n   🔄 将重新生成: {pending_types}")
+            note(f"\n   🔄 将重新生成: {pending_types}")
 
         # 达到最大次数或无需重试，返回最终结果
         all_images = list(generated_images.values())
@@ -198,7 +281,8 @@ class ImageAgent:
         content: XHSContent,
         topic: str,
         image_type: str = "cover",
-        image_desc: str = ""
+        image_desc: str = "",
+        use_cache: bool = True
     ) -> str:
         """
         生成 Gemini 图片提示词
@@ -208,6 +292,7 @@ class ImageAgent:
             topic: 主题
             image_type: 图片类型 (cover/detail_1/detail_2)
             image_desc: 图片描述
+            use_cache: 输入（标题和正文摘要）不变时复用已生成的描述
         """
         # 根据图片类型调整正文摘要
         body_text = content.body
@@ -222,18 +307,28 @@ class ImageAgent:
             # 详情图2取后半部分
             mid = len(body_text) // 2
             body_excerpt = body_text[mid:]
+        body_excerpt = body_excerpt[:300]
+
+        key = (topic, image_type, content.title, body_excerpt)
+        if use_cache and key in self._prompt_cache:
+            return self._prompt_cache[key]
 
         # 从 YAML 读取用户提示词模板并填充变量
         user_prompt = get_user_prompt(
             "image",
             topic=topic,
             content_title=content.title,
-            content_body=body_excerpt[:300],
+            content_body=body_excerpt,
             image_type=image_type,
             image_desc=image_desc
         )
 
-        result = await self.prompt_generator.run(user_prompt)
+        # 快速模型生成的描述过短时升级到强模型重新生成
+        result = await self.router.run(
+            "image.prompt_generator", self.prompt_generator, user_prompt,
+            needs_escalation=lambda output: len(output.strip()) < self.MIN_PROMPT_LENGTH
+        )
+        self._prompt_cache[key] = result.output
         return result.output
 
     async def _generate_via_gemini(
@@ -264,13 +359,13 @@ class ImageAgent:
         )
 
         # 运行 Gemini 操作 Agent
-        result = await self.gemini_operator.run(operation_prompt)
+        result = await self.router.run("image.gemini_operator", self.gemini_operator, operation_prompt)
 
         # 检查 Agent 执行状态
         if "SUCCESS" in result.output or "成功" in result.output:
-            print(f"         ✅ Gemini 操作成功")
+            note(f"         ✅ Gemini 操作成功")
         else:
-            print(f"         ⚠️ Gemini 操作状态: {result.output}")
+            note(f"         ⚠️ Gemini 操作状态: {result.output}", LEVEL_WARNING)
 
         # 等待下载完成并移动文件到目标目录
         # 如果超时或找不到文件，让异常抛出，由 @with_retry 重试整个流程
@@ -281,20 +376,20 @@ class ImageAgent:
             timeout=60,
             before_time=start_time
         )
-        print(f"         ✅ 图片已保存: {image_path}")
+        note(f"         ✅ 图片已保存: {image_path}")
 
         return image_path
 
     async def list_tools(self) -> None:
         """列出所有可用的 MCP 工具（用于验证）"""
-        print("\n   🔧 正在检查 Gemini 操作工具...")
+        note("\n   🔧 正在检查 Gemini 操作工具...")
 
         try:
             async with self.mcp_server as server:
                 tools = await server.list_tools()
-                print(f"\n   📋 发现 {len(tools)} 个 Playwright MCP 工具")
+                note(f"\n   📋 发现 {len(tools)} 个 Playwright MCP 工具")
                 for tool in tools[:5]:  # 只显示前5个
                     tool_name = f"{self.mcp_server.tool_prefix}_{tool.name}" if self.mcp_server.tool_prefix else tool.name
-                    print(f"      ✅ {tool_name}")
+                    note(f"      ✅ {tool_name}")
         except Exception as e:
-            print(f"   ⚠️ 无法列出工具: {e}")
+            note(f"   ⚠️ 无法列出工具: {e}", LEVEL_WARNING)
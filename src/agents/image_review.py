@@ -9,7 +9,10 @@ from typing import List, Sequence, Union
 from pydantic_ai import Agent, BinaryContent
 from pydantic_ai.messages import UserContent
 from ..models.schemas import GeneratedImage, ImageReviewResult, ImageReviewIssue
-from ..utils.anthropic_provider import get_anthropic_model
+from ..utils.model_router import get_model_router
+from ..utils.progress import LEVEL_WARNING, note
+from ..utils.run_profile import get_run_profiler
+from ..utils.token_budget import get_token_budget
 from prompts import get_system_prompt, get_user_prompt
 
 
@@ -21,16 +24,20 @@ class ImageReviewAgent:
 
     def __init__(self):
         """初始化图片审核 Agent"""
-        # 获取带 HTTP 重试的 Model（max_retries=5）
-        model = get_anthropic_model()
+        # 按角色路由模型（共享带 HTTP 重试的 Provider）
+        self.router = get_model_router()
+
+        # 按角色的 token 预算（每次模型请求前检查，超出时本地裁剪）
+        self.budget = get_token_budget()
 
         # 视觉审核 Agent（多模态，可以读取图片）
         # 系统提示词从 prompts/image_review.yaml 读取
         self.visual_reviewer = Agent(
-            model=model,
+            model=self.router.model_for("image.visual_reviewer"),
             output_type=ImageReviewResult,
             instrument=True,
             system_prompt=(get_system_prompt("image_review"),),
+            history_processors=[self.budget.history_processor("image.visual_reviewer")],
         )
 
     async def review(
@@ -50,7 +57,7 @@ class ImageReviewAgent:
         Returns:
             ImageReviewResult: 审核结果
         """
-        print("   🔍 开始审核图片...")
+        note("   🔍 开始审核图片...")
 
         issues = []
         file_check = {}
@@ -89,7 +96,7 @@ class ImageReviewAgent:
 
         # 打印审核结果
         status = "✅ 通过" if passed else "❌ 未通过"
-        print(f"   {status} (评分: {score:.1f})")
+        note(f"   {status} (评分: {score:.1f})")
 
         return result
 
@@ -186,18 +193,19 @@ class ImageReviewAgent:
                 try:
                     # 使用 BinaryContent.from_path 读取本地图片
                     image_content = BinaryContent.from_path(path)
+                    get_run_profiler().record_image_bytes(len(image_content.data))
                     user_content.append(f"\n### {img.image_type} 图片：")
                     user_content.append(image_content)
                 except Exception as e:
-                    print(f"      ⚠️ 无法读取图片 {path}: {e}")
+                    note(f"      ⚠️ 无法读取图片 {path}: {e}", LEVEL_WARNING)
 
         # 调用多模态审核
-        print(f"      🔍 视觉审核中（{len(images)} 张图片）...")
+        note(f"      🔍 视觉审核中（{len(images)} 张图片）...")
         try:
-            result = await self.visual_reviewer.run(user_content)
+            result = await self.router.run("image.visual_reviewer", self.visual_reviewer, user_content)
             return result.output
         except Exception as e:
-            print(f"      ⚠️ 视觉审核失败: {e}")
+            note(f"      ⚠️ 视觉审核失败: {e}", LEVEL_WARNING)
             # 视觉审核失败 = 审核未通过，需要重试
             # 常见原因：413 (图片太大), 网络错误等
             return ImageReviewResult(
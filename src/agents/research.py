@@ -3,32 +3,62 @@
 使用 Playwright MCP Server 搜索和分析小红书内容
 内置 Reflexion 循环：生成 → 审核 → 修订 → 循环直到通过
 """
+from typing import Any, Dict, List, Optional, Tuple
 from pydantic_ai import Agent
-from pydantic_ai.mcp import MCPServerStdio
 from pydantic_ai.messages import ModelRequest, UserPromptPart
-from ..models.schemas import ResearchResult, ReviewResult
-from ..utils.anthropic_provider import get_anthropic_model
+from ..models.schemas import ResearchResult, ReviewResult, CrawlWatermark
+from ..utils.browser_macros import XHSBrowserMacros
+from ..utils.entity_dedup import dedupe_research
+from ..utils.incremental import merge_research
+from ..utils.knowledge_base import KnowledgeBase, PriorKnowledge, ENTITY_TARGET, CASE_TARGET
+from ..utils.mcp_trace import create_mcp_server
+from ..utils.model_router import get_model_router, is_borderline
+from ..utils.prompt_format import format_research
+from ..utils.precheck import PASS_SCORE, check_research, build_review, merge_review, has_critical
+from ..utils.review_delta import REVIEW_CACHE_SETTINGS, ReviewSession, diff_research
+from ..utils.reflexion_control import ReflexionController, REASON_MAX_ROUNDS
 from ..utils.retry_handler import with_retry
-from prompts import get_system_prompt, get_user_prompt
+from ..utils.progress import LEVEL_WARNING, ReviewVerdict, RoundStarted, emit, note
+from ..utils.run_profile import get_run_profiler
+from ..utils.token_budget import get_token_budget
+from ..utils.tool_metrics import instrument_toolset
+from prompts import get_system_prompt, get_user_prompt, get_prompt_field
+
+# 补缺模式的最小补充量（已有数据已达标时也至少补充这么多）
+FILL_GAPS_MIN_ENTITIES = 5
+FILL_GAPS_MIN_CASES = 3
 
 
 class ResearchAgent:
     """小红书研究 Agent（带 Reflexion 循环）"""
 
-    def __init__(self, max_iterations: int = 3):
+    def __init__(
+        self,
+        max_iterations: int = 3,
+        knowledge_base: Optional[KnowledgeBase] = None
+    ):
         """
         初始化研究 Agent
 
         Args:
             max_iterations: 最大审核迭代次数
+            knowledge_base: 历史研究知识库（用于预置实体和案例）
         """
         self.max_iterations = max_iterations
+        self.knowledge_base = knowledge_base
+
+        # 最近一次研究的 Reflexion 停止决策
+        self.last_stopping: Dict[str, Any] = {}
 
-        # 获取带 HTTP 重试的 Model（max_retries=5）
-        model = get_anthropic_model()
+        # 按角色路由模型（共享带 HTTP 重试的 Provider）
+        self.router = get_model_router()
+
+        # 按角色的 token 预算（每次模型请求前检查，超出时本地裁剪）
+        self.budget = get_token_budget()
 
         # 🔑 创建 Playwright MCP Server 实例
-        self.mcp_server = MCPServerStdio(
+        self.mcp_server = create_mcp_server(
+            'research',
             command='npx',
             args=['-y', '@playwright/mcp'],
             env={
@@ -41,71 +71,231 @@ class ResearchAgent:
             max_retries=5,  # 增加工具重试次数（浏览器操作可能不稳定）
         )
 
-        # 生成 Agent（带 MCP 工具）
+        # 浏览器宏工具（共享同一个 MCP 会话，一次调用完成多步浏览器操作）
+        self.macros = XHSBrowserMacros(self.mcp_server)
+
+        # 生成 Agent（带 MCP 工具 + 宏工具）
         self.generator = Agent(
-            model=model,
+            model=self.router.model_for("research.generator"),
             output_type=ResearchResult,
-            toolsets=[self.mcp_server],
+            toolsets=[
+                instrument_toolset(self.mcp_server, 'playwright'),
+                instrument_toolset(self.macros.toolset(), 'macros'),
+            ],
             instrument=True,
             retries=3,
             system_prompt=(get_system_prompt("research"),),
+            history_processors=[self.budget.history_processor("research.generator")],
         )
 
         # 审核 Agent（纯推理，独立视角）
         self.reviewer = Agent(
-            model=model,
+            model=self.router.model_for("research.reviewer"),
             output_type=ReviewResult,
             instrument=True,
             retries=3,  # 添加重试机制，应对临时 API 错误
             system_prompt=(get_system_prompt("research_review"),),
+            model_settings=REVIEW_CACHE_SETTINGS,  # 修订轮次复用缓存的对话前缀
+            history_processors=[self.budget.history_processor("research.reviewer")],
         )
 
     async def list_tools(self) -> None:
         """列出所有可用的 MCP 工具（用于验证）"""
-        print("\n   🔧 正在检查可用工具...")
+        note("\n   🔧 正在检查可用工具...")
 
         try:
             async with self.mcp_server as server:
                 tools = await server.list_tools()
-                print(f"\n   📋 发现 {len(tools)} 个 Playwright MCP 工具:")
+                note(f"\n   📋 发现 {len(tools)} 个 Playwright MCP 工具:")
                 for tool in tools:
                     tool_name = f"{self.mcp_server.tool_prefix}_{tool.name}" if self.mcp_server.tool_prefix else tool.name
-                    print(f"      ✅ {tool_name}")
+                    note(f"      ✅ {tool_name}")
                     if hasattr(tool, 'description') and tool.description:
-                        print(f"         {tool.description[:80]}...")
+                        note(f"         {tool.description[:80]}...")
         except Exception as e:
-            print(f"   ⚠️  无法列出工具: {e}")
-            print(f"   提示: 工具将在首次 Agent 调用时自动发现")
+            note(f"   ⚠️  无法列出工具: {e}", LEVEL_WARNING)
+            note(f"   提示: 工具将在首次 Agent 调用时自动发现")
 
-    async def _review(self, result: ResearchResult, topic: str, target_audience: str) -> ReviewResult:
+    async def _review(
+        self,
+        result: ResearchResult,
+        topic: str,
+        target_audience: str,
+        session: Optional[ReviewSession] = None
+    ) -> ReviewResult:
         """
         审核研究结果
 
+        传入 session 时审核在同一段对话中进行：首轮发送完整研究结果，
+        之后只发送相对上一次审核版本的差异（新增/删除/修改的实体和案例）
+
         Args:
             result: 研究结果
             topic: 研究主题
             target_audience: 目标受众
+            session: 本次研究的审核对话
 
         Returns:
             ReviewResult: 审核结果
         """
-        review_prompt = get_user_prompt(
-            "research_review",
+        # 规则预审：已有 critical 问题时跳过 LLM 审核
+        rule_issues, stats = check_research(result)
+        if has_critical(rule_issues):
+            note(f"   📏 规则预审发现 {sum(i.severity == 'critical' for i in rule_issues)} 个严重问题，跳过 LLM 审核")
+            return build_review(rule_issues, stats)
+
+        review_prompt = None
+        if session is not None and session.started:
+            delta_prompt = get_prompt_field(
+                "research_review", "delta_prompt_template", diff=diff_research(session.reviewed, result)
+            )
+            if session.fits(delta_prompt, self.budget.limit("research.reviewer")):
+                review_prompt = delta_prompt
+                note(f"   🧩 增量审核: 差异 {len(review_prompt)} 字（首轮 {session.full_chars} 字）")
+            else:
+                # 继续增量会触发预算截断首轮全文，改为新对话全文审核
+                note("   🧩 审核对话加上差异将超出 research.reviewer 预算，重新发送全文审核")
+                session.restart()
+        if review_prompt is None:
+            review_prompt = get_user_prompt(
+                "research_review",
+                topic=topic,
+                target_audience=target_audience,
+                research=format_research(result)
+            )
+        history = session.messages if session is not None else []
+
+        # 快速模型评分处于临界区间时升级到强模型复核
+        review_result = await self.router.run(
+            "research.reviewer", self.reviewer, review_prompt,
+            needs_escalation=lambda review: is_borderline(review.score, PASS_SCORE),
+            message_history=history
+        )
+        if session is not None:
+            session.record(result, review_result.all_messages(), review_prompt)
+        return merge_review(review_result.output, rule_issues)
+
+    def _incremental_prompt(
+        self,
+        topic: str,
+        target_audience: str,
+        previous: ResearchResult,
+        watermark: CrawlWatermark
+    ) -> str:
+        """
+        构建增量研究提示词（只抓取水位线之后的新内容）
+
+        Args:
+            topic: 研究主题
+            target_audience: 目标受众
+            previous: 上次研究结果
+            watermark: 上次研究水位线
+
+        Returns:
+            增量研究提示词
+        """
+        known_entities = "、".join(
+            e.name for e in previous.entities if e.name
+        )
+        return get_prompt_field(
+            "research",
+            "incremental_prompt_template",
+            topic=topic,
+            target_audience=target_audience,
+            last_run_at=watermark.last_run_at,
+            seen_note_ids=", ".join(watermark.seen_note_ids) or "（无记录）",
+            known_entities=known_entities or "（无）"
+        )
+
+    def _prior_knowledge_prompt(self, prior: PriorKnowledge) -> str:
+        """
+        构建知识库预置提示词（历史实体和案例）
+
+        Args:
+            prior: 知识库检索到的历史数据
+
+        Returns:
+            附加到研究任务之后的提示词
+        """
+        prior_entities = "\n".join(
+            f"- {e.get('name')}（{e.get('type', '')}）：{e.get('issue', '')}"
+            for e in prior.entities
+        )
+        prior_cases = "\n".join(
+            "- " + "；".join(str(v) for v in c.values() if v)
+            for c in prior.cases
+        )
+        if prior.coverage_good:
+            coverage_note = (
+                f"历史数据已覆盖数量目标（{len(prior.entities)} 个实体、{len(prior.cases)} 个案例），"
+                f"只需核实并补充近期新内容，**达到目标后即可结束研究**。"
+            )
+        else:
+            coverage_note = (
+                f"历史数据不足（{len(prior.entities)} 个实体、{len(prior.cases)} 个案例），"
+                f"请按研究策略继续补充。"
+            )
+        return get_prompt_field(
+            "research",
+            "prior_knowledge_template",
+            prior_entities=prior_entities or "（无）",
+            prior_cases=prior_cases or "（无）",
+            coverage_note=coverage_note
+        )
+
+    def _fill_gaps_prompt(
+        self,
+        topic: str,
+        target_audience: str,
+        previous: ResearchResult
+    ) -> str:
+        """
+        构建补缺研究提示词（基于相似主题的已有研究，缩小研究目标）
+
+        Args:
+            topic: 研究主题
+            target_audience: 目标受众
+            previous: 相似主题合并后的研究结果
+
+        Returns:
+            补缺研究提示词
+        """
+        known_entities = "、".join(
+            e.name for e in previous.entities if e.name
+        )
+        return get_prompt_field(
+            "research",
+            "fill_gaps_prompt_template",
             topic=topic,
             target_audience=target_audience,
-            research=result.model_dump_json(indent=2)
+            known_entities=known_entities or "（无）",
+            seen_note_ids=", ".join(previous.note_ids) or "（无记录）",
+            entity_gap=max(ENTITY_TARGET - len(previous.entities), FILL_GAPS_MIN_ENTITIES),
+            case_gap=max(CASE_TARGET - len(previous.cases), FILL_GAPS_MIN_CASES)
         )
-        review_result = await self.reviewer.run(review_prompt)
-        return review_result.output
 
     @with_retry(max_retries=5, initial_delay=5.0)
-    async def research(self, topic: str, target_audience: str) -> ResearchResult:
+    async def research(
+        self,
+        topic: str,
+        target_audience: str,
+        previous: Optional[ResearchResult] = None,
+        watermark: Optional[CrawlWatermark] = None
+    ) -> ResearchResult:
         """
-        执行研究任务（带 Reflexion 循环 + 外层重试）
+        执行研究任务（带 Reflexion 循环 + 外层重试，评分收敛或问题重复出现时提前停止）
+
+        传入 previous 和 watermark 时进入增量模式：只抓取水位线之后的
+        新笔记和评论，并将新数据合并到 previous 中
+
+        只传入 previous 时进入补缺模式：previous 是相似主题的已有研究，
+        只补齐缺口（目标更小），同样合并到 previous 中
 
         Args:
             topic: 研究主题
             target_audience: 目标受众
+            previous: 上次研究结果（增量模式）或相似主题研究结果（补缺模式）
+            watermark: 上次研究水位线（增量模式）
 
         Returns:
             ResearchResult: 研究结果（已通过审核或达到最大迭代次数）
@@ -113,19 +303,48 @@ class ResearchAgent:
         # 首次运行时列出工具
         await self.list_tools()
 
+        incremental = previous is not None and watermark is not None
+        fill_gaps = previous is not None and watermark is None
+
         messages = []  # 消息历史
         result = None
         review = None
+        controller = ReflexionController("research", self.max_iterations)
+        session = ReviewSession()
+        history: List[Tuple[ResearchResult, ReviewResult]] = []
 
-        for i in range(self.max_iterations):
+        i = 0
+        while not (controller.decisions and controller.decisions[-1].stop):
+            get_run_profiler().enter_round(i + 1, [*messages, *session.messages])
             # 1. 生成或继续修订
-            if i == 0:
+            if i == 0 and incremental:
+                prompt = self._incremental_prompt(topic, target_audience, previous, watermark)
+                emit(RoundStarted(
+                    target="research", step="generate",
+                    text=f"   🔍 增量搜索 {watermark.last_run_at} 之后的新内容...", round=i + 1
+                ))
+            elif i == 0 and fill_gaps:
+                prompt = self._fill_gaps_prompt(topic, target_audience, previous)
+                emit(RoundStarted(
+                    target="research", step="generate",
+                    text=f"   🔍 补缺模式: 基于相似主题的 {len(previous.entities)} 个实体补充研究...", round=i + 1
+                ))
+            elif i == 0:
                 prompt = get_user_prompt(
                     "research",
                     topic=topic,
                     target_audience=target_audience
                 )
-                print("   🔍 开始搜索和分析...")
+                # 知识库预置历史实体和案例
+                if self.knowledge_base:
+                    prior = self.knowledge_base.prior_knowledge(topic, target_audience)
+                    if prior:
+                        prompt += "\n\n" + self._prior_knowledge_prompt(prior)
+                        note(
+                            f"   📚 知识库预置: 实体 {len(prior.entities)} 个、案例 {len(prior.cases)} 个"
+                            f"（来自 {len(prior.run_dirs)} 次历史运行）"
+                        )
+                emit(RoundStarted(target="research", step="generate", text="   🔍 开始搜索和分析...", round=i + 1))
             else:
                 # 将审核反馈注入消息历史
                 feedback_message = (
@@ -140,33 +359,58 @@ class ResearchAgent:
                     UserPromptPart(feedback_message)
                 ]))
                 prompt = "请根据反馈继续搜索，补充不足的数据。注意保留已有的有效数据。"
-                print(f"   🔄 根据反馈继续搜索 (第{i+1}轮)...")
+                emit(RoundStarted(
+                    target="research", step="revise", text=f"   🔄 根据反馈继续搜索 (第{i+1}轮)...", round=i + 1
+                ))
 
             # 执行生成
-            run_result = await self.generator.run(prompt, message_history=messages)
+            run_result = await self.router.run(
+                "research.generator", self.generator, prompt, message_history=messages
+            )
             result = run_result.output
             messages.extend(run_result.new_messages())  # 保留历史
 
+            # 增量/补缺模式：合并到已有研究结果后再审核
+            if previous is not None:
+                note(f"   ➕ 新增实体 {len(result.entities)} 个、案例 {len(result.cases)} 个，合并到已有结果")
+                result = merge_research(previous, result)
+
+            # 实体/案例去重（同一公司的不同写法合并为一条）
+            result, dedup_stats = dedupe_research(result)
+            if dedup_stats.removed:
+                note(
+                    f"   🧹 去重: 实体 {dedup_stats.entities_before} → {dedup_stats.entities_after}，"
+                    f"案例 {dedup_stats.cases_before} → {dedup_stats.cases_after}"
+                )
+
             # 2. 审核
-            print(f"   🔍 审核研究结果 (第{i+1}轮)...")
-            review = await self._review(result, topic, target_audience)
+            emit(RoundStarted(target="research", step="review", text=f"   🔍 审核研究结果 (第{i+1}轮)...", round=i + 1))
+            review = await self._review(result, topic, target_audience, session)
+
+            history.append((result, review))
+            controller.observe(review)
+            i += 1
+
+            emit(ReviewVerdict(
+                target="research", passed=review.passed, score=review.score, summary=review.summary,
+                issues=tuple((issue.severity, issue.description) for issue in review.issues),
+                details=(("实体", f"{len(result.entities)} 个"), ("案例", f"{len(result.cases)} 个")), round=i
+            ))
 
             # 3. 通过则返回
             if review.passed:
-                print(f"   ✅ 研究审核通过 (第{i+1}轮)")
-                print(f"      - 实体: {len(result.entities)} 个")
-                print(f"      - 案例: {len(result.cases)} 个")
-                print(f"      - 评分: {review.score:.1f}/100")
+                self.last_stopping = controller.report()
                 return result
 
-            # 未通过，打印反馈
-            print(f"   ⚠️  研究审核未通过 (第{i+1}轮): {review.summary}")
-            for issue in review.issues:
-                print(f"      - [{issue.severity}] {issue.description}")
+        self.last_stopping = controller.report()
+        if controller.decisions[-1].reason == REASON_MAX_ROUNDS:
+            note(f"   ⚠️  达到最大迭代次数 ({controller.limit})，返回当前结果", LEVEL_WARNING)
 
-        # 达到最大迭代次数
-        print(f"   ⚠️  达到最大迭代次数 ({self.max_iterations})，返回当前结果")
-        return result
+        # 未通过时采用评分最高的一轮（继续搜索可能让评分回落）
+        best = controller.best_round
+        if best != controller.rounds:
+            note(f"   ↩️  采用评分最高的第 {best} 轮结果（{history[best - 1][1].score:.1f}/100）")
+        return history[best - 1][0]
 
     async def close(self):
         """关闭 MCP Server 连接"""
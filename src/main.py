@@ -1,11 +1,16 @@
 """
 主程序入口
 协调研究和内容创作的工作流
+
+模块顶层只导入标准库：Agent、pydantic-ai、MCP 等重依赖在运行工作流或子命令时才导入，
+Logfire 在参数解析之后才配置（--help、参数错误可以立即返回）
 """
 import asyncio
 import argparse
 import sys
 import io
+import time
+from typing import Optional
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
@@ -15,20 +20,27 @@ if sys.platform == "win32":
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
-# Logfire 可观测性配置
-import logfire
-
-# 'if-token-present' 表示如果没有配置 LOGFIRE_TOKEN，则不发送数据（本地模式）
-logfire.configure(send_to_logfire='if-token-present')
-logfire.instrument_pydantic_ai()
-
-from .agents.research import ResearchAgent
-from .agents.content import ContentAgent
-from .agents.image import ImageAgent
-from .utils.file_ops import save_json
-
-
-async def run_workflow(topic: str, audience: str, generate_image: bool = True) -> None:
+async def run_workflow(
+    topic: str,
+    audience: str,
+    generate_image: bool = True,
+    incremental: bool = False,
+    use_kb: bool = False,
+    warm_start: bool = False,
+    content_strategy: str = "sequential",
+    candidates: int = 3,
+    model_routing: str = "tiered",
+    llm_cache: str = "off",
+    llm_cache_ttl: Optional[float] = None,
+    stream: bool = False,
+    pipeline: bool = True,
+    mcp_trace: str = "off",
+    mcp_trace_dir: Optional[Path] = None,
+    memory_profile: bool = False,
+    verbose: bool = False,
+    compress_reports: bool = False,
+    resume: Optional[str] = None
+) -> None:
     """
     运行完整的内容创作工作流
 
@@ -36,101 +48,369 @@ async def run_workflow(topic: str, audience: str, generate_image: bool = True) -
         topic: 研究主题
         audience: 目标受众
         generate_image: 是否生成配图（默认开启）
+        incremental: 增量研究（只抓取上次研究之后的新内容）
+        use_kb: 使用本地知识库预置历史实体和案例
+        warm_start: 基于相似主题的历史研究热启动（补缺模式）
+        content_strategy: 内容创作策略（sequential / parallel）
+        candidates: parallel 策略的候选稿数量
+        model_routing: 模型路由模式（tiered 按角色分层 / strong 全部使用强模型）
+        llm_cache: LLM 响应缓存模式（off / read / record / replay）
+        llm_cache_ttl: 缓存过期时间（小时）
+        stream: 流式生成内容（实时写入 content.partial.json 并打印）
+        pipeline: 阶段流水线（内容审核期间提前预热 Gemini 并生成配图描述）
+        mcp_trace: Playwright MCP 流量录制模式（off / record / replay）
+        mcp_trace_dir: 录制目录（默认 .cache/mcp_traces）
+        memory_profile: 在阶段 / 轮次边界拍 tracemalloc 快照（写入 run_profile.json 的 memory）
+        verbose: 控制台同时显示阶段起止、工具调用等结构化进度事件
+        compress_reports: 超过 256KB 的诊断报告（metrics / model_stats / content_report）gzip 压缩
+        resume: 恢复的运行标识（输出目录名）：沿用其主题、受众和目录，复用已完成阶段的产物
     """
+    from .agents.research import ResearchAgent
+    from .agents.content import ContentAgent
+    from .agents.image import ImageAgent
+    from .models.schemas import ImageResult, ResearchResult, XHSContent
+    from .utils.artifact_store import ArtifactStore
+    from .utils.artifact_writer import ArtifactWriter
+    from .utils.file_ops import load_model
+    from .utils.knowledge_base import KnowledgeBase
+    from .utils.model_router import ModelRouter, set_model_router
+    from .utils.llm_cache import configure_llm_cache
+    from .utils.mcp_trace import DEFAULT_TRACE_DIR, configure_mcp_trace
+    from .utils.token_budget import TokenBudget, set_token_budget
+    from .utils.tool_metrics import ToolMetrics, set_tool_metrics
+    from .utils.memory_profile import MemoryProfiler
+    from .utils.progress import (
+        EVENTS_FILE, LEVEL_WARNING, ConsoleSink, JsonlSink, ProgressBus, note, set_job, set_progress_bus
+    )
+    from .utils.run_profile import PROFILE_FILE, RunProfiler, set_run_profiler
+    from .utils.content_stream import PARTIAL_FILE
+    from .utils.phase_scheduler import PhaseScheduler
+    from .utils.topic_index import TopicIndex, warm_start_research
+    from .utils.incremental import (
+        WATERMARK_FILE, safe_topic_name, find_latest_run, load_previous_research, build_watermark
+    )
+    from .utils.run_index import PHASE_DONE, STATUS_COMPLETED, STATUS_FAILED, RunIndex, RunIndexSink
+    from prompts import PROMPTS_DIR, get_prompt_version
+
+    # 运行索引（posts/.runs.sqlite）和内容寻址存储（posts/.store）
+    run_index = RunIndex()
+    store = ArtifactStore()
+    resumed = run_index.get(resume) if resume else None
+    if resume and resumed is None:
+        run_index.close()
+        print(f"❌ 运行索引中没有 {resume}（python -m src.main runs 查看已有运行）")
+        sys.exit(1)
+    if resumed is not None:
+        topic, audience = resumed.topic, resumed.audience
+
     print("=" * 60)
     print("🚀 小红书内容创作工作流（Pydantic-AI）")
     print("=" * 60)
     print(f"\n主题: {topic}")
     print(f"受众: {audience}\n")
 
-    # 创建输出目录
-    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-    # 清理主题名（移除特殊字符）
-    safe_topic = "".join(c for c in topic if c.isalnum() or c in (' ', '-', '_'))[:20]
-    project_dir = Path("posts") / f"{timestamp}-{safe_topic}"
+    # 增量模式：在创建新目录前定位上次研究结果
+    previous_dir = find_latest_run(topic) if incremental else None
+
+    # 创建输出目录（恢复时沿用原目录）
+    run_at = datetime.now()
+    started = time.perf_counter()
+    if resumed is not None:
+        safe_topic = resumed.safe_topic
+        project_dir = Path(resumed.run_dir)
+    else:
+        timestamp = run_at.strftime("%Y%m%d-%H%M%S")
+        # 清理主题名（移除特殊字符）
+        safe_topic = safe_topic_name(topic)
+        project_dir = Path("posts") / f"{timestamp}-{safe_topic}"
     project_dir.mkdir(parents=True, exist_ok=True)
+    run_id = project_dir.name
 
     print(f"📁 输出目录: {project_dir}\n")
 
-    try:
-        # ==================== Phase 1: 研究 ====================
-        print("=" * 60)
-        print("📚 Phase 1: 小红书研究")
-        print("=" * 60)
+    # 恢复运行：视图中缺失的产物从存储还原，按依赖顺序复用已完成阶段的结果
+    reused: dict = {}
+    if resumed is not None:
+        for name, digest in run_index.artifacts(run_id).items():
+            if not (project_dir / name).exists() and store.has(digest):
+                store.materialize(digest, project_dir / name)
+        phases = run_index.phases(run_id)
+        for name, filename, model in (
+            ("research", "research.json", ResearchResult),
+            ("content", "content.json", XHSContent),
+            ("image", "image.json", ImageResult),
+        ):
+            phase = phases.get(name)
+            if phase is None or phase.status != PHASE_DONE or not (project_dir / filename).exists():
+                break
+            reused[name] = load_model(project_dir / filename, model)
+        print(f"⏩ 恢复运行 {run_id}，复用已完成阶段: {', '.join(reused) or '无'}\n")
+
+    run_index.start_run(
+        run_id, project_dir, topic, safe_topic, audience,
+        options={
+            "generate_image": generate_image, "incremental": incremental, "use_kb": use_kb,
+            "warm_start": warm_start, "content_strategy": content_strategy, "candidates": candidates,
+            "model_routing": model_routing, "pipeline": pipeline, "stream": stream,
+        },
+        prompt_versions={path.stem: get_prompt_version(path.stem) for path in sorted(PROMPTS_DIR.glob("*.yaml"))},
+        started_at=run_at
+    )
 
-        # 🔑 创建 Agent（MCP 工具已在构造时注册）
-        research_agent = ResearchAgent()
-        print("   ✅ ResearchAgent 已创建（包含 Playwright MCP 工具）")
+    # LLM 响应缓存（需在创建模型之前配置）
+    cache = configure_llm_cache(llm_cache, ttl=llm_cache_ttl * 3600 if llm_cache_ttl else None)
+    if cache:
+        print(f"💾 LLM 响应缓存: {cache.mode}（{cache.db_path}）\n")
+
+    # Playwright MCP 流量录制 / 回放（需在创建 Agent 之前配置）
+    trace = configure_mcp_trace(mcp_trace, mcp_trace_dir or DEFAULT_TRACE_DIR)
+    if trace:
+        print(f"📼 Playwright MCP 流量: {trace.mode}（{trace.trace_dir}）\n")
+
+    # 模型路由（各 Agent 共享，按角色汇总统计）
+    router = set_model_router(ModelRouter(mode=model_routing))
+
+    # Token 预算（每次模型请求前本地检查，超出时裁剪）
+    budget = set_token_budget(TokenBudget())
+
+    # 工具调用指标（按工具名的耗时、返回大小、token 直方图）
+    tool_metrics = set_tool_metrics(ToolMetrics())
+
+    # 运行画像（按阶段 / Reflexion 轮次的耗时、token、重试和送审图片字节数）
+    memory = MemoryProfiler() if memory_profile else None
+    if memory is not None:
+        memory.start()
+        print("🧠 内存画像: tracemalloc 已开启（运行会变慢）\n")
+    profiler = set_run_profiler(RunProfiler(memory=memory))
+
+    # 进度事件：控制台渲染 + events.jsonl + 运行索引的阶段状态和评分（后台批量输出，不阻塞事件循环）
+    set_job(run_id)
+    bus = set_progress_bus(ProgressBus([
+        ConsoleSink(verbose=verbose), JsonlSink(project_dir / EVENTS_FILE), RunIndexSink(run_index, skip=reused)
+    ]))
+    await bus.start()
+
+    # 产物写入：序列化后在线程池中原子写入并纳入内容寻址存储，不阻塞其他阶段
+    artifacts = ArtifactWriter(
+        store=store,
+        on_stored=lambda path, digest, size: run_index.record_artifact(run_id, path.name, digest, size)
+    )
+    succeeded = False
 
-        research = await research_agent.research(topic, audience)
+    # 阶段调度：配图的浏览器预热和描述生成在内容审核期间基于首稿提前启动
+    scheduler = PhaseScheduler(pipeline=pipeline)
+    image_agent: Optional[ImageAgent] = None
 
-        # 保存研究结果
-        save_json(project_dir / "research.json", research.model_dump())
+    # 各 Agent 的 Reflexion 停止决策（评估提前停止节省的轮次）
+    reflexion_reports: dict = {}
 
-        print(f"\n✅ 研究完成:")
-        print(f"   - 实体: {len(research.entities)} 个")
-        print(f"   - 案例: {len(research.cases)} 个")
-        print(f"   - 关键词: {len(research.keywords)} 个")
-        print(f"   - 可信度: {research.credibility}")
-        print(f"   - 数据点: {research.data_points} 个")
+    try:
+        # ==================== Phase 1: 研究 ====================
+        async def research_phase(inputs: dict) -> ResearchResult:
+            note("=" * 60 + "\n📚 Phase 1: 小红书研究\n" + "=" * 60)
+            if "research" in reused:
+                note("   ⏩ 复用已完成的研究结果")
+                return reused["research"]
+
+            # 🔑 创建 Agent（MCP 工具已在构造时注册）
+            # 知识库只在研究期间使用，结束后关闭连接
+            knowledge_base = KnowledgeBase() if use_kb else None
+            try:
+                if knowledge_base is not None:
+                    ingested = knowledge_base.ingest()
+                    note(f"   📚 知识库已更新（新导入 {ingested} 个文件）")
+
+                research_agent = ResearchAgent(knowledge_base=knowledge_base)
+                note("   ✅ ResearchAgent 已创建（包含 Playwright MCP 工具）")
+
+                previous, watermark = None, None
+                if previous_dir:
+                    previous, watermark = load_previous_research(previous_dir, topic, audience)
+                    note(f"   📌 增量模式: 基于 {previous_dir}（水位线 {watermark.last_run_at}）")
+                elif incremental:
+                    note("   ℹ️ 未找到该主题的历史研究，执行完整研究")
+
+                # 热启动：同主题增量优先，否则合并相似主题的研究进入补缺模式
+                if warm_start and previous is None:
+                    similar = TopicIndex.from_posts().query(topic, audience, k=3)
+                    if similar:
+                        for item in similar:
+                            note(f"   🔗 相似主题: {item.run.topic}（{item.score:.2f}）{item.run.run_dir}")
+                        previous = warm_start_research(similar)
+                    else:
+                        note("   ℹ️ 未找到相似主题，执行完整研究")
+
+                research = await research_agent.research(
+                    topic, audience, previous=previous, watermark=watermark
+                )
+                reflexion_reports["research"] = research_agent.last_stopping
+            finally:
+                if knowledge_base is not None:
+                    knowledge_base.close()
+
+            # 保存研究结果和水位线（供下次增量研究使用）
+            artifacts.submit(project_dir / "research.json", research)
+            artifacts.submit(
+                project_dir / WATERMARK_FILE,
+                build_watermark(topic, audience, research, previous=watermark, run_at=run_at)
+            )
+
+            note(
+                f"\n✅ 研究完成:\n"
+                f"   - 实体: {len(research.entities)} 个\n"
+                f"   - 案例: {len(research.cases)} 个\n"
+                f"   - 关键词: {len(research.keywords)} 个\n"
+                f"   - 可信度: {research.credibility}\n"
+                f"   - 数据点: {research.data_points} 个"
+            )
+            return research
 
         # ==================== Phase 2: 内容创作 ====================
-        print("\n" + "=" * 60)
-        print("✍️  Phase 2: 内容创作")
-        print("=" * 60)
+        async def content_phase(inputs: dict) -> XHSContent:
+            note("\n" + "=" * 60 + "\n✍️  Phase 2: 内容创作\n" + "=" * 60)
+            if "content" in reused:
+                note("   ⏩ 复用已完成的内容")
+                return reused["content"]
+
+            content_agent = ContentAgent(
+                strategy=content_strategy,
+                candidates=candidates,
+                stream=stream,
+                partial_path=project_dir / PARTIAL_FILE,
+                on_draft=lambda draft: scheduler.publish("content", draft)
+            )
+            content = await content_agent.create_content(inputs["research"], topic)
+
+            # 保存内容和策略统计
+            artifacts.submit(project_dir / "content.json", content)
+            if content_agent.last_report:
+                artifacts.submit(
+                    project_dir / "content_report.json", content_agent.last_report.to_dict(), compress=compress_reports
+                )
+                reflexion_reports["content"] = content_agent.last_report.stopping
+
+            note(
+                f"\n✅ 内容创作完成:\n"
+                f"   - 标题: {content.title}\n"
+                f"   - 正文长度: {len(content.body)} 字\n"
+                f"   - 标签: {', '.join(content.hashtags)}"
+            )
+            return content
 
-        content_agent = ContentAgent()
-        content = await content_agent.create_content(research, topic)
+        # ==================== Phase 3: 配图生成（可选） ====================
+        async def image_warmup_phase(inputs: dict) -> bool:
+            # 预热失败不影响配图生成（Gemini 操作时会自行启动浏览器）
+            try:
+                await image_agent.warm_up()
+                return True
+            except Exception as e:
+                note(f"   ⚠️ Gemini 浏览器预热失败: {e}", LEVEL_WARNING)
+                return False
 
-        # 保存内容
-        save_json(project_dir / "content.json", content.model_dump())
+        async def image_prompts_phase(inputs: dict) -> dict:
+            try:
+                return await image_agent.prepare_prompts(inputs["content"], topic)
+            except Exception as e:
+                note(f"   ⚠️ 配图描述预生成失败: {e}", LEVEL_WARNING)
+                return {}
 
-        print(f"\n✅ 内容创作完成:")
-        print(f"   - 标题: {content.title}")
-        print(f"   - 正文长度: {len(content.body)} 字")
-        print(f"   - 标签: {', '.join(content.hashtags)}")
+        async def image_phase(inputs: dict) -> Optional[ImageResult]:
+            note("\n" + "=" * 60 + "\n🎨 Phase 3: 配图生成\n" + "=" * 60)
 
-        # ==================== Phase 3: 配图生成（可选） ====================
-        image_result = None
-        if generate_image:
-            print("\n" + "=" * 60)
-            print("🎨 Phase 3: 配图生成")
-            print("=" * 60)
+            if "image" in reused:
+                note("   ⏩ 复用已生成的配图")
+                return reused["image"]
 
             try:
-                image_agent = ImageAgent()
-                print("   ✅ ImageAgent 已创建（包含 Playwright MCP 工具）")
+                note("   ✅ ImageAgent 已创建（包含 Playwright MCP 工具）")
+                if inputs["image_prompts"]:
+                    note(f"   ⚡ 复用审核期间预生成的配图描述: {', '.join(inputs['image_prompts'])}")
 
                 image_result = await image_agent.generate_image(
-                    content=content,
-                    research=research,
+                    content=inputs["content"],
+                    research=inputs["research"],
                     topic=topic,
                     output_dir=project_dir
                 )
 
                 # 保存图片结果
-                save_json(project_dir / "image.json", image_result.model_dump())
-
-                print(f"\n✅ 配图生成完成:")
-                print(f"   - 生成数量: {image_result.total_count} 张")
+                artifacts.submit(project_dir / "image.json", image_result)
                 for img in image_result.images:
-                    print(f"   - {img.image_type}: {img.image_path}")
-                print(f"   - 生成时间: {image_result.generated_at}")
+                    if Path(img.image_path).exists():
+                        await artifacts.adopt(img.image_path)
+
+                note("\n".join([
+                    "\n✅ 配图生成完成:",
+                    f"   - 生成数量: {image_result.total_count} 张",
+                    *(f"   - {img.image_type}: {img.image_path}" for img in image_result.images),
+                    f"   - 生成时间: {image_result.generated_at}",
+                ]))
+                return image_result
 
             except Exception as e:
-                print(f"\n⚠️ 配图生成失败: {e}")
-                print("   继续完成其他步骤...")
-        else:
-            print("\n⏭️ 跳过配图生成（--no-image）")
+                note(f"\n⚠️ 配图生成失败: {e}\n   继续完成其他步骤...", LEVEL_WARNING)
+                return None
+
+        scheduler.add("research", profiler.wrap("research", research_phase))
+        scheduler.add("content", profiler.wrap("content", content_phase), deps=["research"])
+        if generate_image and "image" in reused:
+            scheduler.add("image", profiler.wrap("image", image_phase), deps=["research", "content"])
+        elif generate_image:
+            image_agent = ImageAgent()
+            # 浏览器预热与内容无关，首稿出现即可启动，永不过期
+            scheduler.add(
+                "image_warmup", profiler.wrap("image_warmup", image_warmup_phase), deps=["content"],
+                speculative=True, is_stale=lambda old, new: False
+            )
+            # 配图描述只依赖标题和正文，二者不变时投机结果有效
+            scheduler.add(
+                "image_prompts", profiler.wrap("image_prompts", image_prompts_phase), deps=["content"],
+                speculative=True, is_stale=_image_inputs_changed
+            )
+            scheduler.add(
+                "image", profiler.wrap("image", image_phase),
+                deps=["research", "content", "image_warmup", "image_prompts"]
+            )
+
+        results = await scheduler.run()
+        content: XHSContent = results["content"]
+        image_result: Optional[ImageResult] = results.get("image")
+        if not generate_image:
+            note("\n⏭️ 跳过配图生成（--no-image）")
+        # 以下报告直接打印，先输出队列中的进度事件
+        await bus.flush()
 
         # ==================== 完成 ====================
         # 注：审核已内置到各 Agent 的 Reflexion 循环中
         print("\n" + "=" * 60)
         print("🎉 工作流完成！")
         print("=" * 60)
+
+        scheduler.print_report()
+        router.print_report()
+        budget.print_report()
+        tool_metrics.print_report()
+        if memory is not None:
+            memory.print_report()
+        artifacts.submit(project_dir / "metrics.json", tool_metrics.report(), compress=compress_reports)
+        artifacts.submit(project_dir / "model_stats.json", {
+            **router.report(), "token_budget": budget.report(), "phases": scheduler.report(),
+            "reflexion": reflexion_reports
+        }, compress=compress_reports)
+        await artifacts.flush()
+        succeeded = True
+        if cache:
+            stats = cache.stats
+            print(
+                f"\n💾 LLM 缓存: 命中 {stats.hits}，未命中 {stats.misses}，"
+                f"节省 token {stats.saved_input_tokens}/{stats.saved_output_tokens}"
+            )
+
         print(f"\n输出文件:")
         print(f"   - {project_dir / 'research.json'}")
         print(f"   - {project_dir / 'content.json'}")
+        print(f"   - {project_dir / PROFILE_FILE}")
+        print(f"   - {project_dir / EVENTS_FILE}")
         if image_result:
             print(f"   - {project_dir / 'image.json'}")
             for img in image_result.images:
@@ -145,10 +425,369 @@ async def run_workflow(topic: str, audience: str, generate_image: bool = True) -
         print(f"{'─' * 60}")
 
     except Exception as e:
+        await bus.flush()
         print(f"\n❌ 错误: {e}")
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        if image_agent is not None:
+            await image_agent.close()
+        await bus.close()
+        await artifacts.flush()
+        # 失败的运行也写入画像，便于定位卡在哪个阶段
+        await artifacts.write(project_dir / PROFILE_FILE, profiler.report(
+            topic=topic, target_audience=audience, content_strategy=content_strategy,
+            model_routing=model_routing, pipeline=pipeline, artifacts=artifacts.stats.to_dict()
+        ))
+        run_index.finish_run(
+            run_id, STATUS_COMPLETED if succeeded else STATUS_FAILED, wall_time=round(time.perf_counter() - started, 3)
+        )
+        run_index.close()
+        if memory is not None:
+            memory.stop()
+        if trace:
+            trace.flush()
+            _print_trace_summary(trace.summary())
+
+
+def _print_trace_summary(summary: dict) -> None:
+    """打印 MCP 录制 / 回放统计"""
+    for label, stats in summary["servers"].items():
+        if summary["mode"] == "record":
+            print(
+                f"\n📼 MCP 录制 [{label}]: {stats['calls']} 次调用（错误 {stats['errors']}），"
+                f"结果 {stats['result_bytes'] / 1024:.0f}KB → 文件 {stats['stored_bytes'] / 1024:.0f}KB"
+            )
+        else:
+            print(
+                f"\n📼 MCP 回放 [{label}]: {stats['calls']} 次调用，精确匹配 {stats['exact']}，"
+                f"按工具名匹配 {stats['fallback']}，未命中 {stats['misses']}"
+            )
+
+
+def _image_inputs_changed(old: dict, new: dict) -> bool:
+    """配图描述的输入（标题、正文）是否变化"""
+    before, after = old["content"], new["content"]
+    return (before.title, before.body) != (after.title, after.body)
+
+
+def dedup_command(argv: list[str]) -> None:
+    """
+    子命令：对已有 posts/*/research.json 做实体/案例去重
+
+    Args:
+        argv: 子命令参数
+    """
+    from .utils.entity_dedup import dedupe_research
+    from .utils.file_ops import save_json
+    from .utils.research_table import ResearchTable
+
+    parser = argparse.ArgumentParser(
+        prog="xhs-agent dedup",
+        description="对已有研究结果做实体/案例去重（原地改写 research.json）"
+    )
+    parser.add_argument("posts_dir", nargs="?", default="posts", help="输出根目录（默认 posts）")
+    parser.add_argument("--dry-run", action="store_true", help="只统计，不改写文件")
+    args = parser.parse_args(argv)
+
+    total_removed = 0
+    posts_dir = Path(args.posts_dir)
+    for run_id, research in ResearchTable.from_posts(posts_dir):
+        deduped, stats = dedupe_research(research)
+        total_removed += stats.removed
+
+        path = posts_dir / run_id / "research.json"
+        print(
+            f"{'🧹' if stats.removed else '✅'} {run_id}: "
+            f"实体 {stats.entities_before} → {stats.entities_after}，"
+            f"案例 {stats.cases_before} → {stats.cases_after}"
+        )
+        if stats.removed and not args.dry_run:
+            save_json(path, deduped)
+
+    action = "可去除" if args.dry_run else "已去除"
+    print(f"\n{action} {total_removed} 个重复数据点")
+
+
+def kb_command(argv: list[str]) -> None:
+    """
+    子命令：知识库导入与检索
+
+    Args:
+        argv: 子命令参数
+    """
+    parser = argparse.ArgumentParser(
+        prog="xhs-agent kb",
+        description="跨运行研究知识库（SQLite FTS5）"
+    )
+    parser.add_argument("--posts-dir", default="posts", help="输出根目录（默认 posts）")
+    sub = parser.add_subparsers(dest="action", required=True)
+
+    sub.add_parser("ingest", help="增量导入 research.json / content.json")
+
+    search_parser = sub.add_parser("search", help="全文检索")
+    search_parser.add_argument("query", help="查询文本")
+    search_parser.add_argument("--kind", action="append", choices=["entity", "case", "summary", "content"],
+                               help="限定文档类型（可重复）")
+    search_parser.add_argument("--limit", type=int, default=10, help="返回条数")
+    search_parser.add_argument("--min-relevance", type=float, default=0.0,
+                               help="最低主题相关度 0-1（覆盖的查询词 IDF 权重占比，默认不过滤）")
+
+    args = parser.parse_args(argv)
+
+    from .utils.knowledge_base import KnowledgeBase
+
+    with KnowledgeBase(Path(args.posts_dir) / ".knowledge.sqlite") as kb:
+        ingested = kb.ingest(args.posts_dir)
+        if args.action == "ingest":
+            stats = kb.stats()
+            print(f"✅ 新导入 {ingested} 个文件")
+            print("   " + "，".join(f"{k}: {v}" for k, v in stats.items()))
+            return
+
+        start = time.perf_counter()
+        hits = kb.search(args.query, limit=args.limit, kinds=args.kind, min_relevance=args.min_relevance)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        print(f"🔍 {len(hits)} 条结果（{elapsed:.1f} ms）")
+        for hit in hits:
+            text = "；".join(str(v) for v in hit.payload.values() if v)
+            print(f"   [{hit.kind}] {hit.score:.2f}（相关度 {hit.relevance:.0%}） {hit.run_dir}: {text[:80]}")
+
+
+def similar_command(argv: list[str]) -> None:
+    """
+    子命令：检索相似主题的历史运行
+
+    Args:
+        argv: 子命令参数
+    """
+    parser = argparse.ArgumentParser(
+        prog="xhs-agent similar",
+        description="按主题和受众检索最相似的历史运行（字符 n-gram TF-IDF）"
+    )
+    parser.add_argument("topic", help="新主题")
+    parser.add_argument("--audience", default="", help="目标受众")
+    parser.add_argument("-k", type=int, default=3, help="返回数量")
+    parser.add_argument("--posts-dir", default="posts", help="输出根目录（默认 posts）")
+    args = parser.parse_args(argv)
+
+    from .utils.topic_index import TopicIndex
+
+    index = TopicIndex.from_posts(Path(args.posts_dir))
+    similar = index.query(args.topic, args.audience, k=args.k, min_score=0.01)
+    print(f"🔗 {len(similar)} 个相似运行（共 {len(index.runs)} 个历史运行）")
+    for item in similar:
+        print(f"   {item.score:.2f}  {item.run.topic} / {item.run.target_audience or '-'}  {item.run.run_dir}")
+
+
+def prompt_tokens_command(argv: list[str]) -> None:
+    """
+    子命令：比较研究数据/内容在提示词中的 JSON 与紧凑格式的 token 数
+
+    Args:
+        argv: 子命令参数
+    """
+    from .models.schemas import ResearchResult, XHSContent
+    from .utils.file_ops import load_model
+    from .utils.llm_usage import estimate_tokens
+    from .utils.prompt_format import format_content, format_research
+
+    parser = argparse.ArgumentParser(
+        prog="xhs-agent prompt-tokens",
+        description="比较 model_dump_json(indent=2) 与紧凑格式的 token 数"
+    )
+    parser.add_argument("posts_dir", nargs="?", default="posts", help="输出根目录（默认 posts）")
+    parser.add_argument("--api", action="store_true", help="调用 Anthropic count_tokens 精确计数（默认本地估算）")
+    parser.add_argument("--model", default="claude-sonnet-4-20250514", help="--api 计数使用的模型")
+    args = parser.parse_args(argv)
+
+    samples = []
+    for run_dir in sorted(Path(args.posts_dir).iterdir()):
+        if (run_dir / "research.json").exists():
+            research = load_model(run_dir / "research.json", ResearchResult)
+            samples.append((run_dir.name, "research", research.model_dump_json(indent=2), format_research(research)))
+        if (run_dir / "content.json").exists():
+            content = load_model(run_dir / "content.json", XHSContent)
+            samples.append((run_dir.name, "content", content.model_dump_json(indent=2), format_content(content)))
+
+    if not samples:
+        print("未找到 research.json / content.json")
+        return
+
+    if args.api:
+        from anthropic import AsyncAnthropic
+
+        client = AsyncAnthropic()
+
+        async def count(text: str) -> int:
+            result = await client.messages.count_tokens(
+                model=args.model, messages=[{"role": "user", "content": text}]
+            )
+            return result.input_tokens
+
+        async def count_all() -> list[tuple[int, int]]:
+            return [(await count(full), await count(compact)) for _, _, full, compact in samples]
+
+        counts = asyncio.run(count_all())
+    else:
+        counts = [(estimate_tokens(full), estimate_tokens(compact)) for _, _, full, compact in samples]
+
+    print(f"{'运行':<40} {'类型':<8} {'JSON':>7} {'紧凑':>7} {'节省':>6}")
+    totals = {}
+    for (run, kind, _, _), (full, compact) in zip(samples, counts):
+        saving = 1 - compact / full if full else 0.0
+        print(f"{run:<40} {kind:<8} {full:>7} {compact:>7} {saving:>6.1%}")
+        total_full, total_compact = totals.get(kind, (0, 0))
+        totals[kind] = (total_full + full, total_compact + compact)
+
+    method = "Anthropic count_tokens" if args.api else "本地估算"
+    print(f"\n合计（{method}）:")
+    for kind, (full, compact) in totals.items():
+        print(f"   - {kind}: {full} → {compact}（节省 {1 - compact / full:.1%}）")
+
+
+def profile_command(argv: list[str]) -> None:
+    """
+    子命令：比较多次运行的 run_profile.json，找出退化的阶段
+
+    Args:
+        argv: 子命令参数
+    """
+    from .utils.run_profile import DEFAULT_THRESHOLD, PROFILE_FILE, compare_profiles, load_profiles
+
+    parser = argparse.ArgumentParser(
+        prog="xhs-agent profile",
+        description="逐阶段比较运行画像（最新一次运行对比之前运行的中位数）"
+    )
+    parser.add_argument("posts_dir", nargs="?", default="posts", help="输出根目录（默认 posts）")
+    parser.add_argument("--topic", help="只比较该主题的运行")
+    parser.add_argument("--last", type=int, default=10, help="参与比较的最近运行数（默认 10）")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="判定退化的相对增幅（默认 0.2 即 20%%）")
+    args = parser.parse_args(argv)
+
+    profiles = load_profiles(args.posts_dir, args.topic)[-args.last:]
+    if not profiles:
+        print(f"未找到 {PROFILE_FILE}")
+        return
+
+    phases = list(dict.fromkeys(name for profile in profiles for name in profile["phases"]))
+    print(f"{'运行':<40} {'总耗时':>8} {'调用':>5} {'输入':>8} {'输出':>7} {'成本$':>7}  " + " ".join(f"{p:>12}" for p in phases))
+    for profile in profiles:
+        totals, llm = profile["totals"], profile["totals"]["llm"]
+        walls = " ".join(
+            f"{profile['phases'][p]['wall_time']:>11.1f}s" if p in profile["phases"] else f"{'-':>12}"
+            for p in phases
+        )
+        print(
+            f"{profile['run_dir']:<40} {totals['wall_time']:>7.1f}s {llm['calls']:>5} "
+            f"{llm['input_tokens']:>8} {llm['output_tokens']:>7} {llm['cost']:>7.3f}  {walls}"
+        )
+
+    if len(profiles) < 2:
+        return
+    latest, baseline = profiles[-1], profiles[:-1]
+    regressions = compare_profiles(latest, baseline, args.threshold)
+    if not regressions:
+        print(f"\n✅ {latest['run_dir']} 相对之前 {len(baseline)} 次运行的中位数无退化（阈值 {args.threshold:.0%}）")
+        return
+    print(f"\n⚠️ {latest['run_dir']} 相对之前 {len(baseline)} 次运行的中位数出现退化（阈值 {args.threshold:.0%}）:")
+    for item in regressions:
+        change = f"+{item['change']:.0%}" if item["change"] is not None else "新增"
+        print(f"   - {item['phase']}.{item['metric']}: {item['baseline']} → {item['latest']}（{change}）")
+
+
+def runs_command(argv: list[str]) -> None:
+    """
+    子命令：查询运行索引（posts/.runs.sqlite），回填已有运行目录
+
+    Args:
+        argv: 子命令参数
+    """
+    parser = argparse.ArgumentParser(
+        prog="xhs-agent runs",
+        description="运行索引：列出 / 查看运行，回填已有 posts/ 目录（产物纳入内容寻址存储去重）"
+    )
+    parser.add_argument("--posts-dir", default="posts", help="输出根目录（默认 posts）")
+    sub = parser.add_subparsers(dest="action", required=True)
+
+    list_parser = sub.add_parser("list", help="按时间倒序列出运行")
+    list_parser.add_argument("--topic", help="只列出该主题")
+    list_parser.add_argument("--audience", help="只列出该受众")
+    list_parser.add_argument("--status", choices=["running", "completed", "failed"], help="只列出该状态")
+    list_parser.add_argument("--limit", type=int, default=20, help="返回条数")
+
+    show_parser = sub.add_parser("show", help="查看运行的阶段、评分和产物")
+    show_parser.add_argument("run_id", help="运行标识（输出目录名）")
+
+    sub.add_parser("reindex", help="登记索引中没有的运行目录，产物纳入存储")
+    sub.add_parser("stats", help="运行数和产物去重统计")
+
+    args = parser.parse_args(argv)
+
+    from .utils.artifact_store import ArtifactStore
+    from .utils.incremental import safe_topic_name
+    from .utils.run_index import INDEX_FILE, RunIndex
+
+    posts_dir = Path(args.posts_dir)
+    with RunIndex(posts_dir / INDEX_FILE) as index:
+        if args.action == "reindex":
+            added = index.reindex(posts_dir, ArtifactStore(posts_dir / ".store"))
+            print(f"✅ 新登记 {added} 个运行")
+            args.action = "stats"
+
+        if args.action == "stats":
+            stats = index.stats()
+            saved = stats["bytes"] - stats["stored_bytes"]
+            print(
+                f"📇 运行 {stats['runs']} 个，产物 {stats['artifacts']} 个 → 对象 {stats['objects']} 个，"
+                f"{stats['bytes'] / 1024:.0f}KB → {stats['stored_bytes'] / 1024:.0f}KB（去重节省 {saved / 1024:.0f}KB）"
+            )
+            return
+
+        if args.action == "show":
+            run = index.get(args.run_id)
+            if run is None:
+                print(f"未找到运行 {args.run_id}")
+                return
+            print(f"📁 {run.run_dir}（{run.status}）")
+            print(f"   主题: {run.topic}  受众: {run.audience or '-'}")
+            print(f"   开始: {run.started_at}  结束: {run.finished_at or '-'}  耗时: {run.wall_time or '-'}s")
+            print("   评分: " + "，".join(f"{k} {v:.1f}" for k, v in run.scores.items() if v is not None))
+            print("   提示词: " + "，".join(f"{k}@{v}" for k, v in run.prompt_versions.items()))
+            print("   阶段:")
+            for phase in index.phases(run.run_id).values():
+                duration = f"{phase.duration:.1f}s" if phase.duration is not None else "-"
+                print(f"      - {phase.name}: {phase.status}（{duration}{'，' + phase.outcome if phase.outcome else ''}）")
+            print("   产物:")
+            for name, digest in sorted(index.artifacts(run.run_id).items()):
+                print(f"      - {name}: {digest[:12]}")
+            return
+
+        start = time.perf_counter()
+        runs = index.list_runs(
+            safe_topic=safe_topic_name(args.topic) if args.topic else None,
+            audience=args.audience, status=args.status, limit=args.limit
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+
+    print(f"📇 {len(runs)} 个运行（{elapsed:.1f} ms）")
+    for run in runs:
+        scores = " ".join(f"{v:>5.1f}" if v is not None else f"{'-':>5}" for v in run.scores.values())
+        print(f"   {run.run_id:<40} {run.status:<10} {run.audience or '-':<8} 评分 {scores}")
+
+
+# 子命令表（第一个参数匹配时分发，否则运行工作流）
+COMMANDS = {
+    "dedup": dedup_command,
+    "kb": kb_command,
+    "similar": similar_command,
+    "prompt-tokens": prompt_tokens_command,
+    "profile": profile_command,
+    "runs": runs_command,
+}
 
 
 def main():
@@ -156,6 +795,11 @@ def main():
     # 加载环境变量
     load_dotenv()
 
+    # 子命令分发
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+
     # 解析命令行参数
     parser = argparse.ArgumentParser(
         description="小红书内容创作工具（Pydantic-AI）",
@@ -164,19 +808,30 @@ def main():
 示例:
   python -m src.main --topic "西安公司避坑指南" --audience "求职者"
   python -m src.main --topic "成都美食探店" --audience "吃货"
+  python -m src.main --topic "西安公司避坑指南" --audience "求职者" --incremental
+  python -m src.main --topic "西安公司避坑指南" --audience "求职者" --content-strategy parallel --candidates 3
+
+子命令:
+  python -m src.main dedup [posts_dir] [--dry-run]   对已有研究结果去重
+  python -m src.main kb ingest                       增量导入知识库
+  python -m src.main kb search "博彦 加班"            检索历史实体和案例
+  python -m src.main similar "西安求职避坑" --audience 求职者   检索相似主题
+  python -m src.main prompt-tokens [posts_dir] [--api]   比较提示词 JSON / 紧凑格式的 token 数
+  python -m src.main profile [posts_dir] [--topic T]      逐阶段比较运行画像，找出退化的阶段
+  python -m src.main runs list [--topic T] [--status failed]   从运行索引列出运行
+  python -m src.main runs reindex                    把已有运行目录登记到索引并去重产物
+  python -m src.main --resume 20260102-031405-西安公司避坑指南   恢复运行，复用已完成阶段
         """
     )
 
     parser.add_argument(
         "--topic",
-        required=True,
-        help="研究主题（如：西安公司避坑指南）"
+        help="研究主题（如：西安公司避坑指南；--resume 时可省略）"
     )
 
     parser.add_argument(
         "--audience",
-        required=True,
-        help="目标受众（如：求职者）"
+        help="目标受众（如：求职者；--resume 时可省略）"
     )
 
     parser.add_argument(
@@ -185,14 +840,145 @@ def main():
         help="跳过配图生成步骤"
     )
 
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="增量研究：基于该主题上次的 research.json，只抓取之后的新笔记和评论"
+    )
+
+    parser.add_argument(
+        "--use-kb",
+        action="store_true",
+        help="使用本地知识库（posts/.knowledge.sqlite）预置历史实体和案例"
+    )
+
+    parser.add_argument(
+        "--warm-start",
+        action="store_true",
+        help="基于相似主题的历史研究热启动，只补齐缺口（补缺模式）"
+    )
+
+    parser.add_argument(
+        "--content-strategy",
+        choices=["sequential", "parallel"],
+        default="sequential",
+        help="内容创作策略：sequential 单稿串行修订；parallel 并发生成多个候选稿取最优（默认 sequential）"
+    )
+
+    parser.add_argument(
+        "--candidates",
+        type=int,
+        default=3,
+        help="parallel 策略的候选稿数量（默认 3）"
+    )
+
+    parser.add_argument(
+        "--model-routing",
+        choices=["tiered", "strong"],
+        default="tiered",
+        help="模型路由：tiered 审核/提示词生成用快速模型，临界时升级；strong 全部使用强模型（默认 tiered）"
+    )
+
+    parser.add_argument(
+        "--llm-cache",
+        choices=["off", "read", "record", "replay"],
+        default="off",
+        help="LLM 响应缓存（.cache/llm_responses.sqlite）：read 读穿透；record 总是调用 API 并写入；replay 只读，未命中报错（默认 off）"
+    )
+
+    parser.add_argument(
+        "--llm-cache-ttl",
+        type=float,
+        default=None,
+        help="LLM 缓存过期时间（小时，默认永不过期）"
+    )
+
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="流式生成内容：标题和正文实时打印并写入 content.partial.json"
+    )
+
+    parser.add_argument(
+        "--no-pipeline",
+        action="store_true",
+        help="关闭阶段流水线：等内容定稿后再预热 Gemini、生成配图描述"
+    )
+
+    parser.add_argument(
+        "--mcp-trace",
+        choices=["off", "record", "replay"],
+        default="off",
+        help="Playwright MCP 流量：record 录制每次工具调用和结果；replay 不启动浏览器，回放录制结果（默认 off）"
+    )
+
+    parser.add_argument(
+        "--mcp-trace-dir",
+        type=Path,
+        default=None,
+        help="MCP 录制目录（默认 .cache/mcp_traces，每个 Server 一个 <label>.jsonl.gz）"
+    )
+
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="控制台同时显示阶段起止、工具调用等结构化进度事件（events.jsonl 始终记录全部事件）"
+    )
+
+    parser.add_argument(
+        "--memory-profile",
+        action="store_true",
+        help="在阶段 / Reflexion 轮次边界拍 tracemalloc 快照，按消息历史 / 工具结果 / 图片缓冲归类写入 run_profile.json"
+    )
+
+    parser.add_argument(
+        "--no-telemetry",
+        action="store_true",
+        help="不配置 Logfire、不为 pydantic-ai 插桩（默认未设置 LOGFIRE_TOKEN 时只在本地记录）"
+    )
+
+    parser.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="恢复运行（输出目录名）：沿用其主题、受众和目录，复用运行索引中已完成阶段的产物"
+    )
+
+    parser.add_argument(
+        "--compress-reports",
+        action="store_true",
+        help="超过 256KB 的诊断报告（metrics / model_stats / content_report）gzip 压缩为 .json.gz"
+    )
+
     args = parser.parse_args()
+    if not args.resume and (not args.topic or not args.audience):
+        parser.error("需要 --topic 和 --audience（或 --resume RUN_ID）")
+
+    # 参数校验通过后才配置 Logfire（--help 和参数错误不加载 OpenTelemetry）
+    from .utils.telemetry import configure_telemetry
+    configure_telemetry(enabled=not args.no_telemetry)
 
     # 运行工作流
     try:
         asyncio.run(run_workflow(
             args.topic,
             args.audience,
-            generate_image=not args.no_image
+            generate_image=not args.no_image,
+            incremental=args.incremental,
+            use_kb=args.use_kb,
+            warm_start=args.warm_start,
+            content_strategy=args.content_strategy,
+            candidates=args.candidates,
+            model_routing=args.model_routing,
+            llm_cache=args.llm_cache,
+            llm_cache_ttl=args.llm_cache_ttl,
+            stream=args.stream,
+            pipeline=not args.no_pipeline,
+            mcp_trace=args.mcp_trace,
+            mcp_trace_dir=args.mcp_trace_dir,
+            memory_profile=args.memory_profile,
+            verbose=args.verbose,
+            compress_reports=args.compress_reports,
+            resume=args.resume
         ))
     except KeyboardInterrupt:
         print("\n\n⚠️  用户中断")
@@ -2,19 +2,68 @@
 Pydantic 数据模型
 定义研究结果和内容的数据结构
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_serializer
 from typing import List, Optional, Dict, Any
 
 
+class ResearchRow(BaseModel):
+    """
+    研究结果中的一行（实体 / 案例）
+
+    声明的字段都可省略，模型返回的其他字段原样保留；序列化时只输出输入中出现过
+    或之后赋值的字段（未出现的字段不写成 null），保存的 JSON 与原数据一致
+    """
+
+    class Config:
+        extra = "allow"
+
+    @model_serializer(mode="wrap")
+    def _dump_present(self, handler: Any) -> Dict[str, Any]:
+        data = handler(self)
+        declared = type(self).model_fields
+        return {key: value for key, value in data.items() if key in self.model_fields_set or key not in declared}
+
+
+class Entity(ResearchRow):
+    """研究实体（ResearchResult.entities 的行类型）"""
+
+    type: Optional[str] = Field(default=None, description="实体类型（company/price/...）")
+    name: Optional[str] = Field(default=None, description="实体名称")
+    issue: Optional[str] = Field(default=None, description="相关问题")
+    aliases: Optional[List[str]] = Field(default=None, description="去重合并的其他写法")
+
+    class Config:
+        extra = "allow"
+        json_schema_extra = {
+            "example": {"type": "company", "name": "某科技公司", "issue": "加班严重"}
+        }
+
+
+class Case(ResearchRow):
+    """具体案例（ResearchResult.cases 的行类型）"""
+
+    company: Optional[str] = Field(default=None, description="涉及的公司")
+    experience: Optional[str] = Field(default=None, description="经历描述")
+    details: Optional[str] = Field(default=None, description="细节")
+    issue: Optional[str] = Field(default=None, description="问题")
+    source: Optional[str] = Field(default=None, description="来源（笔记 / 评论）")
+
+    class Config:
+        extra = "allow"
+        json_schema_extra = {
+            "example": {"company": "某科技", "experience": "试用期不交社保"}
+        }
+
+
 class ResearchResult(BaseModel):
     """小红书研究结果"""
 
     summary: str = Field(description="研究总结")
-    entities: List[Dict[str, Any]] = Field(
+    entities: List[Entity] = Field(
         default_factory=list,
         description="提取的实体（公司、价格等）"
     )
-    cases: List[Dict[str, Any]] = Field(
+    cases: List[Case] = Field(
         default_factory=list,
         description="具体案例"
     )
@@ -30,6 +79,10 @@ class ResearchResult(BaseModel):
         default=0,
         description="收集的数据点数量"
     )
+    note_ids: List[str] = Field(
+        default_factory=list,
+        description="已浏览的笔记 ID（增量研究水位线）"
+    )
 
     class Config:
         json_schema_extra = {
@@ -43,7 +96,33 @@ class ResearchResult(BaseModel):
                 ],
                 "keywords": ["避坑", "西安", "公司"],
                 "credibility": "high",
-                "data_points": 15
+                "data_points": 15,
+                "note_ids": ["6769a1b2000000001300c2d1"]
+            }
+        }
+
+
+class CrawlWatermark(BaseModel):
+    """增量研究水位线（记录上次研究的进度）"""
+
+    topic: str = Field(description="研究主题")
+    target_audience: str = Field(
+        default="",
+        description="目标受众"
+    )
+    last_run_at: str = Field(description="上次研究时间（ISO 格式）")
+    seen_note_ids: List[str] = Field(
+        default_factory=list,
+        description="已浏览的笔记 ID"
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "topic": "西安公司避坑指南",
+                "target_audience": "求职者",
+                "last_run_at": "2026-01-02T03:26:38",
+                "seen_note_ids": ["6769a1b2000000001300c2d1"]
             }
         }
 
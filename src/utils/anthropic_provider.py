@@ -6,14 +6,19 @@ Anthropic Model 工厂
 - 支持 Retry-After header
 - 指数退避策略
 - 处理 429/5xx 错误
+
+启用 LLM 响应缓存（llm_cache.configure_llm_cache）时返回带缓存的模型包装
 """
 import os
 from httpx import AsyncClient, HTTPStatusError
 from tenacity import retry_if_exception_type, stop_after_attempt, wait_exponential
 from anthropic import AsyncAnthropic
 from pydantic_ai.providers.anthropic import AnthropicProvider
+from pydantic_ai.models import Model
 from pydantic_ai.models.anthropic import AnthropicModel
 from pydantic_ai.retries import AsyncTenacityTransport, RetryConfig, wait_retry_after
+from .llm_cache import CachedModel, get_llm_cache
+from .run_profile import RETRY_TRANSPORT, get_run_profiler
 
 
 # 全局共享的 Provider 实例（避免重复创建）
@@ -29,6 +34,7 @@ def _create_retrying_http_client() -> AsyncClient:
     - 指数退避（fallback）：1s, 2s, 4s... 最大 60s
     - 最大重试 5 次
     - 最大等待 300s
+    - 每次重试计入运行画像（run_profile）
     """
     def should_retry_status(response):
         """检查响应状态码，决定是否重试"""
@@ -43,6 +49,7 @@ def _create_retrying_http_client() -> AsyncClient:
                 max_wait=300
             ),
             stop=stop_after_attempt(5),
+            before_sleep=lambda _: get_run_profiler().record_retry(RETRY_TRANSPORT),
             reraise=True
         ),
         validate_response=should_retry_status
@@ -52,7 +59,7 @@ def _create_retrying_http_client() -> AsyncClient:
 
 def get_anthropic_model(
     model_name: str = "claude-sonnet-4-20250514"
-) -> AnthropicModel:
+) -> Model:
     """
     获取配置好重试机制的 Anthropic Model
 
@@ -64,7 +71,7 @@ def get_anthropic_model(
         model_name: 模型名称（默认 claude-sonnet-4-20250514）
 
     Returns:
-        AnthropicModel 实例
+        AnthropicModel 实例（启用响应缓存时为 CachedModel 包装）
     """
     global _shared_provider
 
@@ -85,4 +92,7 @@ def get_anthropic_model(
         _shared_provider = AnthropicProvider(anthropic_client=client)
 
     # 使用共享的 Provider 创建 Model
-    return AnthropicModel(model_name, provider=_shared_provider)
+    model = AnthropicModel(model_name, provider=_shared_provider)
+
+    cache = get_llm_cache()
+    return CachedModel(model, cache) if cache is not None else model
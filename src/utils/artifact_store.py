@@ -0,0 +1,166 @@
+"""
+内容寻址产物存储
+产物按 SHA-256 存入 posts/.store/objects/<摘要前两位>/<摘要>，内容相同的产物
+（重复的研究结果、回放生成的相同图片）只存一份
+
+- 运行目录 posts/<时间戳>-<主题>/ 保留为兼容视图，其中的文件是对象的硬链接（不支持硬链接时复制）
+- 视图文件只通过原子替换更新（save_json / ArtifactWriter），替换后链接断开，对象本身不会被改写
+- 只纳入白名单中的产物：events.jsonl 追加写入、content.partial.json 流式覆盖，与对象共享 inode
+  会改写对象内容（与摘要不符），永不纳入
+- 只做文件操作，可在线程池中调用；运行与产物的对应关系记录在 RunIndex
+"""
+import hashlib
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Optional, Tuple
+
+from .file_ops import GZIP_SUFFIX
+
+# 默认存储位置（放在 posts/ 下，随输出一起管理）
+DEFAULT_STORE_DIR = Path("posts") / ".store"
+
+# 分块读取大小（计算大文件摘要）
+_CHUNK = 1024 * 1024
+
+# 可纳入存储的产物（只会被整体原子替换，压缩产物按去掉 .gz 后的名称判断）
+STORED_FILES = frozenset({
+    "research.json", "content.json", "image.json", "watermark.json",
+    "content_report.json", "metrics.json", "model_stats.json", "run_profile.json",
+})
+
+# 可纳入存储的图片（下载后不再修改）
+STORED_IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".webp")
+
+
+def digest_bytes(data: bytes) -> str:
+    """内容摘要（SHA-256 十六进制）"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def digest_file(path: Path | str) -> str:
+    """文件内容摘要（SHA-256 十六进制）"""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_CHUNK):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def is_storable(path: Path | str) -> bool:
+    """
+    文件是否可纳入存储（按文件名白名单）
+
+    Args:
+        path: 文件路径或文件名
+
+    Returns:
+        是否为只会被整体替换的产物
+    """
+    name = Path(path).name
+    if name.endswith(GZIP_SUFFIX):
+        name = name[:-len(GZIP_SUFFIX)]
+    return name in STORED_FILES or name.lower().endswith(STORED_IMAGE_SUFFIXES)
+
+
+def _replace_with(source: Path, dest: Path) -> None:
+    """用 source 的硬链接（不支持时为副本）原子替换 dest"""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        try:
+            os.link(source, tmp)
+        except OSError:
+            shutil.copyfile(source, tmp)
+        os.replace(tmp, dest)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+class ArtifactStore:
+    """内容寻址的产物对象存储"""
+
+    def __init__(self, root: Path | str = DEFAULT_STORE_DIR):
+        """
+        初始化存储
+
+        Args:
+            root: 存储根目录（对象位于 root/objects）
+        """
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+
+    def object_path(self, digest: str) -> Path:
+        """对象文件路径"""
+        return self.objects_dir / digest[:2] / digest
+
+    def has(self, digest: str) -> bool:
+        """对象是否已存在"""
+        return self.object_path(digest).exists()
+
+    def adopt(self, path: Path | str, digest: Optional[str] = None) -> Tuple[str, int, bool]:
+        """
+        把已写好的文件纳入存储
+
+        对象已存在时，用对象的硬链接替换该文件（重复内容只保留一份）；
+        否则把该文件硬链接（或复制）为新对象
+
+        Args:
+            path: 视图中的文件
+            digest: 已知的内容摘要（省略时读取文件计算）
+
+        Returns:
+            (摘要, 字节数, 是否与已有对象重复)
+
+        Raises:
+            ValueError: 文件不在可纳入的白名单中（追加写入的文件会改写共享的对象）
+        """
+        path = Path(path)
+        if not is_storable(path):
+            raise ValueError(f"不可纳入存储的文件: {path.name}")
+        digest = digest or digest_file(path)
+        obj = self.object_path(digest)
+        size = path.stat().st_size
+
+        if not obj.exists():
+            obj.parent.mkdir(parents=True, exist_ok=True)
+            tmp = obj.with_name(f".{digest}.{uuid.uuid4().hex[:8]}.tmp")
+            try:
+                try:
+                    os.link(path, tmp)
+                except OSError:
+                    shutil.copyfile(path, tmp)
+                # 并发纳入相同内容时以先完成的为准
+                os.replace(tmp, obj)
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+            return digest, size, False
+
+        if not os.path.samefile(obj, path):
+            _replace_with(obj, path)
+        return digest, size, True
+
+    def materialize(self, digest: str, dest: Path | str) -> Path:
+        """
+        把对象放到视图路径（恢复运行目录中缺失的文件）
+
+        Args:
+            digest: 内容摘要
+            dest: 目标路径
+
+        Returns:
+            目标路径
+        """
+        obj = self.object_path(digest)
+        if not obj.exists():
+            raise FileNotFoundError(f"对象不存在: {digest}")
+        dest = Path(dest)
+        _replace_with(obj, dest)
+        return dest
+
+    def read_bytes(self, digest: str) -> bytes:
+        """读取对象内容"""
+        return self.object_path(digest).read_bytes()
@@ -0,0 +1,183 @@
+"""
+异步产物写入
+工作流在事件循环中保存 research.json、content.json 等产物，写入不应阻塞其他协程：
+
+- 序列化：pydantic-core 直接把模型 / 字典序列化为 UTF-8 字节（不经过 model_dump 中间字典）
+- 写入：线程池中写临时文件、刷盘后原子替换（file_ops.write_atomic）
+- 压缩：指定 compress 且超过阈值的产物 gzip 压缩为 <name>.gz（load_json / load_model 自动回退读取），
+  同时删除另一种格式的旧文件，避免读到过期内容
+- 同一路径的写入按提交顺序完成；flush 等待所有已提交的写入
+- 指定 store 时写入后把白名单中的产物纳入内容寻址存储（相同内容只存一份），并通过 on_stored 回调登记摘要
+"""
+import asyncio
+import gzip
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from .artifact_store import ArtifactStore, digest_bytes, is_storable
+from .file_ops import GZIP_SUFFIX, dump_json_bytes, write_atomic
+
+# 超过此大小（字节）且指定 compress 时压缩
+COMPRESS_THRESHOLD = 256 * 1024
+
+# gzip 压缩级别（产物以文本为主，6 级在速度和压缩率之间较均衡）
+GZIP_LEVEL = 6
+
+
+@dataclass
+class WriteStats:
+    """写入统计"""
+
+    files: int = 0
+    json_bytes: int = 0  # 序列化后的字节数
+    stored_bytes: int = 0  # 落盘字节数（压缩后）
+    compressed: int = 0
+    deduplicated: int = 0  # 与存储中已有对象内容相同的文件数
+    serialize_time: float = 0.0  # 事件循环中序列化的耗时
+    io_time: float = 0.0  # 线程池中压缩 + 写入的耗时
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化字典"""
+        return {
+            "files": self.files,
+            "json_bytes": self.json_bytes,
+            "stored_bytes": self.stored_bytes,
+            "compressed": self.compressed,
+            "deduplicated": self.deduplicated,
+            "serialize_time": round(self.serialize_time, 4),
+            "io_time": round(self.io_time, 4),
+        }
+
+
+class ArtifactWriter:
+    """异步原子写入 JSON 产物"""
+
+    def __init__(
+        self,
+        compress_over: int = COMPRESS_THRESHOLD,
+        fsync: bool = True,
+        store: Optional[ArtifactStore] = None,
+        on_stored: Optional[Callable[[Path, str, int], None]] = None
+    ):
+        """
+        初始化写入器
+
+        Args:
+            compress_over: 指定 compress 时超过此大小才压缩（字节）
+            fsync: 替换前是否刷盘
+            store: 内容寻址存储（None 时只写运行目录）
+            on_stored: 纳入存储后在事件循环中回调 (路径, 摘要, 字节数)
+        """
+        self.compress_over = compress_over
+        self.fsync = fsync
+        self.store = store
+        self.on_stored = on_stored
+        self.stats = WriteStats()
+        self._locks: Dict[Path, asyncio.Lock] = {}
+        self._pending: Set[asyncio.Task] = set()
+
+    def _store(self, path: Path, payload: bytes, compress: bool) -> Tuple[Path, int, float, Optional[str], bool]:
+        """
+        线程池中执行：压缩、原子写入、清理另一种格式的旧文件并纳入存储，
+        返回 (路径, 落盘字节数, 耗时, 摘要, 是否重复)
+        """
+        started = time.perf_counter()
+        packed = path.with_name(path.name + GZIP_SUFFIX)
+        if compress:
+            payload = gzip.compress(payload, compresslevel=GZIP_LEVEL, mtime=0)
+            target, stale = packed, path
+        else:
+            target, stale = path, packed
+        write_atomic(target, payload, fsync=self.fsync)
+        stale.unlink(missing_ok=True)
+
+        digest, duplicate = None, False
+        if self.store is not None and is_storable(target):
+            digest, _, duplicate = self.store.adopt(target, digest_bytes(payload))
+        return target, len(payload), time.perf_counter() - started, digest, duplicate
+
+    def _stored(self, target: Path, digest: Optional[str], size: int, duplicate: bool) -> None:
+        """事件循环中登记纳入存储的产物"""
+        if digest is None:
+            return
+        self.stats.deduplicated += duplicate
+        if self.on_stored is not None:
+            self.on_stored(target, digest, size)
+
+    def _serialize(self, data: Any) -> bytes:
+        """在事件循环中序列化（之后修改 data 不影响写入内容）"""
+        started = time.perf_counter()
+        payload = dump_json_bytes(data)
+        self.stats.serialize_time += time.perf_counter() - started
+        self.stats.json_bytes += len(payload)
+        return payload
+
+    async def _write_payload(self, path: Path, payload: bytes, compress: bool) -> Path:
+        """按路径串行地在线程池中写入"""
+        compress = compress and len(payload) >= self.compress_over
+        lock = self._locks.setdefault(path, asyncio.Lock())
+        async with lock:
+            target, stored, elapsed, digest, duplicate = await asyncio.to_thread(
+                self._store, path, payload, compress
+            )
+        self.stats.files += 1
+        self.stats.stored_bytes += stored
+        self.stats.io_time += elapsed
+        self._stored(target, digest, stored, duplicate)
+        self.stats.compressed += compress
+        return target
+
+    async def write(self, path: Path | str, data: Any, compress: bool = False) -> Path:
+        """
+        序列化并写入 JSON 产物
+
+        Args:
+            path: 目标路径（压缩时实际写入 <path>.gz）
+            data: Pydantic 模型、字典或列表
+            compress: 超过 compress_over 时是否压缩
+
+        Returns:
+            实际写入的文件路径
+        """
+        return await self._write_payload(Path(path), self._serialize(data), compress)
+
+    def submit(self, path: Path | str, data: Any, compress: bool = False) -> asyncio.Task:
+        """
+        提交写入但不等待（序列化在提交时完成，flush 时统一等待）
+
+        Args:
+            path: 目标路径
+            data: Pydantic 模型、字典或列表
+            compress: 超过 compress_over 时是否压缩
+
+        Returns:
+            写入任务
+        """
+        task = asyncio.create_task(self._write_payload(Path(path), self._serialize(data), compress))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return task
+
+    async def adopt(self, path: Path | str) -> Optional[str]:
+        """
+        把已在运行目录中的文件（如下载的图片）纳入存储
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            内容摘要（未配置存储或文件不在白名单中时为 None）
+        """
+        path = Path(path)
+        if self.store is None or not is_storable(path):
+            return None
+        digest, size, duplicate = await asyncio.to_thread(self.store.adopt, path)
+        self._stored(path, digest, size, duplicate)
+        return digest
+
+    async def flush(self) -> None:
+        """等待所有已提交的写入完成（任一写入失败时抛出其异常）"""
+        if self._pending:
+            await asyncio.gather(*list(self._pending))
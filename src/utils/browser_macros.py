@@ -0,0 +1,308 @@
+"""
+小红书浏览器宏工具
+把"搜索 → 排序 → 打开笔记 → 展开评论"等多步浏览器操作封装成单个函数工具
+
+宏在本地通过同一个 Playwright MCP Server 连续调用 browser_navigate /
+browser_evaluate，只把精简的结构化结果返回给模型，
+一次工具调用代替几十轮 snapshot/click/scroll
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+from pydantic_ai import ModelRetry
+from pydantic_ai.mcp import MCPServer
+from pydantic_ai.toolsets import FunctionToolset
+
+XHS_SEARCH_URL = "https://www.xiaohongshu.com/search_result?keyword={keyword}&source=web_search_result_notes"
+
+# 排序方式 → 小红书筛选面板中的选项文字
+SORT_LABELS = {
+    "general": "综合",
+    "latest": "最新",
+    "likes": "最多点赞",
+    "comments": "最多评论",
+    "collects": "最多收藏",
+}
+
+# 单条评论/正文保留的最大字数（控制返回体积）
+MAX_COMMENT_CHARS = 300
+MAX_DESC_CHARS = 1500
+
+_RESULT_RE = re.compile(r"### Result\s*\n(.*?)(?:\n\s*\n###|\Z)", re.DOTALL)
+
+# 页面脚本公共函数
+_JS_HELPERS = """
+  const sleep = (ms) => new Promise(r => setTimeout(r, ms));
+  const text = (root, sel) => {
+    const el = root.querySelector(sel);
+    return el ? el.textContent.trim() : '';
+  };
+  const clickText = (label) => {
+    const el = [...document.querySelectorAll('span, div, button')]
+      .find(e => e.childElementCount === 0 && e.textContent.trim() === label);
+    if (el) { el.click(); return true; }
+    return false;
+  };
+"""
+
+_SEARCH_JS = """async () => {
+%(helpers)s
+  const limit = %(limit)d;
+  const sortLabel = %(sort_label)s;
+  await sleep(1500);
+  if (sortLabel && sortLabel !== '综合') {
+    clickText('筛选');
+    await sleep(800);
+    clickText(sortLabel);
+    await sleep(2000);
+  }
+  const items = new Map();
+  for (let round = 0; round < 10 && items.size < limit; round++) {
+    document.querySelectorAll('section.note-item').forEach(sec => {
+      const a = sec.querySelector('a.cover, a[href*="/search_result/"], a[href*="/explore/"]');
+      if (!a) return;
+      const m = (a.getAttribute('href') || '').match(/\\/(?:explore|search_result|discovery\\/item)\\/([0-9a-zA-Z]+)/);
+      if (!m || items.has(m[1])) return;
+      items.set(m[1], {
+        note_id: m[1],
+        url: new URL(a.getAttribute('href'), location.origin).href,
+        title: text(sec, '.footer .title, .title'),
+        author: text(sec, '.author .name, .name'),
+        likes: text(sec, '.like-wrapper .count, .count'),
+      });
+    });
+    window.scrollBy(0, window.innerHeight * 2);
+    await sleep(1200);
+  }
+  return JSON.stringify([...items.values()].slice(0, limit));
+}"""
+
+_NOTE_JS = """async () => {
+%(helpers)s
+  const maxComments = %(max_comments)d;
+  await sleep(1500);
+  const scroller = document.querySelector('.note-scroller') || document.scrollingElement;
+  for (let round = 0; round < 20; round++) {
+    document.querySelectorAll('.show-more').forEach(b => {
+      if (/展开|更多/.test(b.textContent)) b.click();
+    });
+    if (document.querySelectorAll('.comment-item').length >= maxComments) break;
+    const before = scroller.scrollTop;
+    scroller.scrollTop = scroller.scrollHeight;
+    await sleep(1000);
+    if (document.querySelector('.end-container') || scroller.scrollTop === before) break;
+  }
+  const comments = [...document.querySelectorAll('.comment-item')].slice(0, maxComments).map(c => ({
+    author: text(c, '.author .name, .name'),
+    content: text(c, '.content .note-text, .content'),
+    date: text(c, '.info .date, .date'),
+    likes: text(c, '.like .count, .like-wrapper .count'),
+    is_reply: c.classList.contains('comment-item-sub'),
+  }));
+  return JSON.stringify({
+    title: text(document, '#detail-title'),
+    desc: text(document, '#detail-desc'),
+    date: text(document, '.note-content .date, .bottom-container .date'),
+    likes: text(document, '.engage-bar .like-wrapper .count, .interact-container .like-wrapper .count'),
+    collects: text(document, '.engage-bar .collect-wrapper .count, .interact-container .collect-wrapper .count'),
+    comment_total: text(document, '.comments-container .total, .total'),
+    comments,
+  });
+}"""
+
+_RELATED_JS = """async () => {
+%(helpers)s
+  await sleep(1500);
+  const heading = [...document.querySelectorAll('div, span, h3')]
+    .find(e => e.childElementCount === 0 && e.textContent.trim() === '相关搜索');
+  const words = new Set();
+  if (heading) {
+    const box = heading.closest('[class*="related"], [class*="query"]') || heading.parentElement.parentElement;
+    box.querySelectorAll('a, span, div').forEach(e => {
+      const t = e.textContent.trim();
+      if (e.childElementCount === 0 && t && t !== '相关搜索' && t.length <= 30) words.add(t);
+    });
+  }
+  document.querySelectorAll('.sug-item, .query-note-item').forEach(e => {
+    const t = e.textContent.trim();
+    if (t && t.length <= 30) words.add(t);
+  });
+  return JSON.stringify([...words]);
+}"""
+
+
+def parse_count(value: Any) -> int:
+    """
+    解析小红书计数文本（如 "1.2万"、"3k"、"赞"）
+
+    Args:
+        value: 计数文本
+
+    Returns:
+        整数计数（无法解析时为 0）
+    """
+    text = str(value or "").strip().lower().replace(",", "").rstrip("+")
+    match = re.match(r"^(\d+(?:\.\d+)?)\s*(万|w|千|k)?$", text)
+    if not match:
+        return 0
+    number = float(match.group(1))
+    unit = match.group(2)
+    if unit in ("万", "w"):
+        number *= 10000
+    elif unit in ("千", "k"):
+        number *= 1000
+    return int(number)
+
+
+def parse_evaluate_result(raw: Any) -> Any:
+    """
+    解析 browser_evaluate 的返回值
+
+    Playwright MCP 返回 Markdown 文本，结果位于 "### Result" 小节，
+    页面脚本用 JSON.stringify 返回，因此可能需要两次 JSON 解码
+
+    Args:
+        raw: MCP 工具返回值
+
+    Returns:
+        解码后的 Python 对象
+    """
+    if isinstance(raw, list):
+        raw = "\n".join(str(part) for part in raw)
+    if not isinstance(raw, str):
+        return raw
+
+    match = _RESULT_RE.search(raw)
+    value: Any = (match.group(1) if match else raw).strip()
+    for _ in range(2):
+        if not isinstance(value, str):
+            break
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            break
+    return value
+
+
+class XHSBrowserMacros:
+    """小红书浏览器宏（共享研究 Agent 的 Playwright MCP 会话）"""
+
+    def __init__(self, mcp_server: MCPServer):
+        """
+        初始化宏工具
+
+        Args:
+            mcp_server: Playwright MCP Server（与 Agent 的 MCP 工具共享浏览器）
+        """
+        self.mcp_server = mcp_server
+
+    async def _navigate(self, url: str) -> None:
+        """打开页面"""
+        await self.mcp_server.direct_call_tool("browser_navigate", {"url": url})
+
+    async def _evaluate(self, script: str) -> Any:
+        """在页面中执行脚本并解析 JSON 结果"""
+        raw = await self.mcp_server.direct_call_tool("browser_evaluate", {"function": script})
+        result = parse_evaluate_result(raw)
+        if isinstance(result, str):
+            raise ModelRetry(f"页面脚本返回无法解析的结果: {result[:200]}")
+        return result
+
+    async def search_notes(self, query: str, sort: str = "likes", limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        搜索小红书笔记并返回排序后的笔记列表（一次完成搜索、排序、滚动加载）
+
+        Args:
+            query: 搜索关键词
+            sort: 排序方式：general（综合）/ latest（最新）/ likes（最多点赞）/ comments（最多评论）/ collects（最多收藏）
+            limit: 返回笔记数量上限（1-30）
+
+        Returns:
+            笔记列表，每项包含 note_id、url、title、author、likes
+        """
+        limit = min(max(limit, 1), 30)
+        sort_label = SORT_LABELS.get(sort, SORT_LABELS["general"])
+
+        await self._navigate(XHS_SEARCH_URL.format(keyword=quote(query)))
+        notes = await self._evaluate(_SEARCH_JS % {
+            "helpers": _JS_HELPERS,
+            "limit": limit,
+            "sort_label": json.dumps(sort_label, ensure_ascii=False),
+        })
+
+        if not isinstance(notes, list):
+            raise ModelRetry("搜索结果解析失败，请改用 browser_snapshot 查看页面")
+        for note in notes:
+            note["likes"] = parse_count(note.get("likes"))
+        if sort == "likes":
+            notes.sort(key=lambda n: n["likes"], reverse=True)
+        return notes
+
+    async def open_note_with_comments(self, url: str, max_comments: int = 50) -> Dict[str, Any]:
+        """
+        打开笔记，滚动加载并展开评论区回复，返回正文和评论
+
+        Args:
+            url: 笔记链接（使用 search_notes 返回的 url，保留 xsec_token 参数）
+            max_comments: 最多返回的评论数（含嵌套回复，1-200）
+
+        Returns:
+            笔记详情：note_id、title、desc、date、likes、collects、comment_total、comments
+        """
+        max_comments = min(max(max_comments, 1), 200)
+
+        await self._navigate(url)
+        note = await self._evaluate(_NOTE_JS % {
+            "helpers": _JS_HELPERS,
+            "max_comments": max_comments,
+        })
+
+        if not isinstance(note, dict):
+            raise ModelRetry("笔记详情解析失败，请改用 browser_snapshot 查看页面")
+
+        match = re.search(r"/(?:explore|search_result|discovery/item)/([0-9a-zA-Z]+)", url)
+        note["note_id"] = match.group(1) if match else ""
+        note["url"] = url
+        note["desc"] = str(note.get("desc", ""))[:MAX_DESC_CHARS]
+        for key in ("likes", "collects"):
+            note[key] = parse_count(note.get(key))
+        for comment in note.get("comments", []):
+            comment["content"] = str(comment.get("content", ""))[:MAX_COMMENT_CHARS]
+            comment["likes"] = parse_count(comment.get("likes"))
+        return note
+
+    async def related_searches(self, query: str) -> List[str]:
+        """
+        获取搜索结果页的"相关搜索"推荐词（用于扩展研究）
+
+        Args:
+            query: 搜索关键词
+
+        Returns:
+            推荐搜索词列表
+        """
+        await self._navigate(XHS_SEARCH_URL.format(keyword=quote(query)))
+        words = await self._evaluate(_RELATED_JS % {"helpers": _JS_HELPERS})
+        if not isinstance(words, list):
+            raise ModelRetry("相关搜索解析失败，请改用 browser_snapshot 查看页面")
+        return [w for w in words if w != query]
+
+    def toolset(self, max_retries: int = 2, timeout: Optional[float] = 120) -> FunctionToolset:
+        """
+        构建函数工具集（与 MCP 工具集一起注册到 Agent）
+
+        Args:
+            max_retries: 每个宏的最大重试次数
+            timeout: 单次宏调用超时（秒）
+
+        Returns:
+            FunctionToolset: 包含 search_notes / open_note_with_comments / related_searches
+        """
+        return FunctionToolset(
+            [self.search_notes, self.open_note_with_comments, self.related_searches],
+            max_retries=max_retries,
+            timeout=timeout,
+            sequential=True,  # 宏共享同一个浏览器标签页，不能并行
+        )
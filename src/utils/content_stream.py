@@ -0,0 +1,118 @@
+"""
+内容流式输出
+流式生成时把模型逐步返回的结构化输出（工具调用参数的部分 JSON）解析出来，
+实时写入 content.partial.json 并作为进度事件输出（TextDelta 增量文本）
+"""
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from pydantic_core import from_json
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+
+from .file_ops import dump_json_bytes, write_atomic
+from .progress import TextDelta, emit, note
+
+# 部分输出文件名
+PARTIAL_FILE = "content.partial.json"
+
+# 写盘最小间隔（秒）
+WRITE_INTERVAL = 0.5
+
+
+def partial_output(response: ModelResponse) -> Optional[Dict[str, Any]]:
+    """
+    从流式响应中解析当前的部分结构化输出
+
+    Args:
+        response: 流式响应快照
+
+    Returns:
+        部分输出字典（尚无输出工具调用时返回 None）
+    """
+    for part in reversed(response.parts):
+        if not isinstance(part, ToolCallPart):
+            continue
+        if isinstance(part.args, dict):
+            return part.args
+        if part.args:
+            try:
+                value = from_json(part.args, allow_partial="trailing-strings")
+            except ValueError:
+                return None
+            return value if isinstance(value, dict) else None
+    return None
+
+
+class PartialContentWriter:
+    """部分内容的控制台 / 文件输出"""
+
+    def __init__(self, path: Optional[Path] = None, echo: bool = True):
+        """
+        初始化输出
+
+        Args:
+            path: 部分输出文件路径（None 表示不写文件）
+            echo: 是否实时打印正文到控制台
+        """
+        self.path = path
+        self.echo = echo
+        self.first_token_at: Optional[float] = None
+        self._started_at = time.perf_counter()
+        self._title_printed = False
+        self._body_printed = 0
+        self._last_write = 0.0
+
+    def reset(self) -> None:
+        """开始新一轮生成（修订轮次重新输出）"""
+        self._started_at = time.perf_counter()
+        self.first_token_at = None
+        self._title_printed = False
+        self._body_printed = 0
+        self._last_write = 0.0
+
+    def update(self, partial: Dict[str, Any]) -> None:
+        """
+        收到新的部分输出
+
+        Args:
+            partial: 部分输出字典（title / body / hashtags / call_to_action）
+        """
+        title = str(partial.get("title") or "")
+        body = str(partial.get("body") or "")
+        if self.first_token_at is None and (title or body):
+            self.first_token_at = time.perf_counter() - self._started_at
+
+        if self.echo:
+            self._echo(title, body, "body" in partial)
+
+        now = time.perf_counter()
+        if self.path is not None and now - self._last_write >= WRITE_INTERVAL:
+            self._write({**partial, "complete": False})
+            self._last_write = now
+
+    def _echo(self, title: str, body: str, body_started: bool) -> None:
+        """把新增的标题 / 正文打印到控制台"""
+        # 标题在 body 字段出现后才算完整
+        if not self._title_printed and title and body_started:
+            note(f"\n      📝 {title}")
+            self._title_printed = True
+        if len(body) > self._body_printed:
+            emit(TextDelta(text=body[self._body_printed:]))
+            self._body_printed = len(body)
+
+    def finish(self, output: Dict[str, Any]) -> None:
+        """
+        生成结束，写入完整输出
+
+        Args:
+            output: 最终输出字典
+        """
+        if self.echo and self._body_printed:
+            emit(TextDelta(text="\n"))
+        if self.path is not None:
+            self._write({**output, "complete": True})
+
+    def _write(self, data: Dict[str, Any]) -> None:
+        """原子写入部分输出文件（先写临时文件再替换，读取方不会看到半截 JSON；频繁覆盖，不刷盘）"""
+        write_atomic(self.path, dump_json_bytes(data), fsync=False)
@@ -0,0 +1,350 @@
+"""
+实体/案例去重与归一化
+合并 ResearchResult 中同一对象的不同写法，减少冗余数据和提示词长度
+
+处理流程：
+1. 名称归一化（全角转半角、去标点、去地域前缀和公司组织形式后缀）
+2. 别名表映射到规范名
+3. 字符 n-gram 向量 + 余弦相似度（NumPy 矩阵运算）模糊匹配；数字部分必须完全相同
+   （"月薪3000" 与 "月薪30000"、"4000" 与 "5000" 共享 "00" bigram，但不是同一对象）
+4. 合并同一簇内实体的 issue 等字段
+"""
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ..models.schemas import Case, Entity, ResearchResult
+
+
+# 别名表：规范名 → 别名列表（归一化前的写法即可）
+DEFAULT_ALIASES: Dict[str, List[str]] = {
+    "博彦科技": ["博彦", "BYTE博彦"],
+    "软通动力": ["软通"],
+    "中软国际": ["中软"],
+    "鸿联九五": ["鸿联95", "鸿联"],
+    "万唯": ["万唯教育", "万唯中考"],
+    "美团": ["美团外包"],
+}
+
+# 地域前缀（名称剩余部分 >= 2 个字符时才去除）
+REGION_PREFIXES = ("陕西省", "陕西", "西安市", "西安", "西咸新区")
+
+# 公司组织形式后缀（从长到短，循环去除）；只去除法律形式，
+# 科技 / 网络 / 传媒等行业词是名称的一部分（博彦科技与博彦传媒是不同公司）
+COMPANY_SUFFIXES = (
+    "股份有限公司", "有限责任公司", "有限公司", "集团公司", "集团",
+    "分公司", "公司", "工作室",
+)
+
+# 去除的标点和空白
+_PUNCT_RE = re.compile(r"[\s　【】\[\]「」『』“”\"'‘’()（）<>《》·・,，。.!！?？:：;；/\\|\-_]+")
+
+# 名称中的数字串（模糊匹配要求两边完全相同）
+_DIGITS_RE = re.compile(r"\d+")
+
+# issue 字段的分隔符
+_ISSUE_SPLIT_RE = re.compile(r"[；;、/|]+")
+
+# 默认相似度阈值
+ENTITY_THRESHOLD = 0.75
+CASE_THRESHOLD = 0.9
+
+
+@dataclass
+class DedupStats:
+    """去重统计"""
+
+    entities_before: int = 0
+    entities_after: int = 0
+    cases_before: int = 0
+    cases_after: int = 0
+
+    @property
+    def removed(self) -> int:
+        """去除的数据点总数"""
+        return (self.entities_before - self.entities_after) + (self.cases_before - self.cases_after)
+
+
+def normalize_name(name: str) -> str:
+    """
+    归一化实体名称
+
+    Args:
+        name: 原始名称
+
+    Returns:
+        归一化后的名称（用于比较，不用于展示）
+    """
+    text = unicodedata.normalize("NFKC", str(name)).lower()
+    text = _PUNCT_RE.sub("", text)
+
+    for prefix in REGION_PREFIXES:
+        if text.startswith(prefix) and len(text) - len(prefix) >= 2:
+            text = text[len(prefix):]
+            break
+
+    stripped = True
+    while stripped:
+        stripped = False
+        for suffix in COMPANY_SUFFIXES:
+            if text.endswith(suffix) and len(text) - len(suffix) >= 2:
+                text = text[:-len(suffix)]
+                stripped = True
+                break
+
+    return text
+
+
+def build_alias_index(aliases: Optional[Dict[str, List[str]]] = None) -> Dict[str, str]:
+    """
+    构建 归一化别名 → 规范名 的索引
+
+    Args:
+        aliases: 额外别名表（与默认别名表合并）
+
+    Returns:
+        别名索引
+    """
+    table = {k: list(v) for k, v in DEFAULT_ALIASES.items()}
+    for canonical, names in (aliases or {}).items():
+        table.setdefault(canonical, []).extend(names)
+
+    index: Dict[str, str] = {}
+    for canonical, names in table.items():
+        index[normalize_name(canonical)] = canonical
+        for alias in names:
+            index[normalize_name(alias)] = canonical
+    return index
+
+
+def _ngrams(text: str, n: int = 2) -> List[str]:
+    """字符 n-gram（短文本退化为单字）"""
+    if len(text) <= n:
+        return list(text) or [text]
+    return [text[i:i + n] for i in range(len(text) - n + 1)]
+
+
+def similarity_matrix(texts: List[str], n: int = 2) -> np.ndarray:
+    """
+    计算文本两两之间的字符 n-gram 余弦相似度
+
+    Args:
+        texts: 已归一化的文本列表
+        n: n-gram 长度（中文默认 2，即 bigram）
+
+    Returns:
+        shape 为 (len(texts), len(texts)) 的相似度矩阵
+    """
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    grams = [_ngrams(t, n) for t in texts]
+    vocab: Dict[str, int] = {}
+    for gs in grams:
+        for g in gs:
+            vocab.setdefault(g, len(vocab))
+
+    matrix = np.zeros((len(texts), len(vocab)), dtype=np.float32)
+    for row, gs in enumerate(grams):
+        for g in gs:
+            matrix[row, vocab[g]] += 1.0
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix @ matrix.T
+
+
+def _cluster(keys: List[str], groups: List[str], threshold: float) -> List[int]:
+    """
+    按相似度聚类（并查集），只在同一分组内合并
+
+    完全相同的文本直接合并；相似度达到阈值的文本还要求数字串完全一致
+
+    Args:
+        keys: 归一化文本
+        groups: 分组标签（如实体类型）
+        threshold: 相似度阈值
+
+    Returns:
+        每个元素所属簇的代表下标
+    """
+    parent = list(range(len(keys)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    sim = similarity_matrix(keys)
+    same_group = np.array(groups)[:, None] == np.array(groups)[None, :]
+    exact = np.array(keys)[:, None] == np.array(keys)[None, :]
+    digits = np.array([" ".join(_DIGITS_RE.findall(k)) for k in keys])
+    same_digits = digits[:, None] == digits[None, :]
+    matches = np.triu(((sim >= threshold) & same_digits | exact) & same_group, k=1)
+
+    for i, j in zip(*np.nonzero(matches)):
+        ri, rj = find(int(i)), find(int(j))
+        if ri != rj:
+            # 保留先出现的元素作为代表
+            parent[max(ri, rj)] = min(ri, rj)
+
+    return [find(i) for i in range(len(keys))]
+
+
+def merge_issues(values: Iterable[Any]) -> str:
+    """
+    合并多个 issue 描述（拆分后保序去重，用「；」连接）
+
+    Args:
+        values: issue 描述列表
+
+    Returns:
+        合并后的描述
+    """
+    parts: List[str] = []
+    seen = set()
+    for value in values:
+        if not value:
+            continue
+        for part in _ISSUE_SPLIT_RE.split(str(value)):
+            part = part.strip()
+            key = normalize_name(part)
+            if part and key not in seen:
+                seen.add(key)
+                parts.append(part)
+    return "；".join(parts)
+
+
+def dedupe_entities(
+    entities: List[Entity],
+    aliases: Optional[Dict[str, List[str]]] = None,
+    threshold: float = ENTITY_THRESHOLD
+) -> List[Entity]:
+    """
+    实体去重：别名映射 + 同类型内模糊匹配，合并 issue 字段
+
+    Args:
+        entities: 实体列表
+        aliases: 额外别名表
+        threshold: 模糊匹配相似度阈值
+
+    Returns:
+        去重后的实体列表（保持首次出现的顺序）
+    """
+    if not entities:
+        return []
+
+    alias_index = build_alias_index(aliases)
+    keys = []
+    for entity in entities:
+        key = normalize_name(entity.name or "")
+        canonical = alias_index.get(key)
+        keys.append(normalize_name(canonical) if canonical else key)
+    groups = [e.type or "" for e in entities]
+
+    roots = _cluster(keys, groups, threshold)
+
+    clusters: Dict[int, List[int]] = {}
+    for i, root in enumerate(roots):
+        clusters.setdefault(root, []).append(i)
+
+    merged: List[Entity] = []
+    for root in sorted(clusters):
+        members = [entities[i] for i in clusters[root]]
+        entity = members[0].model_copy()
+
+        canonical = alias_index.get(keys[root])
+        if canonical:
+            entity.name = canonical
+
+        if len(members) > 1:
+            issue = merge_issues(m.issue for m in members)
+            if issue:
+                entity.issue = issue
+            for other in members[1:]:
+                for field, value in other.model_dump().items():
+                    if getattr(entity, field, None) in (None, "", []):
+                        setattr(entity, field, value)
+
+        names = []
+        for m in members:
+            if m.name and m.name != entity.name and m.name not in names:
+                names.append(m.name)
+        if names:
+            entity.aliases = list(dict.fromkeys([*(entity.aliases or []), *names]))
+
+        merged.append(entity)
+
+    return merged
+
+
+def _case_text(case: Case) -> str:
+    """案例的归一化文本（用于相似度比较）"""
+    return normalize_name("".join(v for v in case.model_dump().values() if isinstance(v, str)))
+
+
+def dedupe_cases(
+    cases: List[Case],
+    threshold: float = CASE_THRESHOLD
+) -> List[Case]:
+    """
+    案例去重：近似重复的案例只保留信息最多的一条
+
+    Args:
+        cases: 案例列表
+        threshold: 相似度阈值
+
+    Returns:
+        去重后的案例列表
+    """
+    if not cases:
+        return []
+
+    texts = [_case_text(c) for c in cases]
+    roots = _cluster(texts, [""] * len(cases), threshold)
+
+    best: Dict[int, int] = {}
+    for i, root in enumerate(roots):
+        if root not in best or len(texts[i]) > len(texts[best[root]]):
+            best[root] = i
+
+    return [cases[best[root]] for root in sorted(best)]
+
+
+def dedupe_research(
+    research: ResearchResult,
+    aliases: Optional[Dict[str, List[str]]] = None
+) -> Tuple[ResearchResult, DedupStats]:
+    """
+    对研究结果的实体和案例去重
+
+    data_points 按去除的数量同步扣减
+
+    Args:
+        research: 研究结果
+        aliases: 额外别名表
+
+    Returns:
+        (去重后的研究结果, 去重统计)
+    """
+    entities = dedupe_entities(research.entities, aliases=aliases)
+    cases = dedupe_cases(research.cases)
+
+    stats = DedupStats(
+        entities_before=len(research.entities),
+        entities_after=len(entities),
+        cases_before=len(research.cases),
+        cases_after=len(cases),
+    )
+
+    result = research.model_copy(update={
+        "entities": entities,
+        "cases": cases,
+        "data_points": max(0, research.data_points - stats.removed),
+    })
+    return result, stats
@@ -1,26 +1,104 @@
 """
 文件操作工具
 提供 JSON 读写、目录管理等功能
+
+JSON 由 pydantic-core 直接序列化为 UTF-8 字节（与 json.dumps(ensure_ascii=False, indent=2) 输出一致），
+写入先落临时文件再原子替换，崩溃时目标文件要么是旧内容要么是完整新内容；
+读取时目标文件不存在而存在 gzip 压缩版本（<name>.gz）时自动解压
 """
+import gzip
 import json
+import os
+import uuid
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Type, TypeVar
+
+import pydantic_core
+from pydantic import BaseModel
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
 
+# 压缩产物的后缀
+GZIP_SUFFIX = ".gz"
 
-def save_json(file_path: Path | str, data: Dict[str, Any], indent: int = 2) -> None:
+
+def dump_json_bytes(data: Any, indent: int = 2) -> bytes:
     """
-    保存数据为 JSON 文件
+    序列化为 JSON 字节
 
     Args:
-        file_path: 文件路径
-        data: 要保存的数据（字典）
+        data: 字典、列表或 Pydantic 模型
         indent: 缩进空格数
+
+    Returns:
+        UTF-8 编码的 JSON（非 ASCII 字符不转义）
+    """
+    return pydantic_core.to_json(data, indent=indent)
+
+
+def write_atomic(file_path: Path | str, data: bytes, fsync: bool = True) -> None:
+    """
+    原子写入文件（同目录临时文件写完后 os.replace 替换）
+
+    Args:
+        file_path: 文件路径
+        data: 文件内容
+        fsync: 替换前是否刷盘（频繁覆盖的临时产物可关闭）
     """
     file_path = Path(file_path)
     file_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = file_path.with_name(f".{file_path.name}.{uuid.uuid4().hex[:8]}.tmp")
+
+    try:
+        with open(tmp, "xb") as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, file_path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+    if fsync and os.name == "posix":
+        # 目录项刷盘，确保替换本身在崩溃后可见
+        dir_fd = os.open(file_path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def read_bytes(file_path: Path | str) -> bytes:
+    """
+    读取文件内容（不存在时回退到 <name>.gz 并解压）
 
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=indent)
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        文件内容
+    """
+    file_path = Path(file_path)
+
+    if file_path.exists():
+        return file_path.read_bytes()
+    packed = file_path.with_name(file_path.name + GZIP_SUFFIX)
+    if packed.exists():
+        return gzip.decompress(packed.read_bytes())
+    raise FileNotFoundError(f"文件不存在: {file_path}")
+
+
+def save_json(file_path: Path | str, data: Dict[str, Any] | BaseModel, indent: int = 2) -> None:
+    """
+    保存数据为 JSON 文件（原子写入）
+
+    Args:
+        file_path: 文件路径
+        data: 要保存的数据（字典或 Pydantic 模型）
+        indent: 缩进空格数
+    """
+    write_atomic(file_path, dump_json_bytes(data, indent=indent))
 
 
 def load_json(file_path: Path | str) -> Dict[str, Any]:
@@ -33,13 +111,24 @@ def load_json(file_path: Path | str) -> Dict[str, Any]:
     Returns:
         加载的数据字典
     """
-    file_path = Path(file_path)
+    return json.loads(read_bytes(file_path))
 
-    if not file_path.exists():
-        raise FileNotFoundError(f"文件不存在: {file_path}")
 
-    with open(file_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+def load_model(file_path: Path | str, model: Type[ModelT]) -> ModelT:
+    """
+    从 JSON 文件加载并校验 Pydantic 模型
+
+    直接交给 pydantic-core 解析字节（model_validate_json），
+    不经过 json.load 生成中间字典
+
+    Args:
+        file_path: 文件路径
+        model: 模型类
+
+    Returns:
+        模型实例
+    """
+    return model.model_validate_json(read_bytes(file_path))
 
 
 def save_text(file_path: Path | str, content: str) -> None:
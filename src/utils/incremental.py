@@ -0,0 +1,221 @@
+"""
+增量研究工具
+定位主题的上次研究结果、读写水位线，并合并新旧研究数据
+
+刷新主题时只抓取水位线之后的新笔记和评论，
+耗时与新增动态成正比，而不是整个语料
+"""
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+from ..models.schemas import Case, CrawlWatermark, Entity, ResearchResult
+from .file_ops import load_model
+from .run_index import INDEX_FILE, RunIndex
+
+# 水位线文件名（与 research.json 同目录）
+WATERMARK_FILE = "watermark.json"
+
+# 输出目录名中的时间戳格式（与 main.run_workflow 一致）
+TIMESTAMP_FORMAT = "%Y%m%d-%H%M%S"
+
+
+def safe_topic_name(topic: str) -> str:
+    """
+    清理主题名（移除特殊字符），用于输出目录命名
+
+    Args:
+        topic: 研究主题
+
+    Returns:
+        清理后的主题名（最多 20 字）
+    """
+    return "".join(c for c in topic if c.isalnum() or c in (' ', '-', '_'))[:20]
+
+
+def find_latest_run(topic: str, posts_dir: Path = Path("posts")) -> Optional[Path]:
+    """
+    查找主题最近一次包含 research.json 的输出目录
+
+    优先查询运行索引（与历史运行数量无关），索引中没有该主题时遍历目录（兼容未登记的旧运行）
+
+    Args:
+        topic: 研究主题
+        posts_dir: 输出根目录
+
+    Returns:
+        最近一次运行的目录，没有则返回 None
+    """
+    if not posts_dir.exists():
+        return None
+
+    if (posts_dir / INDEX_FILE).exists():
+        with RunIndex(posts_dir / INDEX_FILE) as index:
+            run = index.latest(safe_topic_name(topic), phase="research")
+        if run is not None and (Path(run.run_dir) / "research.json").exists():
+            return Path(run.run_dir)
+
+    suffix = f"-{safe_topic_name(topic)}"
+    candidates = [
+        d for d in posts_dir.iterdir()
+        if d.is_dir() and d.name.endswith(suffix) and (d / "research.json").exists()
+    ]
+    if not candidates:
+        return None
+
+    # 目录名以时间戳开头，按名称排序即按时间排序
+    return max(candidates, key=lambda d: d.name)
+
+
+def load_previous_research(
+    run_dir: Path,
+    topic: str,
+    target_audience: str = ""
+) -> Tuple[ResearchResult, CrawlWatermark]:
+    """
+    加载上次研究结果和水位线
+
+    旧目录没有 watermark.json 时，从目录名时间戳和 note_ids 推导水位线
+
+    Args:
+        run_dir: 上次运行的输出目录
+        topic: 研究主题
+        target_audience: 目标受众
+
+    Returns:
+        (研究结果, 水位线)
+    """
+    research = load_model(run_dir / "research.json", ResearchResult)
+
+    watermark_path = run_dir / WATERMARK_FILE
+    if watermark_path.exists():
+        watermark = load_model(watermark_path, CrawlWatermark)
+    else:
+        timestamp = run_dir.name[:len("YYYYmmdd-HHMMSS")]
+        try:
+            last_run_at = datetime.strptime(timestamp, TIMESTAMP_FORMAT).isoformat()
+        except ValueError:
+            last_run_at = datetime.fromtimestamp(run_dir.stat().st_mtime).isoformat()
+        watermark = CrawlWatermark(
+            topic=topic,
+            target_audience=target_audience,
+            last_run_at=last_run_at,
+            seen_note_ids=list(research.note_ids)
+        )
+
+    return research, watermark
+
+
+def build_watermark(
+    topic: str,
+    target_audience: str,
+    research: ResearchResult,
+    previous: Optional[CrawlWatermark] = None,
+    run_at: Optional[datetime] = None
+) -> CrawlWatermark:
+    """
+    根据本次研究结果生成新的水位线
+
+    Args:
+        topic: 研究主题
+        target_audience: 目标受众
+        research: 本次（合并后的）研究结果
+        previous: 上次水位线
+        run_at: 本次运行时间（默认当前时间）
+
+    Returns:
+        CrawlWatermark: 新水位线
+    """
+    seen = list(previous.seen_note_ids) if previous else []
+    seen.extend(note_id for note_id in research.note_ids if note_id not in seen)
+
+    return CrawlWatermark(
+        topic=topic,
+        target_audience=target_audience,
+        last_run_at=(run_at or datetime.now()).isoformat(timespec="seconds"),
+        seen_note_ids=seen
+    )
+
+
+def _entity_key(entity: Entity) -> Tuple[str, str]:
+    """实体去重键：(类型, 名称)"""
+    return ((entity.type or "").strip(), (entity.name or "").strip())
+
+
+def _case_fingerprint(case: Case) -> str:
+    """案例去重键：完整内容"""
+    return json.dumps(case.model_dump(), ensure_ascii=False, sort_keys=True)
+
+
+def _merge_issue(old: Any, new: Any) -> Any:
+    """合并实体的问题描述（去重后用「；」连接）"""
+    if not new or new == old:
+        return old
+    if not old:
+        return new
+    parts = [p for p in str(old).split("；") if p]
+    for part in str(new).split("；"):
+        if part and part not in parts:
+            parts.append(part)
+    return "；".join(parts)
+
+
+def merge_research(base: ResearchResult, update: ResearchResult) -> ResearchResult:
+    """
+    将增量研究结果合并到已有研究结果
+
+    - 实体按 (type, name) 合并，issue 字段拼接
+    - 案例按内容完全相同去重
+    - 关键词、笔记 ID 保序取并集
+    - summary / credibility 以本次结果为准（为空时保留原值）
+
+    Args:
+        base: 已有研究结果
+        update: 本次增量研究结果
+
+    Returns:
+        ResearchResult: 合并后的研究结果
+    """
+    entities: List[Entity] = [e.model_copy() for e in base.entities]
+    index = {_entity_key(e): i for i, e in enumerate(entities)}
+    added = 0
+
+    for entity in update.entities:
+        key = _entity_key(entity)
+        if key in index:
+            existing = entities[index[key]]
+            for field, value in entity.model_dump().items():
+                if field == "issue":
+                    existing.issue = _merge_issue(existing.issue, value)
+                elif field not in existing.model_fields_set:
+                    setattr(existing, field, value)
+        else:
+            index[key] = len(entities)
+            entities.append(entity.model_copy())
+            added += 1
+
+    cases: List[Case] = list(base.cases)
+    seen_cases = {_case_fingerprint(c) for c in cases}
+    for case in update.cases:
+        fingerprint = _case_fingerprint(case)
+        if fingerprint not in seen_cases:
+            seen_cases.add(fingerprint)
+            cases.append(case)
+            added += 1
+
+    keywords = list(base.keywords)
+    keywords.extend(k for k in update.keywords if k not in keywords)
+
+    note_ids = list(base.note_ids)
+    note_ids.extend(n for n in update.note_ids if n not in note_ids)
+
+    return ResearchResult(
+        summary=update.summary or base.summary,
+        entities=entities,
+        cases=cases,
+        keywords=keywords,
+        credibility=update.credibility or base.credibility,
+        data_points=base.data_points + added,
+        note_ids=note_ids
+    )
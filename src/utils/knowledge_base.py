@@ -0,0 +1,384 @@
+"""
+跨运行研究知识库
+把所有 posts/*/research.json 和 content.json 增量导入本地 SQLite FTS5 全文索引
+
+- 中文按字符 bigram 分词（FTS5 默认分词器不切分中文）
+- 按文件 mtime/size 增量导入，未变化的文件直接跳过
+- 查询毫秒级，可用于给 ResearchAgent 预置历史实体和案例
+- 预置时按主题词覆盖率过滤：BM25 只要共享任一 bigram（如"西安""公司"）就会召回，
+  主题词按 IDF 加权，文档覆盖的权重占比低于 MIN_TOPIC_RELEVANCE 的结果丢弃
+"""
+import json
+import math
+import re
+import sqlite3
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .file_ops import load_json
+from .progress import LEVEL_WARNING, note
+
+# 默认数据库位置（放在 posts/ 下，随输出一起管理）
+DEFAULT_DB_PATH = Path("posts") / ".knowledge.sqlite"
+
+# 文档类型
+KIND_ENTITY = "entity"
+KIND_CASE = "case"
+KIND_SUMMARY = "summary"
+KIND_CONTENT = "content"
+
+# 研究数量目标（与 prompts/research.yaml 一致）
+ENTITY_TARGET = 15
+CASE_TARGET = 8
+
+# 预置历史数据的最低主题相关度（文档覆盖的主题词 IDF 权重占比）
+MIN_TOPIC_RELEVANCE = 0.6
+
+_CJK_RE = re.compile(r"[一-鿿㐀-䶿]+")
+_WORD_RE = re.compile(r"[0-9a-zA-Z]+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    run_dir TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_docs_path ON docs(path);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(tokens);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs_vocab USING fts5vocab(docs_fts, row);
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    分词：中文连续片段切成字符 bigram，英文/数字按单词小写
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        词元列表
+    """
+    tokens: List[str] = []
+    for run in _CJK_RE.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    tokens.extend(w.lower() for w in _WORD_RE.findall(text))
+    return tokens
+
+
+def _run_topic(run_dir: Path) -> str:
+    """运行目录对应的主题（优先读 watermark.json，否则取目录名时间戳之后的部分）"""
+    watermark = run_dir / "watermark.json"
+    if watermark.exists():
+        try:
+            data = load_json(watermark)
+            return f"{data.get('topic', '')} {data.get('target_audience', '')}"
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            pass
+    parts = run_dir.name.split("-", 2)
+    return parts[2] if len(parts) == 3 else run_dir.name
+
+
+def _flatten(value: Any) -> str:
+    """把实体/案例字典的所有值拼成一段文本"""
+    if isinstance(value, dict):
+        return " ".join(_flatten(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return " ".join(_flatten(v) for v in value)
+    return "" if value is None else str(value)
+
+
+@dataclass
+class KnowledgeHit:
+    """一条检索结果"""
+
+    kind: str
+    run_dir: str
+    score: float
+    payload: Dict[str, Any]
+    relevance: float = 1.0  # 覆盖的主题词权重占比
+
+
+@dataclass
+class PriorKnowledge:
+    """预置给 ResearchAgent 的历史研究数据"""
+
+    entities: List[Dict[str, Any]] = field(default_factory=list)
+    cases: List[Dict[str, Any]] = field(default_factory=list)
+    run_dirs: List[str] = field(default_factory=list)
+
+    @property
+    def coverage_good(self) -> bool:
+        """历史数据是否已达到研究数量目标（可提前结束研究）"""
+        return len(self.entities) >= ENTITY_TARGET and len(self.cases) >= CASE_TARGET
+
+    def __bool__(self) -> bool:
+        return bool(self.entities or self.cases)
+
+
+class KnowledgeBase:
+    """本地研究知识库（SQLite FTS5）"""
+
+    def __init__(self, db_path: Path | str = DEFAULT_DB_PATH):
+        """
+        打开（或创建）知识库
+
+        Args:
+            db_path: 数据库文件路径
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        self.conn.close()
+
+    def __enter__(self) -> "KnowledgeBase":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ==================== 导入 ====================
+
+    def ingest(self, posts_dir: Path | str = Path("posts")) -> int:
+        """
+        增量导入 posts 目录下的 research.json / content.json
+
+        Args:
+            posts_dir: 输出根目录
+
+        Returns:
+            本次（重新）导入的文件数
+        """
+        posts_dir = Path(posts_dir)
+        known = {
+            path: (mtime, size)
+            for path, mtime, size in self.conn.execute("SELECT path, mtime, size FROM files")
+        }
+
+        changed = 0
+        current = set()
+        for pattern in ("*/research.json", "*/content.json"):
+            for path in sorted(posts_dir.glob(pattern)):
+                key = str(path)
+                current.add(key)
+                stat = path.stat()
+                if known.get(key) == (stat.st_mtime, stat.st_size):
+                    continue
+                self._ingest_file(path, stat.st_mtime, stat.st_size)
+                changed += 1
+
+        # 删除已不存在的文件
+        for key in set(known) - current:
+            if key.startswith(str(posts_dir)):
+                self._delete_file(key)
+
+        self.conn.commit()
+        return changed
+
+    def _delete_file(self, key: str) -> None:
+        """删除某个文件的全部文档"""
+        self.conn.execute(
+            "DELETE FROM docs_fts WHERE rowid IN (SELECT id FROM docs WHERE path = ?)", (key,)
+        )
+        self.conn.execute("DELETE FROM docs WHERE path = ?", (key,))
+        self.conn.execute("DELETE FROM files WHERE path = ?", (key,))
+
+    def _ingest_file(self, path: Path, mtime: float, size: int) -> None:
+        """导入单个文件（先删除旧文档）"""
+        key = str(path)
+        self._delete_file(key)
+
+        try:
+            data = load_json(path)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            note(f"   ⚠️ 跳过无法解析的文件 {path}: {e}", LEVEL_WARNING)
+            return
+
+        # 运行主题和关键词作为每个文档的上下文，使实体/案例能按主题召回
+        context = f"{_run_topic(path.parent)} {_flatten(data.get('keywords', []))}"
+
+        for kind, payload in self._documents(path.name, data):
+            cursor = self.conn.execute(
+                "INSERT INTO docs (path, run_dir, kind, payload) VALUES (?, ?, ?, ?)",
+                (key, path.parent.name, kind, json.dumps(payload, ensure_ascii=False))
+            )
+            self.conn.execute(
+                "INSERT INTO docs_fts (rowid, tokens) VALUES (?, ?)",
+                (cursor.lastrowid, " ".join(tokenize(f"{_flatten(payload)} {context}")))
+            )
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files (path, mtime, size) VALUES (?, ?, ?)",
+            (key, mtime, size)
+        )
+
+    @staticmethod
+    def _documents(filename: str, data: Dict[str, Any]) -> Iterable[Tuple[str, Dict[str, Any]]]:
+        """把一个 JSON 文件拆成若干检索文档"""
+        if filename == "research.json":
+            if data.get("summary"):
+                yield KIND_SUMMARY, {"summary": data["summary"], "keywords": data.get("keywords", [])}
+            for entity in data.get("entities", []):
+                yield KIND_ENTITY, entity
+            for case in data.get("cases", []):
+                yield KIND_CASE, case
+        elif filename == "content.json":
+            yield KIND_CONTENT, {
+                "title": data.get("title", ""),
+                "body": data.get("body", ""),
+                "hashtags": data.get("hashtags", []),
+            }
+
+    # ==================== 查询 ====================
+
+    def term_weights(self, tokens: Iterable[str]) -> Dict[str, float]:
+        """
+        词元的 IDF 权重（知识库里没出现过的词权重最高）
+
+        Args:
+            tokens: 词元
+
+        Returns:
+            {词元: 权重}
+        """
+        tokens = list(dict.fromkeys(tokens))
+        if not tokens:
+            return {}
+        total = self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+        frequency = dict(self.conn.execute(
+            f"SELECT term, doc FROM docs_vocab WHERE term IN ({', '.join('?' * len(tokens))})", tokens
+        ))
+        return {t: math.log((total + 1) / (frequency.get(t, 0) + 1)) + 1 for t in tokens}
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        kinds: Optional[Iterable[str]] = None,
+        topic: Optional[str] = None,
+        min_relevance: float = 0.0
+    ) -> List[KnowledgeHit]:
+        """
+        全文检索（BM25 排序，可按主题词覆盖率过滤）
+
+        Args:
+            query: 查询文本
+            limit: 返回条数
+            kinds: 限定文档类型（entity/case/summary/content）
+            topic: 计算相关度的主题（默认为查询文本）
+            min_relevance: 最低相关度（文档覆盖的主题词 IDF 权重占比，0 表示不过滤）
+
+        Returns:
+            检索结果列表（BM25 从高到低）
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        weights = self.term_weights(tokenize(topic) if topic is not None else tokens)
+        weight_total = sum(weights.values())
+
+        match = " OR ".join(f'"{t}"' for t in tokens)
+        sql = (
+            "SELECT docs.kind, docs.run_dir, bm25(docs_fts) AS rank, docs.payload, docs_fts.tokens "
+            "FROM docs_fts JOIN docs ON docs.id = docs_fts.rowid "
+            "WHERE docs_fts MATCH ?"
+        )
+        params: List[Any] = [match]
+        kinds = list(kinds or [])
+        if kinds:
+            sql += f" AND docs.kind IN ({', '.join('?' * len(kinds))})"
+            params.extend(kinds)
+        sql += " ORDER BY rank"
+        if not min_relevance:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        hits = []
+        for kind, run_dir, rank, payload, doc_tokens in self.conn.execute(sql, params):
+            present = set(doc_tokens.split())
+            covered = sum(w for t, w in weights.items() if t in present)
+            relevance = covered / weight_total if weight_total else 0.0
+            if relevance < min_relevance:
+                continue
+            hits.append(KnowledgeHit(
+                kind=kind, run_dir=run_dir, score=-rank, payload=json.loads(payload), relevance=relevance
+            ))
+            if len(hits) >= limit:
+                break
+        return hits
+
+    def prior_knowledge(
+        self,
+        topic: str,
+        target_audience: str = "",
+        max_entities: int = 30,
+        max_cases: int = 15
+    ) -> PriorKnowledge:
+        """
+        检索与主题相关的历史实体和案例（按名称去重）
+
+        只保留主题相关度不低于 MIN_TOPIC_RELEVANCE 的结果，
+        coverage_good 因此只反映真正相关的历史数据
+
+        Args:
+            topic: 研究主题
+            target_audience: 目标受众
+            max_entities: 最多返回实体数
+            max_cases: 最多返回案例数
+
+        Returns:
+            PriorKnowledge: 历史研究数据
+        """
+        query = f"{topic} {target_audience}"
+        prior = PriorKnowledge()
+        run_dirs: List[str] = []
+
+        seen_names = set()
+        for hit in self.search(
+            query, limit=max_entities * 3, kinds=[KIND_ENTITY], topic=topic, min_relevance=MIN_TOPIC_RELEVANCE
+        ):
+            name = hit.payload.get("name")
+            if not name or name in seen_names:
+                continue
+            seen_names.add(name)
+            prior.entities.append(hit.payload)
+            run_dirs.append(hit.run_dir)
+            if len(prior.entities) >= max_entities:
+                break
+
+        seen_cases = set()
+        for hit in self.search(
+            query, limit=max_cases * 3, kinds=[KIND_CASE], topic=topic, min_relevance=MIN_TOPIC_RELEVANCE
+        ):
+            fingerprint = json.dumps(hit.payload, ensure_ascii=False, sort_keys=True)
+            if fingerprint in seen_cases:
+                continue
+            seen_cases.add(fingerprint)
+            prior.cases.append(hit.payload)
+            run_dirs.append(hit.run_dir)
+            if len(prior.cases) >= max_cases:
+                break
+
+        prior.run_dirs = list(dict.fromkeys(run_dirs))
+        return prior
+
+    def stats(self) -> Dict[str, int]:
+        """各类型文档数量统计"""
+        counts = dict(self.conn.execute("SELECT kind, COUNT(*) FROM docs GROUP BY kind"))
+        counts["files"] = self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        return counts
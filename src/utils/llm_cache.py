@@ -0,0 +1,370 @@
+"""
+LLM 响应磁盘缓存
+同样的输入重跑工作流（调试下游阶段、跑基准测试）时直接复用已有响应，不再调用 API
+
+- 缓存键：模型名 + 消息（含系统提示词）+ 模型设置 + 工具/输出 schema 的规范化哈希，
+  时间戳等易变字段不参与计算
+- 存储：SQLite（默认 .cache/llm_responses.sqlite），支持 TTL 和按总大小 LRU 淘汰
+- 模式：read（读穿透）/ record（只写，总是调用 API）/ replay（只读，未命中报错）
+- 流式请求同样缓存：命中时一次性回放缓存的响应，未命中时在流结束后写入完整响应
+  （replay 模式下流式请求未命中同样报错，不会悄悄调用 API）
+"""
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from pydantic import TypeAdapter
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter, ModelResponse, ModelResponseStreamEvent
+from pydantic_ai.models import Model, ModelRequestParameters, StreamedResponse
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+from pydantic_ai.usage import RequestUsage
+
+# 默认缓存位置
+DEFAULT_CACHE_PATH = Path(".cache") / "llm_responses.sqlite"
+
+# 缓存模式
+MODE_OFF = "off"
+MODE_READ = "read"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+MODES = (MODE_OFF, MODE_READ, MODE_RECORD, MODE_REPLAY)
+
+# 默认容量上限（字节）
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# 不参与缓存键计算的易变字段
+_VOLATILE_MESSAGE_KEYS = {"timestamp", "run_id", "metadata", "usage", "provider_response_id",
+                          "provider_details", "provider_url"}
+_VOLATILE_PART_KEYS = {"timestamp", "provider_details"}
+
+_PARAMS_ADAPTER = TypeAdapter(ModelRequestParameters)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at);
+"""
+
+
+class LLMCacheMiss(RuntimeError):
+    """replay 模式下缓存未命中"""
+
+
+def _normalize_messages(messages: List[ModelMessage]) -> List[Dict[str, Any]]:
+    """消息转为 JSON 结构并去掉易变字段（只处理消息和 part 两层，不改动工具参数等内容）"""
+    normalized = []
+    for message in ModelMessagesTypeAdapter.dump_python(messages, mode="json"):
+        message = {k: v for k, v in message.items() if k not in _VOLATILE_MESSAGE_KEYS}
+        message["parts"] = [
+            {k: v for k, v in part.items() if k not in _VOLATILE_PART_KEYS}
+            for part in message.get("parts", [])
+        ]
+        normalized.append(message)
+    return normalized
+
+
+def request_key(
+    model_name: str,
+    messages: List[ModelMessage],
+    model_settings: Optional[ModelSettings],
+    model_request_parameters: ModelRequestParameters
+) -> str:
+    """
+    计算请求的缓存键
+
+    Args:
+        model_name: 模型名称
+        messages: 消息历史（系统提示词包含在首条请求中）
+        model_settings: 模型设置（温度等）
+        model_request_parameters: 工具定义、输出 schema 等
+
+    Returns:
+        SHA-256 十六进制摘要
+    """
+    payload = {
+        "model": model_name,
+        "messages": _normalize_messages(messages),
+        "settings": dict(model_settings or {}),
+        "parameters": _PARAMS_ADAPTER.dump_python(model_request_parameters, mode="json"),
+    }
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """缓存命中统计"""
+
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+    saved_input_tokens: int = 0
+    saved_output_tokens: int = 0
+
+
+class LLMCache:
+    """SQLite 响应缓存"""
+
+    def __init__(
+        self,
+        db_path: Path | str = DEFAULT_CACHE_PATH,
+        mode: str = MODE_READ,
+        ttl: Optional[float] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        """
+        打开（或创建）缓存
+
+        Args:
+            db_path: 数据库文件路径
+            mode: read / record / replay
+            ttl: 过期时间（秒），None 表示永不过期
+            max_bytes: 缓存总大小上限，超出后按最近访问时间淘汰
+        """
+        if mode not in MODES:
+            raise ValueError(f"未知的缓存模式: {mode}（可选: {', '.join(MODES)}）")
+
+        self.mode = mode
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        self.conn.close()
+
+    def get(self, key: str) -> Optional[ModelResponse]:
+        """
+        读取缓存（过期条目视为未命中并删除）
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存的响应，未命中时返回 None
+        """
+        row = self.conn.execute(
+            "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        now = time.time()
+        if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+            if row is not None:
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.conn.commit()
+            self.stats.misses += 1
+            return None
+
+        self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        self.conn.commit()
+        self.stats.hits += 1
+        return ModelMessagesTypeAdapter.validate_json(row[0])[0]
+
+    def put(self, key: str, model_name: str, response: ModelResponse) -> None:
+        """
+        写入缓存并按容量上限淘汰
+
+        Args:
+            key: 缓存键
+            model_name: 模型名称
+            response: 模型响应
+        """
+        blob = ModelMessagesTypeAdapter.dump_json([response])
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, model_name, blob, len(blob), now, now)
+        )
+        self.stats.writes += 1
+        self._evict()
+        self.conn.commit()
+
+    def _evict(self) -> None:
+        """删除过期条目，并按最近访问时间淘汰直到总大小不超过上限"""
+        if self.ttl is not None:
+            cursor = self.conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+            self.stats.evictions += cursor.rowcount
+
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evict = []
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if total <= self.max_bytes:
+                break
+            evict.append((key,))
+            total -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", evict)
+        self.stats.evictions += len(evict)
+
+    def summary(self) -> Dict[str, Any]:
+        """缓存条目数、总大小和本次运行的命中统计"""
+        entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"mode": self.mode, "entries": entries, "bytes": size, **self.stats.__dict__}
+
+
+@dataclass
+class CachedStreamedResponse(StreamedResponse):
+    """把缓存的响应作为流式响应回放（每个 part 一次性给出）"""
+
+    response: ModelResponse
+
+    async def _get_event_iterator(self) -> AsyncIterator[ModelResponseStreamEvent]:
+        """按顺序给出缓存响应的各个 part"""
+        self.provider_response_id = self.response.provider_response_id
+        self.provider_details = self.response.provider_details
+        self.finish_reason = self.response.finish_reason
+        for part in self.response.parts:
+            yield self._parts_manager.handle_part(vendor_part_id=None, part=part)
+
+    @property
+    def model_name(self) -> str:
+        """缓存响应的模型名称"""
+        return self.response.model_name or ""
+
+    @property
+    def provider_name(self) -> Optional[str]:
+        """缓存响应的提供方"""
+        return self.response.provider_name
+
+    @property
+    def provider_url(self) -> Optional[str]:
+        """缓存响应的提供方地址"""
+        return self.response.provider_url
+
+    @property
+    def timestamp(self) -> datetime:
+        """缓存响应的时间戳"""
+        return self.response.timestamp
+
+
+class CachedModel(WrapperModel):
+    """带响应缓存的 Model 包装"""
+
+    def __init__(self, wrapped: Model, cache: LLMCache):
+        """
+        包装模型
+
+        Args:
+            wrapped: 实际调用 API 的模型
+            cache: 响应缓存
+        """
+        super().__init__(wrapped)
+        self.cache = cache
+
+    def _lookup(self, key: str) -> Optional[ModelResponse]:
+        """
+        按缓存模式查找响应
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            命中的响应（用量清零），需要调用 API 时返回 None
+
+        Raises:
+            LLMCacheMiss: replay 模式下未命中
+        """
+        if self.cache.mode not in (MODE_READ, MODE_REPLAY):
+            return None
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache.stats.saved_input_tokens += cached.usage.input_tokens
+            self.cache.stats.saved_output_tokens += cached.usage.output_tokens
+            # 命中不产生实际用量
+            cached.usage = RequestUsage()
+            return cached
+        if self.cache.mode == MODE_REPLAY:
+            raise LLMCacheMiss(f"replay 模式缓存未命中（{self.model_name}，key={key[:12]}）")
+        return None
+
+    async def request(
+        self,
+        messages: List[ModelMessage],
+        model_settings: Optional[ModelSettings],
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        """按缓存模式处理非流式请求"""
+        key = request_key(self.model_name, messages, model_settings, model_request_parameters)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        response = await super().request(messages, model_settings, model_request_parameters)
+        self.cache.put(key, self.model_name, response)
+        return response
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: List[ModelMessage],
+        model_settings: Optional[ModelSettings],
+        model_request_parameters: ModelRequestParameters,
+        run_context: Optional[Any] = None,
+    ) -> AsyncIterator[StreamedResponse]:
+        """按缓存模式处理流式请求（流正常结束后写入完整响应）"""
+        key = request_key(self.model_name, messages, model_settings, model_request_parameters)
+        cached = self._lookup(key)
+        if cached is not None:
+            yield CachedStreamedResponse(model_request_parameters, response=cached)
+            return
+
+        async with super().request_stream(
+            messages, model_settings, model_request_parameters, run_context
+        ) as stream:
+            yield stream
+        self.cache.put(key, self.model_name, stream.get())
+
+
+# 全局共享的缓存（由 CLI 配置，get_anthropic_model 据此包装模型）
+_shared_cache: Optional[LLMCache] = None
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """获取共享缓存（未启用时为 None）"""
+    return _shared_cache
+
+
+def configure_llm_cache(
+    mode: str = MODE_OFF,
+    db_path: Path | str = DEFAULT_CACHE_PATH,
+    ttl: Optional[float] = None,
+    max_bytes: int = DEFAULT_MAX_BYTES
+) -> Optional[LLMCache]:
+    """
+    配置共享缓存（需在创建 Agent 之前调用）
+
+    Args:
+        mode: off / read / record / replay
+        db_path: 数据库文件路径
+        ttl: 过期时间（秒）
+        max_bytes: 缓存总大小上限
+
+    Returns:
+        启用的缓存，mode 为 off 时返回 None
+    """
+    global _shared_cache
+    if _shared_cache is not None:
+        _shared_cache.close()
+    _shared_cache = None if mode == MODE_OFF else LLMCache(db_path, mode=mode, ttl=ttl, max_bytes=max_bytes)
+    return _shared_cache
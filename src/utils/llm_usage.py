@@ -0,0 +1,104 @@
+"""
+LLM 调用用量统计
+汇总调用次数、token 用量、耗时，并按模型单价估算成本
+"""
+import math
+import re
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+# 模型单价（美元 / 百万 token）：(输入, 输出, 缓存读取, 缓存写入)
+MODEL_PRICES: Dict[str, tuple] = {
+    "claude-sonnet-4-20250514": (3.0, 15.0, 0.30, 3.75),
+    "claude-3-5-haiku-20241022": (0.80, 4.0, 0.08, 1.0),
+    "claude-opus-4-20250514": (15.0, 75.0, 1.50, 18.75),
+}
+
+# 未知模型按 Sonnet 单价估算
+DEFAULT_PRICE = MODEL_PRICES["claude-sonnet-4-20250514"]
+
+# 本地 token 估算：中日韩字符和全角标点约 1 token/字，其余约 4 字符/token
+CHARS_PER_TOKEN = 4
+_WIDE_CHAR_RE = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]")
+
+
+@dataclass
+class UsageStats:
+    """一组 LLM 调用的用量统计"""
+
+    calls: int = 0
+    requests: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+    latency: float = 0.0
+    cost: float = 0.0
+
+    def add(self, usage: Any, latency: float = 0.0, model_name: Optional[str] = None) -> None:
+        """
+        累加一次 Agent 运行的用量
+
+        Args:
+            usage: pydantic-ai 的 RunUsage（run_result.usage()）
+            latency: 本次调用耗时（秒）
+            model_name: 模型名称（用于估算成本）
+        """
+        self.calls += 1
+        self.requests += getattr(usage, "requests", 0) or 0
+        self.input_tokens += getattr(usage, "input_tokens", 0) or 0
+        self.output_tokens += getattr(usage, "output_tokens", 0) or 0
+        self.cache_read_tokens += getattr(usage, "cache_read_tokens", 0) or 0
+        self.cache_write_tokens += getattr(usage, "cache_write_tokens", 0) or 0
+        self.latency += latency
+        self.cost += estimate_cost(usage, model_name)
+
+    def merge(self, other: "UsageStats") -> None:
+        """合并另一组统计"""
+        for field, value in asdict(other).items():
+            setattr(self, field, getattr(self, field) + value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化字典"""
+        data = asdict(self)
+        data["latency"] = round(self.latency, 3)
+        data["cost"] = round(self.cost, 6)
+        return data
+
+
+def estimate_cost(usage: Any, model_name: Optional[str] = None) -> float:
+    """
+    按模型单价估算一次调用的成本（美元）
+
+    Args:
+        usage: RunUsage / RequestUsage
+        model_name: 模型名称
+
+    Returns:
+        估算成本
+    """
+    price_in, price_out, price_cache_read, price_cache_write = MODEL_PRICES.get(model_name or "", DEFAULT_PRICE)
+    cache_read = getattr(usage, "cache_read_tokens", 0) or 0
+    cache_write = getattr(usage, "cache_write_tokens", 0) or 0
+    # pydantic-ai 的 input_tokens 已包含缓存读写的 token，需扣除后按原价计费
+    uncached = max(0, (getattr(usage, "input_tokens", 0) or 0) - cache_read - cache_write)
+    return (
+        uncached * price_in
+        + (getattr(usage, "output_tokens", 0) or 0) * price_out
+        + cache_read * price_cache_read
+        + cache_write * price_cache_write
+    ) / 1_000_000
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    本地估算文本的 token 数（不调用 API，用于比较和预算检查）
+
+    Args:
+        text: 文本
+
+    Returns:
+        估算的 token 数
+    """
+    wide = len(_WIDE_CHAR_RE.findall(text))
+    return wide + math.ceil((len(text) - wide) / CHARS_PER_TOKEN)
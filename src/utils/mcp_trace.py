@@ -0,0 +1,453 @@
+"""
+Playwright MCP 流量录制 / 回放
+录制真实运行中每次 MCP 工具调用的参数和结果，回放时不启动浏览器，按调用匹配返回录制的结果。
+生产环境的研究会话可以离线重跑，用真实页面数据评估 token 用量、历史增长和压缩策略
+
+- 存储：每个 Server（research / image）一个 gzip 压缩的 JSONL 文件（默认 .cache/mcp_traces/<label>.jsonl.gz），
+  结果按内容哈希去重（同一页面的快照、重复的 evaluate 结果只存一份）
+- 录制：每次会话结束（连接关闭）时追加写入一个 gzip 分段，运行中断时已结束的会话不会丢失
+- 回放匹配：先按 工具名 + 规范化参数 精确匹配（同一调用多次出现时按录制顺序依次返回，用尽后重复最后一次），
+  参数不同时退化为同名工具的下一次未用调用，均未命中时抛出 MCPTraceMiss
+- 录制时的工具错误回放为 ModelRetry，截图等二进制结果按 base64 保存
+- 回放不会重现下载等副作用（Gemini 生成的图片不会写入下载目录）
+"""
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from mcp import types as mcp_types
+from pydantic_ai.exceptions import ModelRetry
+from pydantic_ai.mcp import MCPServerStdio
+from pydantic_ai.messages import BinaryContent
+
+# 默认录制目录
+DEFAULT_TRACE_DIR = Path(".cache") / "mcp_traces"
+
+# 录制模式
+MODE_OFF = "off"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+MODES = (MODE_OFF, MODE_RECORD, MODE_REPLAY)
+
+# 二进制结果的标记键
+_BINARY_KEY = "$binary"
+
+# 记录类型
+_KIND_TOOLS = "tools"
+_KIND_BLOB = "blob"
+_KIND_CALL = "call"
+
+
+class MCPTraceMiss(RuntimeError):
+    """replay 模式下没有可匹配的录制调用"""
+
+
+def trace_path(trace_dir: Path | str, label: str) -> Path:
+    """录制文件路径"""
+    return Path(trace_dir) / f"{label}.jsonl.gz"
+
+
+def _encode(value: Any) -> Any:
+    """工具结果转为可 JSON 序列化的结构（二进制内容转 base64）"""
+    if isinstance(value, BinaryContent):
+        return {_BINARY_KEY: base64.b64encode(value.data).decode("ascii"), "media_type": value.media_type}
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    return value
+
+
+def _decode(value: Any) -> Any:
+    """_encode 的逆过程"""
+    if isinstance(value, dict) and _BINARY_KEY in value:
+        return BinaryContent.narrow_type(
+            BinaryContent(data=base64.b64decode(value[_BINARY_KEY]), media_type=value["media_type"])
+        )
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+def _dumps(value: Any) -> str:
+    """规范化 JSON（用于哈希和匹配）"""
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def call_key(tool: str, args: Dict[str, Any]) -> str:
+    """调用匹配键：工具名 + 规范化参数"""
+    return f"{tool}:{_dumps(args)}"
+
+
+@dataclass
+class TraceStats:
+    """录制 / 回放统计"""
+
+    calls: int = 0
+    errors: int = 0
+    exact: int = 0  # 回放：精确匹配
+    fallback: int = 0  # 回放：按工具名退化匹配
+    misses: int = 0
+    result_bytes: int = 0  # 结果原始大小（去重前）
+    stored_bytes: int = 0  # 录制文件大小（压缩后）
+
+
+@dataclass
+class TracedCall:
+    """一次录制的工具调用"""
+
+    seq: int
+    tool: str
+    args: Dict[str, Any]
+    result: Any = None
+    error: Optional[str] = None
+    latency: float = 0.0
+
+
+class MCPTraceWriter:
+    """按会话分段追加写入的录制文件"""
+
+    def __init__(self, path: Path):
+        """
+        创建录制文件（已存在时覆盖）
+
+        Args:
+            path: 录制文件路径
+        """
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_bytes(b"")
+        self.stats = TraceStats()
+        self._seq = 0
+        self._blobs: set = set()
+        self._pending: List[Dict[str, Any]] = []
+        self._tools_written = False
+
+    def add_tools(self, tools: Sequence[mcp_types.Tool]) -> None:
+        """记录工具列表（只记录一次）"""
+        if self._tools_written:
+            return
+        self._tools_written = True
+        self._pending.append({"t": _KIND_TOOLS, "tools": [tool.model_dump(mode="json") for tool in tools]})
+
+    def add_call(self, tool: str, args: Dict[str, Any], result: Any, error: Optional[str], latency: float) -> None:
+        """
+        记录一次调用（结果按内容哈希去重）
+
+        Args:
+            tool: 工具名（不含前缀）
+            args: 调用参数
+            result: 工具结果（出错时为 None）
+            error: 错误信息
+            latency: 耗时（秒）
+        """
+        self._seq += 1
+        self.stats.calls += 1
+        record: Dict[str, Any] = {"t": _KIND_CALL, "seq": self._seq, "tool": tool, "args": args,
+                                  "ms": round(latency * 1000)}
+        if error is not None:
+            self.stats.errors += 1
+            record["error"] = error
+        else:
+            encoded = _encode(result)
+            text = _dumps(encoded)
+            blob_id = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+            self.stats.result_bytes += len(text.encode("utf-8"))
+            if blob_id not in self._blobs:
+                self._blobs.add(blob_id)
+                self._pending.append({"t": _KIND_BLOB, "id": blob_id, "v": encoded})
+            record["blob"] = blob_id
+        self._pending.append(record)
+
+    def flush(self) -> None:
+        """追加写入一个 gzip 分段"""
+        if not self._pending:
+            return
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in self._pending)
+        with gzip.open(self.path, "at", encoding="utf-8", compresslevel=9) as f:
+            f.write(lines)
+        self._pending = []
+        self.stats.stored_bytes = self.path.stat().st_size
+
+
+class MCPTrace:
+    """加载后的录制（工具列表 + 按顺序的调用）"""
+
+    def __init__(self, path: Path):
+        """
+        读取录制文件
+
+        Args:
+            path: 录制文件路径
+
+        Raises:
+            FileNotFoundError: 录制文件不存在
+        """
+        self.path = path
+        self.tools: List[mcp_types.Tool] = []
+        self.calls: List[TracedCall] = []
+        blobs: Dict[str, Any] = {}
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                kind = record["t"]
+                if kind == _KIND_TOOLS:
+                    self.tools = [mcp_types.Tool.model_validate(tool) for tool in record["tools"]]
+                elif kind == _KIND_BLOB:
+                    blobs[record["id"]] = record["v"]
+                elif kind == _KIND_CALL:
+                    self.calls.append(TracedCall(
+                        seq=record["seq"], tool=record["tool"], args=record["args"],
+                        result=blobs.get(record.get("blob")), error=record.get("error"),
+                        latency=record["ms"] / 1000,
+                    ))
+
+
+class TraceMatcher:
+    """按调用匹配录制的结果"""
+
+    def __init__(self, trace: MCPTrace):
+        """
+        初始化
+
+        Args:
+            trace: 录制
+        """
+        self.trace = trace
+        self.stats = TraceStats()
+        self._used: set = set()
+        self._by_key: Dict[str, Deque[TracedCall]] = defaultdict(deque)
+        self._last_by_key: Dict[str, TracedCall] = {}
+        self._by_tool: Dict[str, Deque[TracedCall]] = defaultdict(deque)
+        for call in trace.calls:
+            self._by_key[call_key(call.tool, call.args)].append(call)
+            self._by_tool[call.tool].append(call)
+
+    def _take(self, queue: Deque[TracedCall]) -> Optional[TracedCall]:
+        """取队列中下一次未使用的调用"""
+        while queue:
+            call = queue.popleft()
+            if call.seq not in self._used:
+                self._used.add(call.seq)
+                return call
+        return None
+
+    def match(self, tool: str, args: Dict[str, Any]) -> Tuple[TracedCall, bool]:
+        """
+        匹配一次调用
+
+        Args:
+            tool: 工具名（不含前缀）
+            args: 调用参数
+
+        Returns:
+            (录制的调用, 是否精确匹配)
+
+        Raises:
+            MCPTraceMiss: 没有可匹配的调用
+        """
+        self.stats.calls += 1
+        key = call_key(tool, args)
+        call = self._take(self._by_key.get(key, deque()))
+        if call is None and key in self._last_by_key:
+            call = self._last_by_key[key]
+        if call is not None:
+            self._last_by_key[key] = call
+            self.stats.exact += 1
+            return call, True
+
+        call = self._take(self._by_tool.get(tool, deque()))
+        if call is not None:
+            self.stats.fallback += 1
+            return call, False
+
+        self.stats.misses += 1
+        raise MCPTraceMiss(f"replay 模式没有可匹配的录制调用（{self.trace.path.name}: {tool}）")
+
+
+class RecordingMCPServer(MCPServerStdio):
+    """录制工具调用的 MCPServerStdio"""
+
+    def __init__(self, *args: Any, writer: MCPTraceWriter, **kwargs: Any):
+        """
+        创建录制 Server（其余参数与 MCPServerStdio 相同）
+
+        Args:
+            writer: 录制文件
+        """
+        super().__init__(*args, **kwargs)
+        self.writer = writer
+
+    async def list_tools(self) -> List[mcp_types.Tool]:
+        """列出工具并记录"""
+        tools = await super().list_tools()
+        self.writer.add_tools(tools)
+        return tools
+
+    async def direct_call_tool(
+        self, name: str, args: Dict[str, Any], metadata: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """调用工具并记录参数、结果和耗时"""
+        start = time.perf_counter()
+        try:
+            result = await super().direct_call_tool(name, args, metadata)
+        except ModelRetry as e:
+            self.writer.add_call(name, args, None, e.message, time.perf_counter() - start)
+            raise
+        self.writer.add_call(name, args, result, None, time.perf_counter() - start)
+        return result
+
+    async def __aexit__(self, *args: Any) -> Optional[bool]:
+        """连接关闭时写入本次会话的录制"""
+        try:
+            return await super().__aexit__(*args)
+        finally:
+            if not self.is_running:
+                self.writer.flush()
+
+
+class ReplayMCPServer(MCPServerStdio):
+    """回放录制结果的 MCPServerStdio（不启动子进程）"""
+
+    def __init__(self, *args: Any, matcher: TraceMatcher, replay_latency: bool = False, **kwargs: Any):
+        """
+        创建回放 Server（其余参数与 MCPServerStdio 相同，仅用于工具前缀等配置）
+
+        Args:
+            matcher: 录制匹配器
+            replay_latency: 按录制耗时等待（默认立即返回）
+        """
+        super().__init__(*args, **kwargs)
+        self.matcher = matcher
+        self.replay_latency = replay_latency
+
+    async def __aenter__(self) -> "ReplayMCPServer":
+        self._running_count += 1
+        return self
+
+    async def __aexit__(self, *args: Any) -> Optional[bool]:
+        self._running_count = max(self._running_count - 1, 0)
+        return None
+
+    async def list_tools(self) -> List[mcp_types.Tool]:
+        """录制的工具列表"""
+        if not self.matcher.trace.tools:
+            raise MCPTraceMiss(f"录制中没有工具列表（{self.matcher.trace.path.name}）")
+        return self.matcher.trace.tools
+
+    async def direct_call_tool(
+        self, name: str, args: Dict[str, Any], metadata: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """返回匹配的录制结果（录制时出错的调用重新抛出 ModelRetry）"""
+        call, _ = self.matcher.match(name, args)
+        if self.replay_latency and call.latency:
+            await asyncio.sleep(call.latency)
+        if call.error is not None:
+            self.matcher.stats.errors += 1
+            raise ModelRetry(call.error)
+        return _decode(call.result)
+
+
+class MCPTraceConfig:
+    """录制 / 回放配置（按 Server 标签管理录制文件）"""
+
+    def __init__(self, mode: str, trace_dir: Path | str = DEFAULT_TRACE_DIR, replay_latency: bool = False):
+        """
+        初始化
+
+        Args:
+            mode: record / replay
+            trace_dir: 录制目录
+            replay_latency: 回放时按录制耗时等待
+        """
+        if mode not in MODES:
+            raise ValueError(f"未知的 MCP 录制模式: {mode}（可选: {', '.join(MODES)}）")
+        self.mode = mode
+        self.trace_dir = Path(trace_dir)
+        self.replay_latency = replay_latency
+        self.writers: Dict[str, MCPTraceWriter] = {}
+        self.matchers: Dict[str, TraceMatcher] = {}
+
+    def writer(self, label: str) -> MCPTraceWriter:
+        """标签对应的录制文件（同一进程内共享，首次使用时清空）"""
+        if label not in self.writers:
+            self.writers[label] = MCPTraceWriter(trace_path(self.trace_dir, label))
+        return self.writers[label]
+
+    def matcher(self, label: str) -> TraceMatcher:
+        """标签对应的回放匹配器（同一进程内共享，调用按顺序消费）"""
+        if label not in self.matchers:
+            self.matchers[label] = TraceMatcher(MCPTrace(trace_path(self.trace_dir, label)))
+        return self.matchers[label]
+
+    def flush(self) -> None:
+        """写入所有未结束会话的录制"""
+        for writer in self.writers.values():
+            writer.flush()
+
+    def summary(self) -> Dict[str, Any]:
+        """各标签的录制 / 回放统计"""
+        stats = {label: w.stats for label, w in self.writers.items()}
+        stats.update({label: m.stats for label, m in self.matchers.items()})
+        return {"mode": self.mode, "trace_dir": str(self.trace_dir),
+                "servers": {label: s.__dict__ for label, s in stats.items()}}
+
+
+# 全局共享的录制配置（由 CLI 配置，create_mcp_server 据此选择实现）
+_shared_config: Optional[MCPTraceConfig] = None
+
+
+def get_mcp_trace() -> Optional[MCPTraceConfig]:
+    """获取共享的录制配置（未启用时为 None）"""
+    return _shared_config
+
+
+def configure_mcp_trace(
+    mode: str = MODE_OFF,
+    trace_dir: Path | str = DEFAULT_TRACE_DIR,
+    replay_latency: bool = False
+) -> Optional[MCPTraceConfig]:
+    """
+    配置共享的录制 / 回放（需在创建 Agent 之前调用）
+
+    Args:
+        mode: off / record / replay
+        trace_dir: 录制目录
+        replay_latency: 回放时按录制耗时等待
+
+    Returns:
+        启用的配置，mode 为 off 时返回 None
+    """
+    global _shared_config
+    if _shared_config is not None:
+        _shared_config.flush()
+    _shared_config = None if mode == MODE_OFF else MCPTraceConfig(mode, trace_dir, replay_latency)
+    return _shared_config
+
+
+def create_mcp_server(label: str, command: str, args: Sequence[str], **kwargs: Any) -> MCPServerStdio:
+    """
+    创建 Playwright MCP Server（按共享配置录制或回放）
+
+    Args:
+        label: Server 标签（决定录制文件名，如 research / image）
+        command: 启动命令
+        args: 命令参数
+        **kwargs: 透传给 MCPServerStdio 的参数（env、tool_prefix 等）
+
+    Returns:
+        MCPServerStdio / RecordingMCPServer / ReplayMCPServer
+    """
+    config = get_mcp_trace()
+    if config is None:
+        return MCPServerStdio(command, args, **kwargs)
+    if config.mode == MODE_RECORD:
+        return RecordingMCPServer(command, args, writer=config.writer(label), **kwargs)
+    return ReplayMCPServer(
+        command, args, matcher=config.matcher(label), replay_latency=config.replay_latency, **kwargs
+    )
@@ -0,0 +1,229 @@
+"""
+内存画像（可选，--memory-profile 开启）
+在阶段起止和 Reflexion 轮次边界拍 tracemalloc 快照，回答"RSS 为什么一直涨"：
+
+- 按分配调用栈归类：图片缓冲（读取 / 下载图片）、工具结果（MCP、浏览器宏）、
+  消息历史（pydantic-ai 消息和模型响应解析），其余计入 other
+- 最大持有者：按分配位置（文件:行号）排序的存活内存，以及相对上一个检查点的增长
+- 消息历史：各轮开始时直接统计消息列表中的文本、工具结果和图片字节数
+
+结果写入 run_profile.json 的 memory 字段。tracemalloc 会明显拖慢分配密集的代码，
+快照在事件循环上同步执行，仅用于排查，不建议常开
+"""
+import time
+import tracemalloc
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+
+from pydantic_ai.messages import (
+    BinaryContent, ModelRequest, ModelResponse, TextPart, ToolCallPart, ToolReturnPart, UserPromptPart
+)
+
+from .tool_metrics import payload_size
+
+# 保留的调用栈深度（归类需要看到业务代码所在的帧）
+TRACE_FRAMES = 10
+
+# 报告中的最大持有者数量
+TOP_RETAINERS = 10
+
+# 分配归类（按顺序匹配调用栈中任一帧的文件路径）
+CATEGORY_IMAGE = "image_buffers"
+CATEGORY_TOOL = "tool_results"
+CATEGORY_MESSAGES = "message_history"
+CATEGORY_OTHER = "other"
+CATEGORY_PATTERNS: Sequence[tuple] = (
+    (CATEGORY_IMAGE, ("agents/image_review.py", "utils/download_manager.py", "/PIL/")),
+    (CATEGORY_TOOL, ("/mcp/", "pydantic_ai/mcp.py", "utils/mcp_trace.py", "utils/browser_macros.py")),
+    (CATEGORY_MESSAGES, ("pydantic_ai/messages.py", "pydantic_ai/_agent_graph.py", "pydantic_ai/models/", "/anthropic/")),
+)
+
+# 不计入的分配（tracemalloc 自身和导入机制）
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+@lru_cache(maxsize=None)
+def _file_category(filename: str) -> Optional[str]:
+    """文件所属的归类（不属于任何归类时为 None）"""
+    filename = filename.replace("\\", "/")
+    for category, patterns in CATEGORY_PATTERNS:
+        if any(pattern in filename for pattern in patterns):
+            return category
+    return None
+
+
+def categorize(traceback: tracemalloc.Traceback) -> str:
+    """按调用栈归类一处分配（调用栈中出现多个归类时取优先级最高的）"""
+    found = {_file_category(frame.filename) for frame in traceback}
+    for category, _ in CATEGORY_PATTERNS:
+        if category in found:
+            return category
+    return CATEGORY_OTHER
+
+
+def measure_messages(messages: Sequence[Any]) -> Dict[str, int]:
+    """
+    统计消息历史中各类内容的字节数
+
+    Args:
+        messages: ModelMessage 列表
+
+    Returns:
+        {messages, text_bytes, tool_result_bytes, image_bytes}
+    """
+    sizes = {"messages": len(messages), "text_bytes": 0, "tool_result_bytes": 0, "image_bytes": 0}
+    for message in messages:
+        if isinstance(message, ModelRequest):
+            for part in message.parts:
+                if isinstance(part, ToolReturnPart):
+                    sizes["tool_result_bytes"] += payload_size(part.content)
+                elif isinstance(part, UserPromptPart) and not isinstance(part.content, str):
+                    for item in part.content:
+                        key = "image_bytes" if isinstance(item, BinaryContent) else "text_bytes"
+                        sizes[key] += payload_size(item)
+                else:
+                    sizes["text_bytes"] += payload_size(getattr(part, "content", None))
+        elif isinstance(message, ModelResponse):
+            for part in message.parts:
+                if isinstance(part, ToolCallPart):
+                    sizes["text_bytes"] += payload_size(part.args)
+                elif isinstance(part, TextPart):
+                    sizes["text_bytes"] += payload_size(part.content)
+    return sizes
+
+
+@dataclass
+class Checkpoint:
+    """一个检查点的内存状态"""
+
+    label: str
+    at: float
+    current_mb: float
+    peak_mb: float
+    categories: Dict[str, int]
+    growth: List[Dict[str, Any]]
+    history: Optional[Dict[str, int]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化字典"""
+        data = {
+            "label": self.label,
+            "at": round(self.at, 3),
+            "current_mb": round(self.current_mb, 2),
+            "peak_mb": round(self.peak_mb, 2),
+            "categories": self.categories,
+            "growth": self.growth,
+        }
+        if self.history is not None:
+            data["history"] = self.history
+        return data
+
+
+class MemoryProfiler:
+    """tracemalloc 检查点（由 RunProfiler 在阶段 / 轮次边界调用）"""
+
+    def __init__(self, top: int = TOP_RETAINERS, frames: int = TRACE_FRAMES):
+        """
+        初始化
+
+        Args:
+            top: 报告的最大持有者 / 增长项数量
+            frames: 保留的调用栈深度
+        """
+        self.top = top
+        self.frames = frames
+        self.checkpoints: List[Checkpoint] = []
+        self.retainers: List[Dict[str, Any]] = []
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._peak_current = 0
+        self._started_here = False
+        self._start = time.perf_counter()
+
+    def start(self) -> None:
+        """开始跟踪（已由其他代码启动时沿用）"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_here = True
+
+    def stop(self) -> None:
+        """停止跟踪（只停止本画像启动的跟踪）"""
+        if self._started_here and tracemalloc.is_tracing():
+            tracemalloc.stop()
+            self._started_here = False
+
+    def _location(self, stat: Any) -> str:
+        """统计项的分配位置（最内层帧）"""
+        frame = stat.traceback[-1]
+        return f"{frame.filename}:{frame.lineno}"
+
+    def checkpoint(self, label: str, messages: Optional[Sequence[Any]] = None) -> None:
+        """
+        拍快照并记录归类、相对上一检查点的增长；存活内存达到新高时更新最大持有者
+
+        Args:
+            label: 检查点名称（阶段:start / 阶段:end / 阶段:roundN）
+            messages: 当前消息历史（统计各类内容字节数）
+        """
+        if not tracemalloc.is_tracing():
+            return
+        snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+        current, peak = tracemalloc.get_traced_memory()
+
+        # 按完整调用栈聚合后再归类（相同调用栈的分配只归类一次）
+        stats = snapshot.statistics("traceback")
+        categories: Dict[str, int] = {}
+        for stat in stats:
+            category = categorize(stat.traceback)
+            categories[category] = categories.get(category, 0) + stat.size
+
+        growth = []
+        if self._previous is not None:
+            for stat in snapshot.compare_to(self._previous, "lineno")[:self.top]:
+                if stat.size_diff <= 0:
+                    break
+                growth.append({"where": self._location(stat), "size_diff": stat.size_diff,
+                               "count_diff": stat.count_diff})
+        self._previous = snapshot
+
+        if current >= self._peak_current:
+            self._peak_current = current
+            self.retainers = [
+                {"where": self._location(stat), "size": stat.size, "count": stat.count,
+                 "category": categorize(stat.traceback)}
+                for stat in stats[:self.top]
+            ]
+
+        self.checkpoints.append(Checkpoint(
+            label=label,
+            at=time.perf_counter() - self._start,
+            current_mb=current / 1024 / 1024,
+            peak_mb=peak / 1024 / 1024,
+            categories=dict(sorted(categories.items(), key=lambda item: -item[1])),
+            growth=growth,
+            history=measure_messages(messages) if messages is not None else None,
+        ))
+
+    def report(self) -> Dict[str, Any]:
+        """各检查点，以及存活内存最高时的最大持有者"""
+        return {
+            "peak_mb": round(max((c.peak_mb for c in self.checkpoints), default=0.0), 2),
+            "largest_retainers": self.retainers,
+            "checkpoints": [c.to_dict() for c in self.checkpoints],
+        }
+
+    def print_report(self, top: int = 5) -> None:
+        """打印峰值和最大持有者"""
+        if not self.checkpoints:
+            return
+        last = self.checkpoints[-1]
+        peak = max(c.peak_mb for c in self.checkpoints)
+        print(f"\n🧠 内存（tracemalloc）: 峰值 {peak:.1f}MB，结束时 {last.current_mb:.1f}MB")
+        print("   " + "，".join(f"{k} {v / 1024 / 1024:.1f}MB" for k, v in last.categories.items()))
+        for item in self.retainers[:top]:
+            print(f"   - {item['where']}（{item['category']}）: {item['size'] / 1024:.0f}KB / {item['count']} 个对象")
@@ -0,0 +1,284 @@
+"""
+按 Agent 角色分层路由模型
+- 审核、提示词生成等偏校验/改写的角色默认使用快速模型
+- 输出校验失败或审核评分处于临界区间时，自动升级到强模型重跑
+- 按角色统计延迟和 token，便于调整路由策略；升级前的快速模型尝试（含输出校验失败的）
+  同样计入，并单独汇总在 escalated 中
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic_ai import Agent
+from pydantic_ai.exceptions import UnexpectedModelBehavior
+from pydantic_ai.models import Model
+from pydantic_ai.usage import RunUsage
+
+from .anthropic_provider import get_anthropic_model
+from .llm_usage import UsageStats
+from .progress import note
+from .run_profile import get_run_profiler
+
+# 模型分层
+TIER_FAST = "fast"
+TIER_STRONG = "strong"
+
+TIER_MODELS: Dict[str, str] = {
+    TIER_FAST: "claude-3-5-haiku-20241022",
+    TIER_STRONG: "claude-sonnet-4-20250514",
+}
+
+# 角色 → 默认分层（未列出的角色使用强模型）
+ROLE_TIERS: Dict[str, str] = {
+    "research.generator": TIER_STRONG,
+    "research.reviewer": TIER_FAST,
+    "content.generator": TIER_STRONG,
+    "content.reviewer": TIER_FAST,
+    "image.prompt_generator": TIER_FAST,
+    "image.gemini_operator": TIER_STRONG,
+    "image.visual_reviewer": TIER_STRONG,  # 视觉审核依赖多模态能力
+}
+
+# 路由模式
+MODE_TIERED = "tiered"
+MODE_STRONG = "strong"
+MODES = (MODE_TIERED, MODE_STRONG)
+
+# 审核评分临界区间：距离通过线不超过此值时升级重审
+BORDERLINE_MARGIN = 10.0
+
+
+def is_borderline(score: float, pass_score: float, margin: float = BORDERLINE_MARGIN) -> bool:
+    """
+    审核评分是否处于临界区间
+
+    Args:
+        score: 审核评分
+        pass_score: 通过分数线
+        margin: 临界区间半宽
+
+    Returns:
+        是否需要升级到强模型复核
+    """
+    return abs(score - pass_score) <= margin
+
+
+@dataclass
+class RoleStats:
+    """单个角色的调用统计"""
+
+    role: str
+    tier: str
+    usage: UsageStats = field(default_factory=UsageStats)
+    escalations: int = 0
+    escalated: UsageStats = field(default_factory=UsageStats)  # 随后被升级的快速模型尝试（已计入 usage）
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化字典"""
+        usage = self.usage.to_dict()
+        usage["avg_latency"] = round(self.usage.latency / self.usage.calls, 3) if self.usage.calls else 0.0
+        return {"tier": self.tier, "escalations": self.escalations, **usage, "escalated": self.escalated.to_dict()}
+
+
+class ModelRouter:
+    """按角色路由到快速/强模型，并在需要时升级"""
+
+    def __init__(
+        self,
+        mode: str = MODE_TIERED,
+        role_tiers: Optional[Dict[str, str]] = None,
+        tier_models: Optional[Dict[str, str]] = None
+    ):
+        """
+        初始化路由器
+
+        Args:
+            mode: tiered（按角色分层）/ strong（全部使用强模型）
+            role_tiers: 覆盖默认的角色分层
+            tier_models: 覆盖默认的分层模型名称
+        """
+        if mode not in MODES:
+            raise ValueError(f"未知的路由模式: {mode}（可选: {', '.join(MODES)}）")
+
+        self.mode = mode
+        self.role_tiers = {**ROLE_TIERS, **(role_tiers or {})}
+        self.tier_models = {**TIER_MODELS, **(tier_models or {})}
+        self.stats: Dict[str, RoleStats] = {}
+        self._models: Dict[str, Model] = {}
+
+    def tier_for(self, role: str) -> str:
+        """角色对应的分层"""
+        if self.mode == MODE_STRONG:
+            return TIER_STRONG
+        return self.role_tiers.get(role, TIER_STRONG)
+
+    def model_for_tier(self, tier: str) -> Model:
+        """分层对应的 Model（共享 Provider，按分层缓存）"""
+        if tier not in self._models:
+            self._models[tier] = get_anthropic_model(self.tier_models[tier])
+        return self._models[tier]
+
+    def model_for(self, role: str) -> Model:
+        """角色对应的 Model（用于创建 Agent）"""
+        return self.model_for_tier(self.tier_for(role))
+
+    def _record(
+        self,
+        role: str,
+        tier: str,
+        usage: Any,
+        latency: float,
+        usage_stats: Optional[UsageStats] = None,
+        escalated: bool = False
+    ) -> None:
+        """记录一次调用（escalated：随后升级到强模型的快速模型尝试）"""
+        stats = self.stats.setdefault(role, RoleStats(role=role, tier=self.tier_for(role)))
+        model_name = self.tier_models[tier]
+        stats.usage.add(usage, latency, model_name)
+        if escalated:
+            stats.escalated.add(usage, latency, model_name)
+        if usage_stats is not None:
+            usage_stats.add(usage, latency, model_name)
+        get_run_profiler().record_llm(usage, latency, model_name)
+
+    async def run(
+        self,
+        role: str,
+        agent: Agent,
+        prompt: Any,
+        needs_escalation: Optional[Callable[[Any], bool]] = None,
+        usage_stats: Optional[UsageStats] = None,
+        **kwargs: Any
+    ) -> Any:
+        """
+        按角色路由执行 Agent
+
+        快速模型输出校验失败（重试耗尽）或 needs_escalation(output) 为真时，
+        用强模型重跑一次；快速模型这次尝试的用量和耗时先按 escalated 记录
+
+        Args:
+            role: 角色名（如 content.reviewer）
+            agent: 要执行的 Agent
+            prompt: 用户提示词
+            needs_escalation: 根据输出判断是否需要升级
+            usage_stats: 额外累加用量的统计对象（如 Agent 自己的策略统计）
+            **kwargs: 透传给 agent.run 的参数（message_history、model_settings 等）
+
+        Returns:
+            AgentRunResult: 最终采用的运行结果
+        """
+        tier = self.tier_for(role)
+        start = time.perf_counter()
+        # 失败的运行不返回结果，用量通过传入的 RunUsage 累加取得
+        attempt_usage = RunUsage()
+        try:
+            result = await agent.run(prompt, model=self.model_for_tier(tier), usage=attempt_usage, **kwargs)
+        except UnexpectedModelBehavior as e:
+            if tier == TIER_STRONG:
+                self._record(role, tier, attempt_usage, time.perf_counter() - start, usage_stats)
+                raise
+            self._record(role, tier, attempt_usage, time.perf_counter() - start, usage_stats, escalated=True)
+            note(f"   ⬆️  {role} 快速模型输出校验失败，升级到强模型: {e}")
+            return await self._escalate(role, agent, prompt, usage_stats, **kwargs)
+
+        escalate = tier != TIER_STRONG and needs_escalation is not None and needs_escalation(result.output)
+        self._record(role, tier, result.usage(), time.perf_counter() - start, usage_stats, escalated=escalate)
+
+        if escalate:
+            note(f"   ⬆️  {role} 结果处于临界区间，升级到强模型复核")
+            return await self._escalate(role, agent, prompt, usage_stats, **kwargs)
+        return result
+
+    async def run_stream(
+        self,
+        role: str,
+        agent: Agent,
+        prompt: Any,
+        on_response: Callable[[Any], None],
+        usage_stats: Optional[UsageStats] = None,
+        debounce_by: Optional[float] = 0.1,
+        **kwargs: Any
+    ) -> Tuple[Any, List[Any]]:
+        """
+        按角色路由流式执行 Agent（不做升级，适用于生成类角色）
+
+        Args:
+            role: 角色名
+            agent: 要执行的 Agent
+            prompt: 用户提示词
+            on_response: 每收到一次响应快照（ModelResponse）时的回调
+            usage_stats: 额外累加用量的统计对象
+            debounce_by: 快照合并间隔（秒）
+            **kwargs: 透传给 agent.run_stream 的参数
+
+        Returns:
+            (最终输出, 本次运行的新消息)
+        """
+        tier = self.tier_for(role)
+        start = time.perf_counter()
+        async with agent.run_stream(prompt, model=self.model_for_tier(tier), **kwargs) as result:
+            async for response, _ in result.stream_responses(debounce_by=debounce_by):
+                on_response(response)
+            output = await result.get_output()
+        self._record(role, tier, result.usage(), time.perf_counter() - start, usage_stats)
+        return output, result.new_messages()
+
+    async def _escalate(
+        self,
+        role: str,
+        agent: Agent,
+        prompt: Any,
+        usage_stats: Optional[UsageStats],
+        **kwargs: Any
+    ) -> Any:
+        """用强模型重跑"""
+        self.stats.setdefault(role, RoleStats(role=role, tier=self.tier_for(role))).escalations += 1
+        start = time.perf_counter()
+        result = await agent.run(prompt, model=self.model_for_tier(TIER_STRONG), **kwargs)
+        self._record(role, TIER_STRONG, result.usage(), time.perf_counter() - start, usage_stats)
+        return result
+
+    def report(self) -> Dict[str, Any]:
+        """按角色汇总的统计"""
+        return {
+            "mode": self.mode,
+            "models": dict(self.tier_models),
+            "roles": {role: stats.to_dict() for role, stats in sorted(self.stats.items())},
+        }
+
+    def print_report(self) -> None:
+        """打印按角色的统计"""
+        if not self.stats:
+            return
+        print(f"\n📊 模型路由统计（{self.mode}）:")
+        for role, stats in sorted(self.stats.items()):
+            usage = stats.usage
+            avg = usage.latency / usage.calls if usage.calls else 0.0
+            print(
+                f"   - {role} [{stats.tier}]: 调用 {usage.calls} 次（升级 {stats.escalations}），"
+                f"平均 {avg:.1f}s，token {usage.input_tokens}/{usage.output_tokens}，成本约 ${usage.cost:.4f}"
+                + (
+                    f"（其中升级前的快速模型尝试 {stats.escalated.calls} 次，"
+                    f"{stats.escalated.latency:.1f}s，成本约 ${stats.escalated.cost:.4f}）"
+                    if stats.escalated.calls else ""
+                )
+            )
+
+
+# 全局共享的路由器（各 Agent 共用，统计汇总到一处）
+_shared_router: Optional[ModelRouter] = None
+
+
+def get_model_router() -> ModelRouter:
+    """获取共享路由器（未配置时按 tiered 模式创建）"""
+    global _shared_router
+    if _shared_router is None:
+        _shared_router = ModelRouter()
+    return _shared_router
+
+
+def set_model_router(router: ModelRouter) -> ModelRouter:
+    """替换共享路由器（CLI 根据参数配置）"""
+    global _shared_router
+    _shared_router = router
+    return router
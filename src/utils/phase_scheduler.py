@@ -0,0 +1,247 @@
+"""
+阶段调度（DAG）
+工作流各阶段声明输入依赖，依赖全部就绪后启动；投机阶段可以在上游发布的
+临时结果（如内容的首稿）上提前启动，上游最终结果就绪后再判断是否需要重做
+
+- publish：上游阶段运行中发布临时结果（同一阶段多次发布时以最新一次为准）
+- 投机阶段在最终结果就绪时调用 is_stale(旧输入, 最终输入) 判断：
+  未过期则直接采用投机结果，过期则取消仍在运行的投机任务并用最终输入重跑
+- 记录每个阶段的起止时间和投机命中 / 重做，便于评估流水线收益；起止同时发布进度事件
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from .progress import PhaseFinished, PhaseStarted, emit, note
+
+# 阶段执行结果
+OUTCOME_NORMAL = "normal"  # 依赖全部为最终结果时启动
+OUTCOME_HIT = "speculative_hit"  # 投机结果被采用
+OUTCOME_REDO = "speculative_redo"  # 投机结果过期，按最终输入重做
+
+
+@dataclass
+class Phase:
+    """工作流阶段"""
+
+    name: str
+    run: Callable[[Dict[str, Any]], Awaitable[Any]]
+    deps: Sequence[str] = ()
+    speculative: bool = False
+    is_stale: Optional[Callable[[Dict[str, Any], Dict[str, Any]], bool]] = None
+
+
+@dataclass
+class PhaseTiming:
+    """单个阶段的执行记录（时间相对调度开始，单位秒）"""
+
+    name: str
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    outcome: str = OUTCOME_NORMAL
+    wasted: float = 0.0  # 被丢弃的投机执行耗时
+
+    @property
+    def duration(self) -> float:
+        """阶段耗时（含重做）"""
+        return self.finished_at - self.started_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化字典"""
+        return {
+            "started_at": round(self.started_at, 3),
+            "finished_at": round(self.finished_at, 3),
+            "duration": round(self.duration, 3),
+            "outcome": self.outcome,
+            "wasted": round(self.wasted, 3),
+        }
+
+
+class PhaseScheduler:
+    """按依赖并发执行工作流阶段"""
+
+    def __init__(self, pipeline: bool = True):
+        """
+        初始化调度器
+
+        Args:
+            pipeline: 是否允许投机阶段提前启动（False 时全部阶段等最终依赖，
+                      等价于按依赖顺序执行）
+        """
+        self.pipeline = pipeline
+        self.phases: Dict[str, Phase] = {}
+        self.results: Dict[str, Any] = {}
+        self.provisional: Dict[str, Any] = {}
+        self.timings: Dict[str, PhaseTiming] = {}
+        self._changed = asyncio.Event()
+        self._started_at = 0.0
+        self._finished_at = 0.0
+
+    def add(
+        self,
+        name: str,
+        run: Callable[[Dict[str, Any]], Awaitable[Any]],
+        deps: Sequence[str] = (),
+        speculative: bool = False,
+        is_stale: Optional[Callable[[Dict[str, Any], Dict[str, Any]], bool]] = None
+    ) -> None:
+        """
+        注册阶段
+
+        Args:
+            name: 阶段名
+            run: 阶段函数，参数为 {依赖名: 依赖结果}
+            deps: 依赖的阶段名
+            speculative: 是否可以在依赖的临时结果上提前启动
+            is_stale: 投机输入与最终输入对比，返回 True 表示投机结果作废
+                      （未提供时只要输入不相等即作废）
+        """
+        if name in self.phases:
+            raise ValueError(f"阶段重复注册: {name}")
+        self.phases[name] = Phase(name, run, tuple(deps), speculative, is_stale)
+
+    def publish(self, name: str, value: Any) -> None:
+        """
+        发布阶段的临时结果（阶段运行中调用，唤醒等待该依赖的投机阶段）
+
+        Args:
+            name: 发布结果的阶段名
+            value: 临时结果
+        """
+        if name in self.results:
+            return
+        self.provisional[name] = value
+        self._notify()
+
+    def _notify(self) -> None:
+        """唤醒所有等待依赖的阶段"""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _wait_for(self, ready: Callable[[], bool]) -> None:
+        """等待条件成立（每次有阶段完成或发布临时结果时重新检查）"""
+        while not ready():
+            await self._changed.wait()
+
+    def _now(self) -> float:
+        """相对调度开始的时间"""
+        return time.perf_counter() - self._started_at
+
+    def _inputs(self, phase: Phase) -> Dict[str, Any]:
+        """阶段的当前输入（最终结果优先，否则取临时结果）"""
+        return {
+            dep: self.results[dep] if dep in self.results else self.provisional.get(dep)
+            for dep in phase.deps
+        }
+
+    def _final(self, phase: Phase) -> bool:
+        """依赖是否全部为最终结果"""
+        return all(dep in self.results for dep in phase.deps)
+
+    async def _drive(self, phase: Phase) -> None:
+        """等待依赖、执行阶段并在需要时重做"""
+        speculate = phase.speculative and self.pipeline
+        await self._wait_for(lambda: self._final(phase) or (
+            speculate and all(d in self.results or d in self.provisional for d in phase.deps)
+        ))
+
+        timing = self.timings[phase.name] = PhaseTiming(phase.name, started_at=self._now())
+        inputs = self._inputs(phase)
+        emit(PhaseStarted(name=phase.name, speculative=not self._final(phase), phase=phase.name))
+
+        if self._final(phase):
+            result = await phase.run(inputs)
+        else:
+            task = asyncio.create_task(phase.run(inputs))
+            try:
+                await self._wait_for(lambda: self._final(phase))
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            final_inputs = self._inputs(phase)
+            stale = (phase.is_stale or (lambda old, new: old != new))(inputs, final_inputs)
+            # 投机执行失败时同样按最终输入重做
+            if not stale and task.done() and (task.cancelled() or task.exception() is not None):
+                stale = True
+
+            if stale:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                timing.outcome = OUTCOME_REDO
+                timing.wasted = self._now() - timing.started_at
+                note(f"   🔁 [{phase.name}] 上游结果已变化，重做投机阶段")
+                result = await phase.run(final_inputs)
+            else:
+                timing.outcome = OUTCOME_HIT
+                result = await task
+
+        timing.finished_at = self._now()
+        self.results[phase.name] = result
+        emit(PhaseFinished(name=phase.name, duration=timing.duration, outcome=timing.outcome, phase=phase.name))
+        self._notify()
+
+    def _check(self) -> None:
+        """检查依赖是否都已注册、是否有环"""
+        visiting, done = set(), set()
+
+        def visit(name: str) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"阶段依赖存在环: {name}")
+            if name not in self.phases:
+                raise ValueError(f"未注册的依赖阶段: {name}")
+            visiting.add(name)
+            for dep in self.phases[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.phases:
+            visit(name)
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        执行全部阶段（任一阶段失败时取消其余阶段并抛出该异常）
+
+        Returns:
+            {阶段名: 最终结果}
+        """
+        self._check()
+        self._changed = asyncio.Event()
+        self._started_at = time.perf_counter()
+        try:
+            async with asyncio.TaskGroup() as group:
+                for phase in self.phases.values():
+                    group.create_task(self._drive(phase), name=f"phase:{phase.name}")
+        except BaseExceptionGroup as group_error:
+            # 只抛出第一个阶段异常，保持与串行执行一致的错误处理
+            raise group_error.exceptions[0]
+        finally:
+            self._finished_at = self._now()
+        return self.results
+
+    def report(self) -> Dict[str, Any]:
+        """各阶段的时间线和投机统计"""
+        outcomes: List[str] = [t.outcome for t in self.timings.values()]
+        return {
+            "pipeline": self.pipeline,
+            "wall_time": round(self._finished_at, 3),
+            "speculative_hits": outcomes.count(OUTCOME_HIT),
+            "speculative_redos": outcomes.count(OUTCOME_REDO),
+            "phases": {name: timing.to_dict() for name, timing in self.timings.items()},
+        }
+
+    def print_report(self) -> None:
+        """打印阶段时间线"""
+        if not self.timings:
+            return
+        mode = "流水线" if self.pipeline else "顺序"
+        print(f"\n⏱️  阶段时间线（{mode}，总耗时 {self._finished_at:.1f}s）:")
+        for timing in sorted(self.timings.values(), key=lambda t: t.started_at):
+            outcome = "" if timing.outcome == OUTCOME_NORMAL else f"（{timing.outcome}）"
+            print(
+                f"   - {timing.name}: {timing.started_at:.1f}s → {timing.finished_at:.1f}s，"
+                f"耗时 {timing.duration:.1f}s{outcome}"
+            )
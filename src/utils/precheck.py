@@ -0,0 +1,346 @@
+"""
+规则预审
+在 LLM 审核之前，用确定性规则检查可以机械验证的问题：
+- 标题声称的数量（含中文数字）与实际列出的条目数；正文只检查"整理了N家"这类总数说法，
+  不一致时记为 warning（正文里的"第N家""这两家""一家公司"不是总数）
+- 标题长度、标签数量
+- 研究实体在正文中的使用率
+- 研究结果的实体/案例数量、模糊实体
+
+已经存在 critical 问题时直接返回审核结果，省掉一次 LLM 审核调用
+"""
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..models.schemas import ResearchResult, ReviewIssue, ReviewResult, XHSContent
+
+# 标题长度（不含 emoji，与 prompts/content.yaml 一致）
+TITLE_LENGTH_RANGE = (15, 20)
+
+# 标签数量（XHSContent 最多 5 个）
+HASHTAG_RANGE = (3, 5)
+
+# 实体使用率下限（与 prompts/content_review.yaml 一致）
+MIN_ENTITY_USAGE = 0.5
+
+# 研究数量目标（与 prompts/research_review.yaml 一致）
+MIN_ENTITIES = 15
+MIN_CASES = 8
+
+# 扣分规则（与审核提示词一致）
+SEVERITY_PENALTY = {"critical": 20, "warning": 10, "info": 5}
+PASS_SCORE = 70
+
+_CN_DIGITS = {"零": 0, "〇": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4,
+              "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+_CN_UNITS = {"十": 10, "百": 100, "千": 1000}
+_NUMERAL = r"\d+|[零〇一二两三四五六七八九十百千]+"
+
+# 数量声明：数字 + 量词 + 名词（如"10家公司"、"十五个坑"）
+# 序数 / 指代（第3家、这两家、每个）不是总数，数字前面是这些字时不匹配
+_CLAIM = (
+    rf"(?<![第这那每哪\d零〇一二两三四五六七八九十百千])({_NUMERAL})\s*(?:家|个|条|大|种|类|位|点|件)\s*"
+    r"[\u4e00-\u9fff]{0,2}?"
+    r"(?:公司|企业|单位|品牌|机构|雷|坑|案例|要点|陷阱|红旗|信号|避雷|骗局|套路|店)"
+)
+_CLAIM_RE = re.compile(_CLAIM)
+
+# 正文中的总数说法：汇总动词 + 数量声明（如"整理了10家公司"、"盘点十五个坑"）
+_TOTAL_CLAIM_RE = re.compile(
+    r"(?:整理|盘点|汇总|总结|收集|列出|梳理)了?\s*(?:这|以下|下面)?\s*|(?:一共|总共|共计)\s*"
+)
+
+# 列表条目：1️⃣ / 1️⃣1️⃣ / 1. / 1、 / ① / **名称** - / 【名称】
+_KEYCAP_RE = re.compile(r"((?:\d️?⃣)+)")
+_BOLD_ITEM_RE = re.compile(r"^\s*\*\*[^*\n]+\*\*\s*[-—:：]", re.MULTILINE)
+_NUMBERED_RE = re.compile(r"^\s*(\d{1,2})\s*[.、)）]", re.MULTILINE)
+_CIRCLED = "①②③④⑤⑥⑦⑧⑨⑩⑪⑫⑬⑭⑮⑯⑰⑱⑲⑳"
+
+# 模糊实体名称
+_VAGUE_RE = re.compile(r"某|XX|xx|\*\*")
+
+
+def parse_chinese_number(text: str) -> Optional[int]:
+    """
+    解析阿拉伯数字或中文数字（支持到千位，如"十五"、"二十"、"一百零八"）
+
+    Args:
+        text: 数字文本
+
+    Returns:
+        整数，无法解析时返回 None
+    """
+    text = text.strip()
+    if text.isdigit():
+        return int(text)
+    if not text or any(c not in _CN_DIGITS and c not in _CN_UNITS for c in text):
+        return None
+
+    total, digit = 0, None
+    for char in text:
+        if char in _CN_DIGITS:
+            digit = _CN_DIGITS[char]
+        else:
+            total += (1 if digit is None else digit) * _CN_UNITS[char]
+            digit = None
+    return total + (digit or 0)
+
+
+def find_count_claims(text: str, totals_only: bool = False) -> List[Tuple[str, int]]:
+    """
+    找出文本中的数量声明（数量为 1 的"一家公司"不算总数）
+
+    Args:
+        text: 标题或正文
+        totals_only: 只找汇总动词引出的总数说法（正文使用）
+
+    Returns:
+        [(原文片段, 数量)]
+    """
+    pattern = re.compile(f"(?:{_TOTAL_CLAIM_RE.pattern}){_CLAIM}") if totals_only else _CLAIM_RE
+    claims = []
+    for match in pattern.finditer(text):
+        number = parse_chinese_number(match.group(1))
+        if number and number > 1:
+            claims.append((match.group(0), number))
+    return claims
+
+
+def count_listed_items(body: str) -> int:
+    """
+    统计正文中实际列出的条目数
+
+    依次尝试 keycap 序号（1️⃣、1️⃣1️⃣）、行首数字序号（1. / 1、）、圈号（①）、
+    加粗名称行（**名称** - 说明），都没有时按【名称】计数
+
+    Args:
+        body: 正文
+
+    Returns:
+        条目数（没有列表时为 0）
+    """
+    keycaps = {int(re.sub(r"\D", "", n)) for n in _KEYCAP_RE.findall(body)}
+    if "🔟" in body:
+        keycaps.add(10)
+    if keycaps:
+        return len(keycaps)
+
+    numbered = {int(n) for n in _NUMBERED_RE.findall(body)}
+    if numbered:
+        return len(numbered)
+
+    circled = {c for c in body if c in _CIRCLED}
+    if circled:
+        return len(circled)
+
+    bold_items = _BOLD_ITEM_RE.findall(body)
+    if bold_items:
+        return len(bold_items)
+
+    return len(set(re.findall(r"【([^】]+)】", body)))
+
+
+def visible_length(text: str) -> int:
+    """标题长度（不计 emoji 和变体选择符）"""
+    return sum(
+        1 for c in text
+        if unicodedata.category(c) not in ("So", "Mn", "Cf", "Sk") and c not in "️‍"
+    )
+
+
+def _score(issues: List[ReviewIssue]) -> float:
+    """按审核提示词的扣分规则计算评分"""
+    score = 100.0
+    for issue in issues:
+        score -= SEVERITY_PENALTY.get(issue.severity, 5)
+    return max(0.0, score)
+
+
+def check_content(
+    content: XHSContent,
+    research: ResearchResult
+) -> Tuple[List[ReviewIssue], Dict[str, Any]]:
+    """
+    内容规则预审
+
+    Args:
+        content: 待审核内容
+        research: 研究数据
+
+    Returns:
+        (问题列表, 实体使用统计)
+    """
+    issues: List[ReviewIssue] = []
+
+    # 1. 数量一致性（标题声明为 critical；正文只看总数说法，记为 warning）
+    listed = count_listed_items(content.body)
+    if listed:
+        claims = [
+            ("标题", "critical", find_count_claims(content.title)),
+            ("正文", "warning", find_count_claims(content.body, totals_only=True)),
+        ]
+        for source, severity, found in claims:
+            for phrase, number in found:
+                if number != listed:
+                    issues.append(ReviewIssue(
+                        type="count_mismatch",
+                        severity=severity,
+                        description=f"{source}声称'{phrase}'，实际列出{listed}项",
+                        suggestion=f"修改为{listed}，或补充列出{number}项"
+                    ))
+
+    # 2. 标题长度
+    title_length = visible_length(content.title)
+    low, high = TITLE_LENGTH_RANGE
+    if not low <= title_length <= high:
+        issues.append(ReviewIssue(
+            type="format_error",
+            severity="info",
+            description=f"标题长度 {title_length} 字（不含 emoji），建议 {low}-{high} 字",
+            suggestion="调整标题长度"
+        ))
+
+    # 3. 标签数量
+    low, high = HASHTAG_RANGE
+    if not low <= len(content.hashtags) <= high:
+        issues.append(ReviewIssue(
+            type="format_error",
+            severity="info",
+            description=f"标签 {len(content.hashtags)} 个，建议 {low}-{high} 个",
+            suggestion="从研究数据 keywords 中补充或精简标签"
+        ))
+
+    # 4. 实体使用率
+    names = [e.name for e in research.entities if e.name]
+    text = f"{content.title}\n{content.body}"
+    used = [n for n in names if n in text]
+    usage_rate = len(used) / len(names) if names else 1.0
+    if names and usage_rate < MIN_ENTITY_USAGE:
+        missing = [n for n in names if n not in used]
+        issues.append(ReviewIssue(
+            type="data_missing",
+            severity="warning",
+            description=f"研究实体使用率 {usage_rate:.0%}（{len(used)}/{len(names)}），未使用: {'、'.join(missing[:10])}",
+            suggestion="在清单中补充未使用的实体"
+        ))
+
+    entity_usage = {
+        "research_entities": len(names),
+        "used_entities": len(used),
+        "usage_rate": round(usage_rate, 2),
+        "listed_items": listed,
+    }
+    return issues, entity_usage
+
+
+def check_research(result: ResearchResult) -> Tuple[List[ReviewIssue], Dict[str, Any]]:
+    """
+    研究结果规则预审
+
+    Args:
+        result: 研究结果
+
+    Returns:
+        (问题列表, 统计信息)
+    """
+    issues: List[ReviewIssue] = []
+
+    if len(result.entities) < MIN_ENTITIES:
+        issues.append(ReviewIssue(
+            type="entity_insufficient",
+            severity="critical",
+            description=f"实体数量 {len(result.entities)} 个，少于 {MIN_ENTITIES} 个",
+            suggestion="继续搜索更多帖子和评论区，补充具体实体"
+        ))
+
+    if len(result.cases) < MIN_CASES:
+        issues.append(ReviewIssue(
+            type="case_insufficient",
+            severity="critical",
+            description=f"案例数量 {len(result.cases)} 个，少于 {MIN_CASES} 个",
+            suggestion="深入评论区补充用户真实经历"
+        ))
+
+    vague = [e.name for e in result.entities if e.name and _VAGUE_RE.search(e.name)]
+    if vague:
+        issues.append(ReviewIssue(
+            type="vague_entity",
+            severity="critical",
+            description=f"存在模糊实体名称: {'、'.join(vague[:10])}",
+            suggestion="替换为具体名称，或删除无法确认的实体"
+        ))
+
+    if result.credibility == "low":
+        issues.append(ReviewIssue(
+            type="low_credibility",
+            severity="warning",
+            description="可信度为 low",
+            suggestion="补充多个来源交叉验证"
+        ))
+
+    missing = [f for f in ("summary", "entities", "cases", "keywords") if not getattr(result, f)]
+    if missing:
+        issues.append(ReviewIssue(
+            type="missing_field",
+            severity="warning",
+            description=f"缺少字段: {', '.join(missing)}",
+            suggestion="补全缺失字段"
+        ))
+
+    stats = {
+        "research_entities": len(result.entities),
+        "research_cases": len(result.cases),
+        "vague_entities": len(vague),
+    }
+    return issues, stats
+
+
+def build_review(issues: List[ReviewIssue], entity_usage: Dict[str, Any]) -> ReviewResult:
+    """
+    用规则预审的问题构建审核结果（跳过 LLM 审核时使用）
+
+    Args:
+        issues: 规则问题列表
+        entity_usage: 统计信息
+
+    Returns:
+        ReviewResult: 审核结果
+    """
+    score = _score(issues)
+    critical = sum(1 for i in issues if i.severity == "critical")
+    passed = score >= PASS_SCORE and critical == 0
+    summary = (
+        f"规则预审发现 {critical} 个严重问题，需要修改"
+        if critical else f"规则预审评分 {score:.0f}"
+    )
+    return ReviewResult(
+        passed=passed,
+        score=score,
+        issues=issues,
+        summary=summary,
+        entity_usage=entity_usage
+    )
+
+
+def has_critical(issues: List[ReviewIssue]) -> bool:
+    """是否存在 critical 问题"""
+    return any(i.severity == "critical" for i in issues)
+
+
+def merge_review(review: ReviewResult, rule_issues: List[ReviewIssue]) -> ReviewResult:
+    """
+    把规则预审发现的问题合并到 LLM 审核结果（同类型问题以 LLM 为准）
+
+    Args:
+        review: LLM 审核结果
+        rule_issues: 规则问题列表
+
+    Returns:
+        ReviewResult: 合并后的审核结果
+    """
+    llm_types = {i.type for i in review.issues}
+    extra = [i for i in rule_issues if i.type not in llm_types]
+    if not extra:
+        return review
+    return review.model_copy(update={"issues": [*review.issues, *extra]})
@@ -0,0 +1,428 @@
+"""
+进度事件总线
+Agent 和工作流的进度输出以类型化事件发布（阶段起止、Reflexion 轮次、审核结论、工具调用、
+文本提示），由可插拔的 Sink 消费，代替直接 print：
+
+- 非阻塞：emit 只把事件放入队列，后台任务批量分发；控制台和文件 Sink 在线程池中写入，
+  大量输出不会阻塞事件循环
+- 可聚合：事件自动带上任务标识（set_job）和当前阶段 / 轮次（run_profile 的作用域），
+  同一进程中的多个并发任务可以分别渲染或写入 JSONL 后再聚合
+- Sink：ConsoleSink（与原 print 输出一致）、JsonlSink（events.jsonl）、MemorySink（内存，便于测试）
+
+总线未启动（如单独调用 Agent、CLI 子命令）时事件同步交给 Sink，行为与 print 相同
+"""
+import asyncio
+import json
+import sys
+import threading
+import time
+from contextvars import ContextVar, Token
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, ClassVar, Dict, IO, Iterable, List, Optional, Sequence, Tuple
+
+from .run_profile import current_scope
+
+# 事件文件名（写入每次运行的输出目录）
+EVENTS_FILE = "events.jsonl"
+
+# 队列容量（超出时丢弃事件并计数，进度输出不应拖住业务）
+QUEUE_SIZE = 10_000
+
+# 单次分发的最大事件数
+BATCH_SIZE = 256
+
+# 文本提示级别
+LEVEL_INFO = "info"
+LEVEL_WARNING = "warning"
+LEVEL_ERROR = "error"
+
+# 审核对象的显示名
+REVIEW_TARGETS: Dict[str, str] = {"research": "研究", "content": "内容", "image": "图片"}
+
+# 当前任务标识（并发运行多个工作流时区分事件来源）
+_current_job: ContextVar[str] = ContextVar("progress_job", default="")
+
+
+def set_job(job: str) -> Token:
+    """设置当前任务标识（作用于当前上下文及其创建的任务）"""
+    return _current_job.set(job)
+
+
+def _scope_phase() -> Optional[str]:
+    """当前阶段"""
+    return current_scope()[0]
+
+
+def _scope_round() -> int:
+    """当前轮次"""
+    return current_scope()[1]
+
+
+@dataclass(frozen=True, kw_only=True)
+class ProgressEvent:
+    """进度事件基类（任务、阶段、轮次自动取自当前上下文）"""
+
+    kind: ClassVar[str] = "event"
+
+    job: str = field(default_factory=_current_job.get)
+    phase: Optional[str] = field(default_factory=_scope_phase)
+    round: int = field(default_factory=_scope_round)
+    at: float = field(default_factory=time.time)
+
+    def render(self, verbose: bool = False) -> Optional[str]:
+        """控制台文本（None 表示不显示）"""
+        if not verbose:
+            return None
+        fields = {k: v for k, v in asdict(self).items() if k not in ("job", "phase", "round", "at")}
+        return f"   · {self.kind} " + " ".join(f"{k}={v}" for k, v in fields.items())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化字典"""
+        return {"kind": self.kind, **asdict(self)}
+
+
+@dataclass(frozen=True, kw_only=True)
+class Note(ProgressEvent):
+    """文本提示（原 print 的进度信息）"""
+
+    kind: ClassVar[str] = "note"
+
+    text: str
+    level: str = LEVEL_INFO
+
+    def render(self, verbose: bool = False) -> Optional[str]:
+        return self.text
+
+
+@dataclass(frozen=True, kw_only=True)
+class TextDelta(ProgressEvent):
+    """流式生成的增量文本（控制台原样输出，不换行）"""
+
+    kind: ClassVar[str] = "delta"
+
+    text: str
+
+    def render(self, verbose: bool = False) -> Optional[str]:
+        return self.text
+
+
+@dataclass(frozen=True, kw_only=True)
+class PhaseStarted(ProgressEvent):
+    """阶段开始"""
+
+    kind: ClassVar[str] = "phase_start"
+
+    name: str
+    speculative: bool = False
+
+
+@dataclass(frozen=True, kw_only=True)
+class PhaseFinished(ProgressEvent):
+    """阶段结束"""
+
+    kind: ClassVar[str] = "phase_end"
+
+    name: str
+    duration: float
+    outcome: str
+
+
+@dataclass(frozen=True, kw_only=True)
+class RoundStarted(ProgressEvent):
+    """Reflexion 轮次开始（生成 / 修订 / 审核）"""
+
+    kind: ClassVar[str] = "round"
+
+    target: str
+    step: str
+    text: str
+
+    def render(self, verbose: bool = False) -> Optional[str]:
+        return self.text
+
+
+@dataclass(frozen=True, kw_only=True)
+class ReviewVerdict(ProgressEvent):
+    """审核结论"""
+
+    kind: ClassVar[str] = "review"
+
+    target: str
+    passed: bool
+    score: float
+    summary: str = ""
+    issues: Tuple[Tuple[str, str], ...] = ()  # (严重程度, 描述)
+    details: Tuple[Tuple[str, str], ...] = ()  # 通过时展示的 (名称, 值)
+
+    def render(self, verbose: bool = False) -> Optional[str]:
+        label = REVIEW_TARGETS.get(self.target, self.target)
+        if self.passed:
+            lines = [f"   ✅ {label}审核通过 (第{self.round}轮)"]
+            lines += [f"      - {name}: {value}" for name, value in self.details]
+            lines.append(f"      - 评分: {self.score:.1f}/100")
+        else:
+            lines = [f"   ⚠️  {label}审核未通过 (第{self.round}轮，评分 {self.score:.1f}): {self.summary}"]
+            lines += [f"      - [{severity}] {description}" for severity, description in self.issues]
+        return "\n".join(lines)
+
+
+@dataclass(frozen=True, kw_only=True)
+class ToolCalled(ProgressEvent):
+    """Agent 工具调用"""
+
+    kind: ClassVar[str] = "tool"
+
+    tool: str
+    toolset: str
+    latency: float
+    error: bool = False
+
+
+class ConsoleSink:
+    """控制台渲染（默认只显示文本类事件，verbose 时显示全部）"""
+
+    blocking = True
+
+    def __init__(self, stream: Optional[IO[str]] = None, verbose: bool = False, show_job: bool = False):
+        """
+        初始化
+
+        Args:
+            stream: 输出流（默认为写入时的 sys.stdout）
+            verbose: 显示阶段、工具调用等结构化事件
+            show_job: 每行前加任务标识（并发运行多个任务时区分来源）
+        """
+        self.stream = stream
+        self.verbose = verbose
+        self.show_job = show_job
+
+    def write(self, events: Sequence[ProgressEvent]) -> None:
+        """渲染一批事件"""
+        chunks = []
+        for event in events:
+            text = event.render(self.verbose)
+            if text is None:
+                continue
+            if isinstance(event, TextDelta):
+                chunks.append(text)
+                continue
+            if self.show_job and event.job:
+                text = "\n".join(f"[{event.job}] {line}" for line in text.split("\n"))
+            chunks.append(text + "\n")
+        if chunks:
+            stream = self.stream or sys.stdout
+            stream.write("".join(chunks))
+            stream.flush()
+
+    def close(self) -> None:
+        """无需释放资源"""
+
+
+class JsonlSink:
+    """事件写入 JSONL 文件（每行一个事件）"""
+
+    blocking = True
+
+    def __init__(self, path: Path | str, exclude: Iterable[str] = (TextDelta.kind,)):
+        """
+        初始化
+
+        Args:
+            path: 文件路径（追加写入）
+            exclude: 不写入的事件类型（默认跳过流式增量文本）
+        """
+        self.path = Path(path)
+        self.exclude = set(exclude)
+        self._file: Optional[IO[str]] = None
+
+    def write(self, events: Sequence[ProgressEvent]) -> None:
+        """追加一批事件"""
+        lines = [
+            json.dumps(event.to_dict(), ensure_ascii=False, default=str) + "\n"
+            for event in events if event.kind not in self.exclude
+        ]
+        if not lines:
+            return
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self.path.open("a", encoding="utf-8")
+        self._file.write("".join(lines))
+        self._file.flush()
+
+    def close(self) -> None:
+        """关闭文件"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class MemorySink:
+    """事件保存在内存中（测试、基准测试中断言进度输出）"""
+
+    blocking = False
+
+    def __init__(self):
+        """初始化"""
+        self.events: List[ProgressEvent] = []
+
+    def write(self, events: Sequence[ProgressEvent]) -> None:
+        """保存一批事件"""
+        self.events.extend(events)
+
+    def of(self, kind: str) -> List[ProgressEvent]:
+        """指定类型的事件"""
+        return [event for event in self.events if event.kind == kind]
+
+    def close(self) -> None:
+        """无需释放资源"""
+
+
+class ProgressBus:
+    """进度事件总线"""
+
+    def __init__(self, sinks: Optional[Sequence[Any]] = None, maxsize: int = QUEUE_SIZE):
+        """
+        初始化
+
+        Args:
+            sinks: 事件消费者（默认只有 ConsoleSink）
+            maxsize: 队列容量
+        """
+        self.sinks = list(sinks) if sinks is not None else [ConsoleSink()]
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        """后台分发是否在运行"""
+        return self._task is not None and not self._task.done()
+
+    def emit(self, event: ProgressEvent) -> None:
+        """
+        发布事件（不阻塞；总线未启动时同步交给 Sink）
+
+        Args:
+            event: 进度事件
+        """
+        if not self.running:
+            self._deliver_now([event])
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is self._loop:
+            self._put(event)
+        else:
+            # 其他线程（如 to_thread 中的代码）发布的事件转交事件循环
+            self._loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: ProgressEvent) -> None:
+        """放入队列（已满时丢弃）"""
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def _deliver_now(self, events: Sequence[ProgressEvent]) -> None:
+        """同步交给全部 Sink"""
+        with self._lock:
+            for sink in self.sinks:
+                try:
+                    sink.write(events)
+                except Exception as e:
+                    sys.stderr.write(f"进度输出失败（{type(sink).__name__}）: {e}\n")
+
+    async def _deliver(self, events: Sequence[ProgressEvent]) -> None:
+        """交给全部 Sink（阻塞写入放到线程池）"""
+        for sink in self.sinks:
+            try:
+                if sink.blocking:
+                    await asyncio.to_thread(sink.write, events)
+                else:
+                    sink.write(events)
+            except Exception as e:
+                sys.stderr.write(f"进度输出失败（{type(sink).__name__}）: {e}\n")
+
+    async def _dispatch(self) -> None:
+        """后台分发：每次取出队列中已有的事件批量交给 Sink"""
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < BATCH_SIZE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._deliver(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def start(self) -> "ProgressBus":
+        """启动后台分发"""
+        if not self.running:
+            self._loop = asyncio.get_running_loop()
+            self._queue = asyncio.Queue(self.maxsize)
+            self._task = asyncio.create_task(self._dispatch(), name="progress-bus")
+        return self
+
+    async def flush(self) -> None:
+        """等待队列中的事件全部输出（在直接 print 报告前调用，保证输出顺序）"""
+        if self.running:
+            await self._queue.join()
+
+    async def close(self) -> None:
+        """输出剩余事件、停止分发并关闭 Sink"""
+        if self.running:
+            await self.flush()
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        for sink in self.sinks:
+            sink.close()
+        if self.dropped:
+            sys.stderr.write(f"进度事件队列已满，丢弃 {self.dropped} 个事件\n")
+
+    async def __aenter__(self) -> "ProgressBus":
+        return await self.start()
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+
+
+# 全局共享的总线（未配置时只输出到控制台）
+_shared_bus: Optional[ProgressBus] = None
+
+
+def get_progress_bus() -> ProgressBus:
+    """获取共享总线（未配置时创建）"""
+    global _shared_bus
+    if _shared_bus is None:
+        _shared_bus = ProgressBus()
+    return _shared_bus
+
+
+def set_progress_bus(bus: ProgressBus) -> ProgressBus:
+    """替换共享总线（每次运行开始时设置）"""
+    global _shared_bus
+    _shared_bus = bus
+    return bus
+
+
+def emit(event: ProgressEvent) -> None:
+    """发布事件到共享总线"""
+    get_progress_bus().emit(event)
+
+
+def note(text: str, level: str = LEVEL_INFO) -> None:
+    """
+    发布文本提示
+
+    Args:
+        text: 控制台显示的文本（与原 print 内容一致）
+        level: 级别（info / warning / error）
+    """
+    emit(Note(text=text, level=level))
@@ -0,0 +1,112 @@
+"""
+提示词紧凑序列化
+把 ResearchResult / XHSContent 转成省 token 的文本，替代 model_dump_json(indent=2)
+
+- 实体、案例用表格行表示：表头只写一次字段名，每行一条，字段以 | 分隔
+- 稀疏字段（出现率低于一半）不单独成列，按 key=value 放在行尾的"其他"列
+- 不缩进、不重复 key，列表用顿号连接
+"""
+import json
+from typing import Any, Dict, List, Sequence, Union
+
+from ..models.schemas import ResearchResult, ResearchRow, XHSContent
+
+# 字段出现率低于此值时归入"其他"列
+DENSE_COLUMN_RATIO = 0.5
+
+# 其他列的列名
+EXTRA_COLUMN = "其他"
+
+
+def _cell(value: Any) -> str:
+    """单元格文本（去掉换行和分隔符，列表/字典紧凑编码）"""
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        text = "/".join(_cell(v) for v in value)
+    elif isinstance(value, dict):
+        text = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    else:
+        text = str(value)
+    return " ".join(text.replace("|", "｜").split())
+
+
+def _columns(rows: Sequence[Dict[str, Any]]) -> List[str]:
+    """按首次出现顺序列出高频字段"""
+    counts: Dict[str, int] = {}
+    for row in rows:
+        for key in row:
+            counts[key] = counts.get(key, 0) + 1
+    return [key for key, count in counts.items() if count >= len(rows) * DENSE_COLUMN_RATIO]
+
+
+def format_table(name: str, rows: Sequence[Union[Dict[str, Any], ResearchRow]]) -> str:
+    """
+    字典 / 行模型列表 → 表格文本
+
+    Args:
+        name: 表名（如 entities）
+        rows: 字典或 Entity / Case 列表（行模型只取实际出现的字段）
+
+    Returns:
+        形如 "entities[2]{name|type|issue}:" 加每行数据的文本
+    """
+    if not rows:
+        return f"{name}[0]"
+
+    rows = [row.model_dump() if isinstance(row, ResearchRow) else row for row in rows]
+
+    columns = _columns(rows)
+    has_extra = any(key not in columns for row in rows for key in row)
+    header = columns + ([EXTRA_COLUMN] if has_extra else [])
+
+    lines = [f"{name}[{len(rows)}]{{{'|'.join(header)}}}:"]
+    for row in rows:
+        cells = [_cell(row.get(key)) for key in columns]
+        if has_extra:
+            cells.append("; ".join(
+                f"{key}={_cell(value)}" for key, value in row.items() if key not in columns
+            ))
+        lines.append("|".join(cells))
+    return "\n".join(lines)
+
+
+def format_research(research: ResearchResult) -> str:
+    """
+    研究结果 → 紧凑文本
+
+    Args:
+        research: 研究结果
+
+    Returns:
+        提示词中使用的研究数据文本
+    """
+    parts = [
+        f"summary: {research.summary}",
+        f"credibility: {research.credibility} | data_points: {research.data_points}",
+        f"keywords: {'、'.join(research.keywords)}",
+        format_table("entities", research.entities),
+        format_table("cases", research.cases),
+    ]
+    if research.note_ids:
+        parts.append(f"note_ids: {' '.join(research.note_ids)}")
+    return "\n".join(parts)
+
+
+def format_content(content: XHSContent) -> str:
+    """
+    小红书内容 → 紧凑文本（正文原样保留，便于核对条目数和排版）
+
+    Args:
+        content: 小红书内容
+
+    Returns:
+        提示词中使用的内容文本
+    """
+    return "\n".join([
+        f"title: {content.title}",
+        f"hashtags: {' '.join('#' + tag for tag in content.hashtags)}",
+        f"call_to_action: {content.call_to_action}",
+        "body:",
+        content.body,
+    ])
@@ -0,0 +1,227 @@
+"""
+Reflexion 自适应停止
+根据审核评分轨迹和问题指纹决定是否继续修订，避免在评分停滞或
+同样的问题反复出现时白白跑满 max_iterations
+
+- 收敛：相邻两轮评分提升不足 PLATEAU_DELTA（含评分下降）时停止
+- 重复：本轮问题中有 REPEAT_RATIO 以上与上一轮相同（按指纹比较）时停止
+- 加轮：达到 max_iterations 时评分仍在快速提升（≥ FAST_IMPROVEMENT），额外给一轮
+- 数量进展：规则预审按 20/10/5 分档扣分、指纹去掉数字，实体从 8 个补到 12 个时评分和指纹都不变；
+  审核统计（entity_usage）里的实体 / 案例等数量增长时视为进展，不按收敛或重复停止
+- 每次决策打印并记录 logfire 事件；停止时可取评分最高的一轮作为结果
+"""
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import logfire
+
+from ..models.schemas import ReviewIssue, ReviewResult
+from .progress import note
+
+# 评分提升低于此值视为收敛
+PLATEAU_DELTA = 3.0
+
+# 重复问题占比达到此值视为原地打转
+REPEAT_RATIO = 0.8
+
+# 单轮评分提升达到此值时允许额外一轮
+FAST_IMPROVEMENT = 10.0
+
+# 最多额外轮次
+MAX_EXTRA_ROUNDS = 1
+
+# 审核统计中越多越好的数量（任一增长即视为进展）
+PROGRESS_COUNTS = ("research_entities", "research_cases", "used_entities")
+
+# 指纹取描述归一化后的前若干字（LLM 每轮措辞略有不同，前半句通常一致）
+FINGERPRINT_CHARS = 16
+
+# 决策
+ACTION_CONTINUE = "continue"
+ACTION_STOP = "stop"
+ACTION_EXTEND = "extend"
+
+# 停止原因
+REASON_PASSED = "passed"
+REASON_PLATEAU = "plateau"
+REASON_REPEATED = "repeated_issues"
+REASON_MAX_ROUNDS = "max_iterations"
+
+# 继续 / 加轮原因
+REASON_FIRST_ROUND = "first_round"
+REASON_IMPROVING = "improving"
+REASON_FAST_IMPROVEMENT = "fast_improvement"
+REASON_COUNTS_IMPROVING = "counts_improving"
+
+_NORMALIZE_RE = re.compile(r"[\d\s\W_]+", re.UNICODE)
+
+
+def issue_fingerprint(issue: ReviewIssue) -> str:
+    """
+    问题指纹：类型 + 严重程度 + 归一化描述（去掉数字、空白和标点）
+
+    Args:
+        issue: 审核问题
+
+    Returns:
+        12 位十六进制指纹
+    """
+    text = _NORMALIZE_RE.sub("", issue.description.lower())[:FINGERPRINT_CHARS]
+    key = f"{issue.type}|{issue.severity}|{text}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+def measured_counts(review: ReviewResult) -> Dict[str, float]:
+    """
+    审核统计中的数量指标（PROGRESS_COUNTS 中存在且为数字的项）
+
+    Args:
+        review: 审核结果
+
+    Returns:
+        {指标: 数量}
+    """
+    usage = review.entity_usage or {}
+    return {
+        key: usage[key] for key in PROGRESS_COUNTS
+        if isinstance(usage.get(key), (int, float)) and not isinstance(usage.get(key), bool)
+    }
+
+
+@dataclass
+class StopDecision:
+    """单轮审核后的决策"""
+
+    round: int
+    score: float
+    action: str
+    reason: str
+    delta: Optional[float] = None
+    repeated: float = 0.0
+    counts_grew: bool = False
+
+    @property
+    def stop(self) -> bool:
+        """是否停止修订"""
+        return self.action == ACTION_STOP
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化字典"""
+        return {
+            "round": self.round,
+            "score": self.score,
+            "action": self.action,
+            "reason": self.reason,
+            "delta": None if self.delta is None else round(self.delta, 2),
+            "repeated": round(self.repeated, 2),
+            "counts_grew": self.counts_grew,
+        }
+
+
+@dataclass
+class ReflexionController:
+    """按评分轨迹和问题重复度决定 Reflexion 循环是否继续"""
+
+    role: str
+    max_iterations: int
+    plateau_delta: float = PLATEAU_DELTA
+    repeat_ratio: float = REPEAT_RATIO
+    fast_improvement: float = FAST_IMPROVEMENT
+    max_extra_rounds: int = MAX_EXTRA_ROUNDS
+    decisions: List[StopDecision] = field(default_factory=list, init=False)
+    extra_rounds: int = field(default=0, init=False)
+    _fingerprints: List[set] = field(default_factory=list, init=False, repr=False)
+    _scores: List[float] = field(default_factory=list, init=False, repr=False)
+    _counts: List[Dict[str, float]] = field(default_factory=list, init=False, repr=False)
+
+    @property
+    def rounds(self) -> int:
+        """已审核轮次"""
+        return len(self._scores)
+
+    @property
+    def limit(self) -> int:
+        """当前允许的总轮次（含额外轮次）"""
+        return self.max_iterations + self.extra_rounds
+
+    @property
+    def best_round(self) -> int:
+        """评分最高的轮次（从 1 开始，同分取较晚一轮）"""
+        return max(range(self.rounds), key=lambda i: (self._scores[i], i)) + 1 if self._scores else 0
+
+    def observe(self, review: ReviewResult) -> StopDecision:
+        """
+        记录一轮审核结果并决定是否继续
+
+        Args:
+            review: 本轮审核结果
+
+        Returns:
+            StopDecision: 本轮决策
+        """
+        fingerprints = {issue_fingerprint(issue) for issue in review.issues}
+        delta = review.score - self._scores[-1] if self._scores else None
+        repeated = (
+            len(fingerprints & self._fingerprints[-1]) / len(fingerprints)
+            if self._fingerprints and fingerprints else 0.0
+        )
+        counts = measured_counts(review)
+        previous = self._counts[-1] if self._counts else {}
+        counts_grew = any(key in previous and value > previous[key] for key, value in counts.items())
+        self._scores.append(review.score)
+        self._fingerprints.append(fingerprints)
+        self._counts.append(counts)
+        round_no = self.rounds
+
+        if review.passed:
+            action, reason = ACTION_STOP, REASON_PASSED
+        elif round_no >= self.limit:
+            if delta is not None and delta >= self.fast_improvement and self.extra_rounds < self.max_extra_rounds:
+                self.extra_rounds += 1
+                action, reason = ACTION_EXTEND, REASON_FAST_IMPROVEMENT
+            else:
+                action, reason = ACTION_STOP, REASON_MAX_ROUNDS
+        elif counts_grew:
+            action, reason = ACTION_CONTINUE, REASON_COUNTS_IMPROVING
+        elif delta is not None and repeated >= self.repeat_ratio and delta < self.fast_improvement:
+            action, reason = ACTION_STOP, REASON_REPEATED
+        elif delta is not None and delta < self.plateau_delta:
+            action, reason = ACTION_STOP, REASON_PLATEAU
+        else:
+            action, reason = ACTION_CONTINUE, REASON_IMPROVING if delta is not None else REASON_FIRST_ROUND
+
+        decision = StopDecision(round_no, review.score, action, reason, delta, repeated, counts_grew)
+        self.decisions.append(decision)
+        self._log(decision)
+        return decision
+
+    def _log(self, decision: StopDecision) -> None:
+        """打印并记录决策（通过和常规继续只记事件，不打印）"""
+        logfire.info(
+            "reflexion decision for {role}: {action} ({reason})",
+            role=self.role, **decision.to_dict()
+        )
+        if decision.action == ACTION_EXTEND:
+            note(f"   🧭 评分快速提升 {decision.delta:+.1f}，额外修订一轮")
+        elif decision.stop and decision.reason in (REASON_PLATEAU, REASON_REPEATED):
+            detail = (
+                f"评分变化 {decision.delta:+.1f}" if decision.reason == REASON_PLATEAU
+                else f"{decision.repeated:.0%} 的问题与上一轮相同"
+            )
+            note(f"   🧭 提前停止修订（{decision.reason}：{detail}），节省 {self.limit - decision.round} 轮")
+
+    def report(self) -> Dict[str, Any]:
+        """决策轨迹和节省的轮次"""
+        last = self.decisions[-1] if self.decisions else None
+        early = last is not None and last.reason in (REASON_PLATEAU, REASON_REPEATED)
+        return {
+            "rounds": self.rounds,
+            "max_iterations": self.max_iterations,
+            "extra_rounds": self.extra_rounds,
+            "stop_reason": last.reason if last and last.stop else None,
+            "rounds_saved": self.limit - self.rounds if early else 0,
+            "best_round": self.best_round,
+            "decisions": [d.to_dict() for d in self.decisions],
+        }
@@ -9,6 +9,9 @@ from pydantic_ai.exceptions import ModelHTTPError, ModelAPIError
 from httpx import HTTPStatusError
 from anthropic import APIConnectionError, APIStatusError
 
+from .progress import note
+from .run_profile import RETRY_METHOD, get_run_profiler
+
 
 # 可重试的异常类型
 RETRYABLE_EXCEPTIONS = (
@@ -55,7 +58,8 @@ def with_retry(max_retries: int = 3, initial_delay: float = 2.0):
                         raise
                     delay = initial_delay * (2 ** attempt)
                     error_type = type(e).__name__
-                    print(f"   🔄 {error_type}，{delay:.0f}s 后重试整个工作流 ({attempt + 1}/{max_retries})...")
+                    note(f"   🔄 {error_type}，{delay:.0f}s 后重试整个工作流 ({attempt + 1}/{max_retries})...")
+                    get_run_profiler().record_retry(RETRY_METHOD)
                     await asyncio.sleep(delay)
             raise last_exception
         return wrapper
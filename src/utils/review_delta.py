@@ -0,0 +1,212 @@
+"""
+审核增量提示词
+Reflexion 修订轮次不再向审核 Agent 重发完整内容和研究数据：
+同一条修订链的审核保持在一段对话里，首轮发送全文作为前缀，之后每轮只发送
+相对上一次审核版本的结构化差异
+
+- 内容：标题 / 标签 / 行动号召的字段变化，正文按行 unified diff（不带上下文行）
+- 研究：摘要等字段变化，实体按名称比较新增 / 删除 / 修改，案例新增 / 删除，附最新总数
+- 审核 Agent 开启 Anthropic prompt caching，对话前缀（系统提示词、输出工具、
+  首轮全文和历次审核）按缓存读取计费，新增输入只随差异大小增长
+- 正文改动比全文还大时直接附上新正文
+- 对话加上本轮差异会超出审核角色的 token 预算时重新开始对话、发送全文：
+  否则预算检查会先截断最早的长文本（即首轮全文），之后的差异就失去了对照
+"""
+import difflib
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from pydantic_ai.messages import ModelMessage
+from pydantic_ai.models.anthropic import AnthropicModelSettings
+
+from ..models.schemas import Case, Entity, ResearchResult, XHSContent
+from .llm_usage import estimate_tokens
+from .prompt_format import format_table
+from .token_budget import MESSAGE_OVERHEAD, estimate_messages_tokens
+
+# 审核 Agent 的模型设置：缓存系统提示词、输出工具定义和对话前缀
+REVIEW_CACHE_SETTINGS = AnthropicModelSettings(
+    anthropic_cache_instructions=True,
+    anthropic_cache_tool_definitions=True,
+    anthropic_cache_messages=True,
+)
+
+# 无变化时的差异文本
+NO_CHANGE = "（与上一轮相同，无修改）"
+
+
+def _tag_changes(old: Sequence[str], new: Sequence[str], prefix: str = "") -> str:
+    """列表字段的增删（+新增 -删除）"""
+    added = [f"+{prefix}{v}" for v in new if v not in old]
+    removed = [f"-{prefix}{v}" for v in old if v not in new]
+    return " ".join(added + removed)
+
+
+def diff_text(old: str, new: str) -> List[str]:
+    """
+    按行 unified diff（不带上下文行和文件头）
+
+    Args:
+        old: 旧文本
+        new: 新文本
+
+    Returns:
+        差异行（@@ 旧起始行,行数 新起始行,行数 @@ / -删除行 / +新增行）
+    """
+    lines = difflib.unified_diff(old.splitlines(), new.splitlines(), lineterm="", n=0)
+    return [line for line in lines if not line.startswith(("---", "+++"))]
+
+
+def diff_content(old: XHSContent, new: XHSContent) -> str:
+    """
+    内容相对上一轮的结构化差异
+
+    Args:
+        old: 上一次审核的内容
+        new: 修订后的内容
+
+    Returns:
+        差异文本（无变化时为 NO_CHANGE）
+    """
+    lines = []
+    if old.title != new.title:
+        lines.append(f"title: {old.title} → {new.title}")
+    if old.hashtags != new.hashtags:
+        changes = _tag_changes(old.hashtags, new.hashtags, "#")
+        lines.append(f"hashtags: {changes or '调整顺序'}（现为 {' '.join('#' + t for t in new.hashtags)}）")
+    if old.call_to_action != new.call_to_action:
+        lines.append(f"call_to_action: {new.call_to_action}")
+
+    if old.body != new.body:
+        body_diff = diff_text(old.body, new.body)
+        stats = f"{len(new.body.splitlines())} 行 / {len(new.body)} 字"
+        if sum(len(line) for line in body_diff) >= len(new.body):
+            lines.append(f"body（改动较大，附修订后全文，{stats}）:")
+            lines.append(new.body)
+        else:
+            lines.append(f"body diff（修订后 {stats}；-删除 +新增，@@ -旧起始行,行数 +新起始行,行数 @@）:")
+            lines.extend(body_diff)
+    return "\n".join(lines) or NO_CHANGE
+
+
+def _entity_key(entity: Entity) -> str:
+    """实体标识：名称（无名称时用完整内容）"""
+    return entity.name or json.dumps(entity.model_dump(), ensure_ascii=False, sort_keys=True)
+
+
+def _case_key(case: Case) -> str:
+    """案例标识：完整内容（案例没有稳定的名称字段）"""
+    return json.dumps(case.model_dump(), ensure_ascii=False, sort_keys=True)
+
+
+def diff_research(old: ResearchResult, new: ResearchResult) -> str:
+    """
+    研究结果相对上一轮的结构化差异
+
+    Args:
+        old: 上一次审核的研究结果
+        new: 补充后的研究结果
+
+    Returns:
+        差异文本（无变化时为 NO_CHANGE）
+    """
+    lines = []
+    if old.summary != new.summary:
+        lines.append(f"summary: {new.summary}")
+    if (old.credibility, old.data_points) != (new.credibility, new.data_points):
+        lines.append(
+            f"credibility: {old.credibility} → {new.credibility} | "
+            f"data_points: {old.data_points} → {new.data_points}"
+        )
+    if old.keywords != new.keywords:
+        lines.append(f"keywords: {_tag_changes(old.keywords, new.keywords) or '调整顺序'}")
+    if len(old.note_ids) != len(new.note_ids):
+        lines.append(f"note_ids: {len(old.note_ids)} → {len(new.note_ids)} 篇")
+
+    old_entities = {_entity_key(e): e for e in old.entities}
+    new_entities = {_entity_key(e): e for e in new.entities}
+    added = [e for key, e in new_entities.items() if key not in old_entities]
+    removed = [key for key in old_entities if key not in new_entities]
+    changed = [e for key, e in new_entities.items() if key in old_entities and old_entities[key] != e]
+    if added or removed or changed:
+        lines.append(
+            f"entities: {len(old.entities)} → {len(new.entities)} 个"
+            f"（新增 {len(added)}，删除 {len(removed)}，修改 {len(changed)}）"
+        )
+        if added:
+            lines.append(format_table("entities_added", added))
+        if changed:
+            lines.append(format_table("entities_changed", changed))
+        if removed:
+            lines.append(f"entities_removed: {'、'.join(removed)}")
+
+    old_cases = {_case_key(c) for c in old.cases}
+    new_cases = {_case_key(c) for c in new.cases}
+    cases_added = [c for c in new.cases if _case_key(c) not in old_cases]
+    cases_removed = [c for c in old.cases if _case_key(c) not in new_cases]
+    if cases_added or cases_removed:
+        lines.append(
+            f"cases: {len(old.cases)} → {len(new.cases)} 个"
+            f"（新增 {len(cases_added)}，删除 {len(cases_removed)}）"
+        )
+        if cases_added:
+            lines.append(format_table("cases_added", cases_added))
+        if cases_removed:
+            lines.append(format_table("cases_removed", cases_removed))
+    return "\n".join(lines) or NO_CHANGE
+
+
+@dataclass
+class ReviewSession:
+    """一条修订链上的审核对话（首轮全文，之后只发差异）"""
+
+    messages: List[ModelMessage] = field(default_factory=list)
+    reviewed: Optional[Any] = None  # 审核 Agent 最近一次看到的版本
+    full_chars: int = 0  # 首轮发送的提示词字数
+    delta_chars: List[int] = field(default_factory=list)  # 各增量轮次的提示词字数
+    restarts: int = 0  # 因超出预算重新发送全文的次数
+
+    @property
+    def started(self) -> bool:
+        """是否已有首轮审核（之后的轮次发送差异）"""
+        return self.reviewed is not None
+
+    def fits(self, prompt: str, budget: int) -> bool:
+        """
+        已有对话加上本轮提示词是否仍在预算内
+
+        Args:
+            prompt: 本轮差异提示词
+            budget: 审核角色的输入 token 预算
+
+        Returns:
+            是否可以继续增量审核（超出时预算检查会截断首轮全文）
+        """
+        return estimate_messages_tokens(self.messages) + MESSAGE_OVERHEAD + estimate_tokens(prompt) <= budget
+
+    def restart(self) -> None:
+        """丢弃已有对话，下一轮重新发送全文"""
+        self.messages = []
+        self.reviewed = None
+        self.restarts += 1
+
+    def record(self, document: Any, messages: List[ModelMessage], prompt: str) -> None:
+        """
+        记录一轮审核
+
+        Args:
+            document: 本轮审核的版本
+            messages: 包含本轮的完整对话
+            prompt: 本轮发送的提示词
+        """
+        if self.started:
+            self.delta_chars.append(len(prompt))
+        else:
+            self.full_chars = len(prompt)
+        self.reviewed = document
+        self.messages = messages
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化字典"""
+        return {"full_chars": self.full_chars, "delta_chars": list(self.delta_chars), "restarts": self.restarts}
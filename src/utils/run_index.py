@@ -0,0 +1,446 @@
+"""
+运行索引（SQLite）
+每次运行的主题、受众、参数、提示词版本、各阶段状态、审核评分、耗时和产物摘要记录在 posts/.runs.sqlite，
+列出、筛选和恢复运行都走带索引的查询，不再遍历 posts/ 并解析 JSON（耗时与历史运行数量无关）
+
+- 阶段状态和审核评分由 RunIndexSink 从进度事件记录（PhaseStarted / PhaseFinished / ReviewVerdict）
+- 产物摘要由 ArtifactWriter 写入后回调记录，对应 ArtifactStore 中的对象
+- reindex 从已有 posts/ 目录回填索引，同时把产物纳入内容寻址存储去重
+"""
+import json
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from .artifact_store import ArtifactStore, is_storable
+from .file_ops import load_json
+from .progress import PhaseFinished, PhaseStarted, ProgressEvent, ReviewVerdict
+
+# 默认数据库位置（放在 posts/ 下，随输出一起管理）
+INDEX_FILE = ".runs.sqlite"
+DEFAULT_INDEX_PATH = Path("posts") / INDEX_FILE
+
+# 运行状态
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+# 阶段状态（运行结束时仍在运行的阶段记为 interrupted）
+PHASE_RUNNING = "running"
+PHASE_DONE = "done"
+PHASE_INTERRUPTED = "interrupted"
+
+# 有审核评分的阶段（runs 表中各占一列）
+SCORED_PHASES = ("research", "content", "image")
+
+# 运行目录名中的时间戳格式（与 incremental.TIMESTAMP_FORMAT 一致）
+_TIMESTAMP_FORMAT = "%Y%m%d-%H%M%S"
+
+# 回填时按产物文件推断已完成的阶段
+_PHASE_FILES = {"research": "research.json", "content": "content.json", "image": "image.json"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    run_dir TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    safe_topic TEXT NOT NULL,
+    audience TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    wall_time REAL,
+    options TEXT NOT NULL DEFAULT '{}',
+    prompt_versions TEXT NOT NULL DEFAULT '{}',
+    research_score REAL,
+    content_score REAL,
+    image_score REAL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs(started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_topic ON runs(safe_topic, started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_audience ON runs(audience, started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_status ON runs(status, started_at);
+CREATE TABLE IF NOT EXISTS phases (
+    run_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started_at TEXT,
+    duration REAL,
+    outcome TEXT,
+    PRIMARY KEY (run_id, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS artifacts (
+    run_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (run_id, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_artifacts_digest ON artifacts(digest);
+"""
+
+
+@dataclass
+class RunRecord:
+    """一次运行的索引记录"""
+
+    run_id: str
+    run_dir: str
+    topic: str
+    safe_topic: str
+    audience: str
+    status: str
+    started_at: str
+    finished_at: Optional[str] = None
+    wall_time: Optional[float] = None
+    options: Dict[str, Any] = field(default_factory=dict)
+    prompt_versions: Dict[str, str] = field(default_factory=dict)
+    scores: Dict[str, Optional[float]] = field(default_factory=dict)
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "RunRecord":
+        """从 runs 表的一行构建"""
+        return cls(
+            run_id=row["run_id"],
+            run_dir=row["run_dir"],
+            topic=row["topic"],
+            safe_topic=row["safe_topic"],
+            audience=row["audience"],
+            status=row["status"],
+            started_at=row["started_at"],
+            finished_at=row["finished_at"],
+            wall_time=row["wall_time"],
+            options=json.loads(row["options"]),
+            prompt_versions=json.loads(row["prompt_versions"]),
+            scores={phase: row[f"{phase}_score"] for phase in SCORED_PHASES},
+        )
+
+
+@dataclass
+class PhaseRecord:
+    """一个阶段的索引记录"""
+
+    name: str
+    status: str
+    started_at: Optional[str] = None
+    duration: Optional[float] = None
+    outcome: Optional[str] = None
+
+
+class RunIndex:
+    """运行索引（SQLite）"""
+
+    def __init__(self, db_path: Path | str = DEFAULT_INDEX_PATH):
+        """
+        打开（或创建）索引
+
+        Args:
+            db_path: 数据库文件路径
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        self.conn.close()
+
+    def __enter__(self) -> "RunIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ==================== 记录 ====================
+
+    def start_run(
+        self,
+        run_id: str,
+        run_dir: Path | str,
+        topic: str,
+        safe_topic: str,
+        audience: str = "",
+        options: Optional[Dict[str, Any]] = None,
+        prompt_versions: Optional[Dict[str, str]] = None,
+        started_at: Optional[datetime] = None
+    ) -> None:
+        """
+        登记运行开始（恢复已有运行时保留原开始时间和评分）
+
+        Args:
+            run_id: 运行标识（输出目录名）
+            run_dir: 输出目录
+            topic: 研究主题
+            safe_topic: 清理后的主题名（目录名中的部分，按它查找同主题运行）
+            audience: 目标受众
+            options: 运行参数
+            prompt_versions: 各提示词的版本号
+            started_at: 开始时间（默认当前时间）
+        """
+        self.conn.execute(
+            """
+            INSERT INTO runs (run_id, run_dir, topic, safe_topic, audience, status, started_at, options, prompt_versions)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(run_id) DO UPDATE SET
+                status = excluded.status, finished_at = NULL,
+                options = excluded.options, prompt_versions = excluded.prompt_versions
+            """,
+            (
+                run_id, str(run_dir), topic, safe_topic, audience, STATUS_RUNNING,
+                (started_at or datetime.now()).isoformat(timespec="seconds"),
+                json.dumps(options or {}, ensure_ascii=False),
+                json.dumps(prompt_versions or {}, ensure_ascii=False),
+            )
+        )
+        self.conn.commit()
+
+    def finish_run(self, run_id: str, status: str, wall_time: Optional[float] = None) -> None:
+        """
+        登记运行结束
+
+        Args:
+            run_id: 运行标识
+            status: completed / failed
+            wall_time: 本次执行的墙钟时间（秒，恢复运行时累加到已有耗时）
+        """
+        self.conn.execute(
+            "UPDATE runs SET status = ?, finished_at = ?, wall_time = ROUND(COALESCE(wall_time, 0) + ?, 3) WHERE run_id = ?",
+            (status, datetime.now().isoformat(timespec="seconds"), wall_time, run_id)
+        )
+        self.conn.execute(
+            "UPDATE phases SET status = ? WHERE run_id = ? AND status = ?",
+            (PHASE_INTERRUPTED, run_id, PHASE_RUNNING)
+        )
+        self.conn.commit()
+
+    def phase_started(self, run_id: str, name: str, started_at: Optional[datetime] = None) -> None:
+        """登记阶段开始（不提交，由调用方批量提交）"""
+        self.conn.execute(
+            """
+            INSERT INTO phases (run_id, name, status, started_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(run_id, name) DO UPDATE SET
+                status = excluded.status, started_at = excluded.started_at, duration = NULL, outcome = NULL
+            """,
+            (run_id, name, PHASE_RUNNING, (started_at or datetime.now()).isoformat(timespec="seconds"))
+        )
+
+    def phase_finished(self, run_id: str, name: str, duration: float, outcome: str) -> None:
+        """登记阶段完成（不提交）"""
+        self.conn.execute(
+            """
+            INSERT INTO phases (run_id, name, status, duration, outcome) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(run_id, name) DO UPDATE SET
+                status = excluded.status, duration = excluded.duration, outcome = excluded.outcome
+            """,
+            (run_id, name, PHASE_DONE, round(duration, 3), outcome)
+        )
+
+    def record_score(self, run_id: str, phase: str, score: float) -> None:
+        """登记审核评分（同一阶段以最后一次审核为准；不提交）"""
+        if phase in SCORED_PHASES:
+            self.conn.execute(f"UPDATE runs SET {phase}_score = ? WHERE run_id = ?", (score, run_id))
+
+    def record_artifact(self, run_id: str, name: str, digest: str, size: int, commit: bool = True) -> None:
+        """
+        登记产物
+
+        Args:
+            run_id: 运行标识
+            name: 产物在运行目录中的文件名
+            digest: 内容摘要
+            size: 字节数
+            commit: 是否立即提交
+        """
+        self.conn.execute(
+            "INSERT OR REPLACE INTO artifacts (run_id, name, digest, size) VALUES (?, ?, ?, ?)",
+            (run_id, name, digest, size)
+        )
+        if commit:
+            self.conn.commit()
+
+    def commit(self) -> None:
+        """提交未提交的记录"""
+        self.conn.commit()
+
+    # ==================== 查询 ====================
+
+    def get(self, run_id: str) -> Optional[RunRecord]:
+        """按标识查询运行"""
+        row = self.conn.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return RunRecord.from_row(row) if row else None
+
+    def list_runs(
+        self,
+        safe_topic: Optional[str] = None,
+        audience: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 20
+    ) -> List[RunRecord]:
+        """
+        按开始时间倒序列出运行（走索引，只读取 limit 行）
+
+        Args:
+            safe_topic: 只列出该主题（清理后的主题名）
+            audience: 只列出该受众
+            status: 只列出该状态
+            limit: 最多返回条数
+
+        Returns:
+            运行记录
+        """
+        conditions, params = [], []
+        for column, value in (("safe_topic", safe_topic), ("audience", audience), ("status", status)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self.conn.execute(
+            f"SELECT * FROM runs {where} ORDER BY started_at DESC LIMIT ?", (*params, limit)
+        )
+        return [RunRecord.from_row(row) for row in rows]
+
+    def latest(self, safe_topic: str, phase: str = "research") -> Optional[RunRecord]:
+        """
+        该主题最近一次完成了指定阶段的运行
+
+        Args:
+            safe_topic: 清理后的主题名
+            phase: 需要已完成的阶段
+
+        Returns:
+            运行记录，没有则返回 None
+        """
+        row = self.conn.execute(
+            """
+            SELECT runs.* FROM runs
+            JOIN phases ON phases.run_id = runs.run_id AND phases.name = ? AND phases.status = ?
+            WHERE runs.safe_topic = ?
+            ORDER BY runs.started_at DESC LIMIT 1
+            """,
+            (phase, PHASE_DONE, safe_topic)
+        ).fetchone()
+        return RunRecord.from_row(row) if row else None
+
+    def phases(self, run_id: str) -> Dict[str, PhaseRecord]:
+        """运行的各阶段记录"""
+        rows = self.conn.execute(
+            "SELECT name, status, started_at, duration, outcome FROM phases WHERE run_id = ?", (run_id,)
+        )
+        return {row["name"]: PhaseRecord(**dict(row)) for row in rows}
+
+    def artifacts(self, run_id: str) -> Dict[str, str]:
+        """运行的产物 {文件名: 摘要}"""
+        rows = self.conn.execute("SELECT name, digest FROM artifacts WHERE run_id = ?", (run_id,))
+        return {row["name"]: row["digest"] for row in rows}
+
+    def stats(self) -> Dict[str, int]:
+        """运行数和产物去重统计"""
+        runs = self.conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+        files, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts").fetchone()
+        objects, unique = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM (SELECT digest, MAX(size) AS size FROM artifacts GROUP BY digest)"
+        ).fetchone()
+        return {"runs": runs, "artifacts": files, "objects": objects, "bytes": total, "stored_bytes": unique}
+
+    # ==================== 回填 ====================
+
+    def reindex(self, posts_dir: Path | str, store: ArtifactStore) -> int:
+        """
+        把尚未登记的历史运行目录登记到索引，并将其中可纳入的产物（见 is_storable）纳入存储
+
+        主题和受众优先取 watermark.json，其次从目录名推导；
+        按 research.json / content.json / image.json 是否存在推断已完成的阶段
+
+        Args:
+            posts_dir: 输出根目录
+            store: 产物存储
+
+        Returns:
+            新登记的运行数
+        """
+        posts_dir = Path(posts_dir)
+        known = {row[0] for row in self.conn.execute("SELECT run_id FROM runs")}
+        added = 0
+        for run_dir in sorted(posts_dir.iterdir()) if posts_dir.exists() else []:
+            if not run_dir.is_dir() or run_dir.name.startswith(".") or run_dir.name in known:
+                continue
+            parts = run_dir.name.split("-", 2)
+            if len(parts) < 3:
+                continue
+            try:
+                started_at = datetime.strptime(f"{parts[0]}-{parts[1]}", _TIMESTAMP_FORMAT)
+            except ValueError:
+                continue
+
+            topic, audience = parts[2], ""
+            watermark = run_dir / "watermark.json"
+            if watermark.exists():
+                data = load_json(watermark)
+                topic, audience = data.get("topic") or topic, data.get("target_audience", "")
+            self.start_run(run_dir.name, run_dir, topic, parts[2], audience, started_at=started_at)
+
+            for name, filename in _PHASE_FILES.items():
+                if (run_dir / filename).exists():
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO phases (run_id, name, status) VALUES (?, ?, ?)",
+                        (run_dir.name, name, PHASE_DONE)
+                    )
+            for path in sorted(run_dir.iterdir()):
+                if path.is_file() and is_storable(path):
+                    digest, size, _ = store.adopt(path)
+                    self.record_artifact(run_dir.name, path.name, digest, size, commit=False)
+
+            wall_time = None
+            profile = run_dir / "run_profile.json"
+            if profile.exists():
+                wall_time = load_json(profile).get("totals", {}).get("wall_time")
+            status = STATUS_COMPLETED if (run_dir / "content.json").exists() else STATUS_FAILED
+            self.conn.execute(
+                "UPDATE runs SET status = ?, wall_time = ? WHERE run_id = ?", (status, wall_time, run_dir.name)
+            )
+            self.conn.commit()
+            added += 1
+        return added
+
+
+class RunIndexSink:
+    """进度事件消费者：把阶段起止和审核评分写入运行索引（事件的 job 即运行标识）"""
+
+    blocking = False
+
+    def __init__(self, index: RunIndex, skip: Iterable[str] = ()):
+        """
+        初始化
+
+        Args:
+            index: 运行索引
+            skip: 不登记的阶段（恢复运行时复用的阶段，保留原耗时和评分）
+        """
+        self.index = index
+        self.skip = set(skip)
+
+    def write(self, events: Sequence[ProgressEvent]) -> None:
+        """登记一批事件（整批一次提交）"""
+        changed = False
+        for event in events:
+            if not event.job or event.phase in self.skip:
+                continue
+            if isinstance(event, PhaseStarted):
+                self.index.phase_started(event.job, event.name, datetime.fromtimestamp(event.at))
+            elif isinstance(event, PhaseFinished):
+                self.index.phase_finished(event.job, event.name, event.duration, event.outcome)
+            elif isinstance(event, ReviewVerdict):
+                self.index.record_score(event.job, event.target, event.score)
+            else:
+                continue
+            changed = True
+        if changed:
+            self.index.commit()
+
+    def close(self) -> None:
+        """索引由创建方关闭"""
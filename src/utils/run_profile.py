@@ -0,0 +1,332 @@
+"""
+运行画像
+按阶段和 Reflexion 轮次记录墙钟时间、LLM 调用次数和 token（含缓存读写）、
+重试次数（方法层 with_retry 和 HTTP 层 transport）以及送审图片字节数，
+写入 run_profile.json，便于定位慢运行中是哪个阶段 / 哪一轮退化
+
+- 作用域通过 contextvars 传递：阶段任务内的调用自动归属到该阶段，
+  parallel 候选等并发子任务各自记录自己的轮次
+- 轮次的墙钟时间为轮次开始到该轮最后一次记录（通常是审核调用结束）
+- compare_profiles：把最新一次运行与之前运行的中位数比较，找出退化的阶段和指标
+- 可选的内存画像（memory_profile.MemoryProfiler）在阶段起止和轮次开始时拍 tracemalloc 快照
+"""
+import statistics
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .llm_usage import UsageStats
+
+if TYPE_CHECKING:
+    from .memory_profile import MemoryProfiler
+
+# 画像文件名（写入每次运行的输出目录）
+PROFILE_FILE = "run_profile.json"
+
+# 重试类型
+RETRY_METHOD = "method"  # with_retry 重试整个方法
+RETRY_TRANSPORT = "transport"  # AsyncTenacityTransport 重试单次 HTTP 请求
+
+# 不在任何阶段内的记录
+UNSCOPED = "unscoped"
+
+# 比较的指标（阶段字典中的路径）及绝对容差（低于容差的变化视为噪声）
+COMPARE_METRICS: Dict[str, float] = {
+    "wall_time": 1.0,
+    "llm.calls": 1,
+    "llm.input_tokens": 500,
+    "llm.output_tokens": 200,
+    "llm.cost": 0.005,
+    "retries.method": 1,
+    "retries.transport": 1,
+    "image_review_bytes": 100_000,
+}
+
+# 默认的退化阈值（相对增幅）
+DEFAULT_THRESHOLD = 0.2
+
+
+@dataclass
+class ScopeStats:
+    """一个阶段或一轮的统计"""
+
+    started: float = 0.0
+    ended: float = 0.0
+    llm: UsageStats = field(default_factory=UsageStats)
+    retries: Dict[str, int] = field(default_factory=lambda: {RETRY_METHOD: 0, RETRY_TRANSPORT: 0})
+    image_review_bytes: int = 0
+
+    @property
+    def wall_time(self) -> float:
+        """墙钟时间（秒）"""
+        return max(self.ended - self.started, 0.0)
+
+    def touch(self, now: float) -> None:
+        """延长到 now（记录事件时调用）"""
+        if not self.started:
+            self.started = now
+        self.ended = max(self.ended, now)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化字典"""
+        return {
+            "wall_time": round(self.wall_time, 3),
+            "llm": self.llm.to_dict(),
+            "retries": dict(self.retries),
+            "image_review_bytes": self.image_review_bytes,
+        }
+
+
+@dataclass
+class PhaseProfile(ScopeStats):
+    """一个阶段的统计（含各轮次）"""
+
+    runs: int = 0  # 执行次数（投机阶段重做时大于 1）
+    busy: float = 0.0  # 各次执行的耗时之和
+    rounds: Dict[int, ScopeStats] = field(default_factory=dict)
+
+    @property
+    def wall_time(self) -> float:
+        """阶段执行耗时（重做时累加）"""
+        return self.busy or super().wall_time
+
+    def round(self, number: int) -> ScopeStats:
+        """轮次统计（不存在时创建）"""
+        return self.rounds.setdefault(number, ScopeStats())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化字典"""
+        data = super().to_dict()
+        data["runs"] = self.runs
+        data["rounds"] = {str(n): stats.to_dict() for n, stats in sorted(self.rounds.items())}
+        return data
+
+
+@dataclass(frozen=True)
+class _Scope:
+    """当前上下文的作用域"""
+
+    phase: str
+    round: int = 0
+
+
+_current_scope: ContextVar[Optional[_Scope]] = ContextVar("run_profile_scope", default=None)
+
+
+def current_scope() -> Tuple[Optional[str], int]:
+    """当前上下文的 (阶段, 轮次)，不在任何阶段内时为 (None, 0)"""
+    scope = _current_scope.get()
+    return (scope.phase, scope.round) if scope is not None else (None, 0)
+
+
+class RunProfiler:
+    """按阶段 / 轮次汇总的运行画像"""
+
+    def __init__(self, memory: Optional["MemoryProfiler"] = None):
+        """
+        初始化
+
+        Args:
+            memory: 内存画像（为空时不拍 tracemalloc 快照）
+        """
+        self.memory = memory
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.phases: Dict[str, PhaseProfile] = {}
+        self.totals = ScopeStats(started=self._start)
+
+    def _targets(self) -> List[ScopeStats]:
+        """当前作用域对应的统计（阶段、轮次）"""
+        now = time.perf_counter()
+        scope = _current_scope.get()
+        phase = self.phases.setdefault(scope.phase if scope else UNSCOPED, PhaseProfile())
+        targets: List[ScopeStats] = [self.totals, phase]
+        if scope is not None and scope.round:
+            targets.append(phase.round(scope.round))
+        for target in targets:
+            target.touch(now)
+        return targets
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[PhaseProfile]:
+        """
+        进入阶段作用域（同一阶段多次进入时耗时累加）
+
+        Args:
+            name: 阶段名
+        """
+        profile = self.phases.setdefault(name, PhaseProfile())
+        token = _current_scope.set(_Scope(name))
+        start = time.perf_counter()
+        profile.touch(start)
+        profile.runs += 1
+        if self.memory is not None:
+            self.memory.checkpoint(f"{name}:start")
+        try:
+            yield profile
+        finally:
+            end = time.perf_counter()
+            profile.busy += end - start
+            profile.touch(end)
+            _current_scope.reset(token)
+            if self.memory is not None:
+                self.memory.checkpoint(f"{name}:end")
+
+    def wrap(self, name: str, run: Callable[[Any], Awaitable[Any]]) -> Callable[[Any], Awaitable[Any]]:
+        """包装阶段函数（用于 PhaseScheduler.add），使其在阶段作用域内执行"""
+        async def profiled(inputs: Any) -> Any:
+            with self.phase(name):
+                return await run(inputs)
+
+        return profiled
+
+    def enter_round(self, number: int, messages: Optional[Sequence[Any]] = None) -> None:
+        """
+        进入 Reflexion 轮次（作用于当前任务，直到下一次 enter_round 或阶段结束）
+
+        Args:
+            number: 轮次（从 1 开始）
+            messages: 当前保留的消息历史（开启内存画像时统计其大小）
+        """
+        scope = _current_scope.get()
+        if scope is None:
+            scope = _Scope(UNSCOPED)
+        _current_scope.set(_Scope(scope.phase, number))
+        phase = self.phases.setdefault(scope.phase, PhaseProfile())
+        phase.round(number).touch(time.perf_counter())
+        if self.memory is not None:
+            self.memory.checkpoint(f"{scope.phase}:round{number}", messages)
+
+    def record_llm(self, usage: Any, latency: float, model_name: Optional[str] = None) -> None:
+        """
+        记录一次 Agent 运行的用量
+
+        Args:
+            usage: run_result.usage()
+            latency: 耗时（秒）
+            model_name: 模型名（估算成本）
+        """
+        for target in self._targets():
+            target.llm.add(usage, latency, model_name)
+
+    def record_retry(self, kind: str) -> None:
+        """记录一次重试（RETRY_METHOD / RETRY_TRANSPORT）"""
+        for target in self._targets():
+            target.retries[kind] = target.retries.get(kind, 0) + 1
+
+    def record_image_bytes(self, size: int) -> None:
+        """记录送审的图片字节数"""
+        for target in self._targets():
+            target.image_review_bytes += size
+
+    def report(self, **run_info: Any) -> Dict[str, Any]:
+        """
+        运行画像
+
+        Args:
+            **run_info: 运行信息（主题、受众、策略等）
+
+        Returns:
+            可序列化的画像
+        """
+        self.totals.ended = time.perf_counter()
+        report = {
+            **run_info,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "totals": self.totals.to_dict(),
+            "phases": {name: profile.to_dict() for name, profile in self.phases.items()},
+        }
+        if self.memory is not None:
+            report["memory"] = self.memory.report()
+        return report
+
+
+# 全局共享的画像（每次运行由 CLI 重置）
+_shared_profiler: Optional[RunProfiler] = None
+
+
+def get_run_profiler() -> RunProfiler:
+    """获取共享画像（未配置时创建）"""
+    global _shared_profiler
+    if _shared_profiler is None:
+        _shared_profiler = RunProfiler()
+    return _shared_profiler
+
+
+def set_run_profiler(profiler: RunProfiler) -> RunProfiler:
+    """替换共享画像（每次运行开始时重置）"""
+    global _shared_profiler
+    _shared_profiler = profiler
+    return profiler
+
+
+# ==================== 跨运行比较 ====================
+
+
+def metric(stats: Dict[str, Any], path: str) -> float:
+    """按点分路径读取指标（缺失时为 0）"""
+    value: Any = stats
+    for key in path.split("."):
+        value = value.get(key, 0) if isinstance(value, dict) else 0
+    return float(value or 0)
+
+
+def load_profiles(posts_dir: Path | str, topic: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    读取历史运行画像（按运行目录名即时间排序）
+
+    Args:
+        posts_dir: 输出根目录
+        topic: 只保留该主题的运行
+
+    Returns:
+        画像列表（附 run_dir）
+    """
+    from .file_ops import load_json
+
+    profiles = []
+    for path in sorted(Path(posts_dir).glob(f"*/{PROFILE_FILE}")):
+        profile = load_json(path)
+        if topic and profile.get("topic") != topic:
+            continue
+        profiles.append({**profile, "run_dir": path.parent.name})
+    return profiles
+
+
+def compare_profiles(
+    latest: Dict[str, Any],
+    baseline: List[Dict[str, Any]],
+    threshold: float = DEFAULT_THRESHOLD
+) -> List[Dict[str, Any]]:
+    """
+    最新运行与基线运行（取中位数）逐阶段比较
+
+    Args:
+        latest: 最新一次运行的画像
+        baseline: 之前运行的画像
+        threshold: 相对增幅阈值
+
+    Returns:
+        退化项 [{phase, metric, baseline, latest, change}]，按增幅降序
+    """
+    regressions = []
+    for phase, stats in latest.get("phases", {}).items():
+        history = [p["phases"][phase] for p in baseline if phase in p.get("phases", {})]
+        if not history:
+            continue
+        for path, floor in COMPARE_METRICS.items():
+            base = statistics.median(metric(h, path) for h in history)
+            value = metric(stats, path)
+            if value - base > floor and value > base * (1 + threshold):
+                regressions.append({
+                    "phase": phase,
+                    "metric": path,
+                    "baseline": round(base, 3),
+                    "latest": round(value, 3),
+                    "change": round((value - base) / base, 3) if base else None,
+                })
+    return sorted(regressions, key=lambda r: -(r["change"] if r["change"] is not None else float("inf")))
@@ -0,0 +1,35 @@
+"""
+Logfire 可观测性配置
+推迟到真正运行工作流时才配置（--help、参数校验和子命令不加载 logfire / OpenTelemetry），
+--no-telemetry 时完全跳过配置和 pydantic-ai 插桩
+"""
+import os
+
+# 是否已配置（同一进程只配置一次）
+_configured = False
+
+
+def configure_telemetry(enabled: bool = True) -> bool:
+    """
+    配置 Logfire 并为 pydantic-ai 插桩
+
+    Args:
+        enabled: False 时不配置（代码中的 logfire 调用变为空操作，并关闭未配置警告）
+
+    Returns:
+        是否已启用
+    """
+    global _configured
+    if not enabled:
+        os.environ.setdefault("LOGFIRE_IGNORE_NO_CONFIG", "1")
+        return False
+    if _configured:
+        return True
+
+    import logfire
+
+    # 'if-token-present' 表示如果没有配置 LOGFIRE_TOKEN，则不发送数据（本地模式）
+    logfire.configure(send_to_logfire='if-token-present')
+    logfire.instrument_pydantic_ai()
+    _configured = True
+    return True
@@ -0,0 +1,351 @@
+"""
+Token 预算
+每次调用 API 之前在本地估算提示词大小，超出角色预算时先在本地裁剪，
+而不是让请求撞上上下文上限或拖慢响应
+
+- fit_research：按重要性保留实体/案例（被案例引用多、信息完整的实体优先）
+- history_processor：作为 Agent 的 history_processors，在每次模型请求前检查整段消息，
+  超出预算时从最早的工具返回 / 长文本开始截断
+- 检查结果按角色统计，超预算时记录 logfire 事件
+"""
+import dataclasses
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import logfire
+from pydantic_ai.messages import (
+    BinaryContent, ModelMessage, ModelRequest, TextPart,
+    ToolReturnPart, UserPromptPart
+)
+
+from ..models.schemas import ResearchResult
+from .llm_usage import estimate_tokens
+from .progress import note
+from .prompt_format import format_research
+
+# 各角色单次调用的输入 token 预算（含系统提示词和消息历史）
+DEFAULT_BUDGETS: Dict[str, int] = {
+    "research.generator": 150_000,  # 浏览器快照累积，预算最大
+    "research.reviewer": 20_000,
+    "content.generator": 30_000,
+    "content.reviewer": 20_000,
+    "image.prompt_generator": 8_000,
+    "image.gemini_operator": 100_000,
+    "image.visual_reviewer": 30_000,
+}
+DEFAULT_BUDGET = 100_000
+
+# 图片按固定 token 估算（约 1000x1000 像素）
+IMAGE_TOKENS = 1_600
+
+# 每条消息的格式开销
+MESSAGE_OVERHEAD = 4
+
+# 截断后保留的开头字数
+TRUNCATE_KEEP_CHARS = 300
+
+# 裁剪研究数据时至少保留的实体/案例数
+MIN_KEEP_ENTITIES = 10
+MIN_KEEP_CASES = 5
+
+
+def estimate_content_tokens(content: Any) -> int:
+    """估算一段消息内容的 token 数"""
+    if isinstance(content, str):
+        return estimate_tokens(content)
+    if isinstance(content, BinaryContent):
+        return IMAGE_TOKENS if content.is_image else estimate_tokens(str(len(content.data)))
+    if isinstance(content, (list, tuple)):
+        return sum(estimate_content_tokens(c) for c in content)
+    if isinstance(content, dict):
+        return estimate_tokens(str(content))
+    return estimate_tokens(str(content)) if content is not None else 0
+
+
+def estimate_part_tokens(part: Any) -> int:
+    """估算单个消息 part 的 token 数"""
+    if hasattr(part, "content"):
+        return estimate_content_tokens(part.content)
+    if hasattr(part, "args"):  # ToolCallPart
+        return estimate_content_tokens(part.args) + estimate_tokens(part.tool_name)
+    return 0
+
+
+def estimate_messages_tokens(messages: Sequence[ModelMessage]) -> int:
+    """
+    估算整段消息历史的 token 数
+
+    Args:
+        messages: 消息列表（含系统提示词）
+
+    Returns:
+        估算的 token 数
+    """
+    total = 0
+    for message in messages:
+        total += MESSAGE_OVERHEAD
+        if isinstance(message, ModelRequest) and message.instructions:
+            total += estimate_tokens(message.instructions)
+        total += sum(estimate_part_tokens(part) for part in message.parts)
+    return total
+
+
+def _truncate_text(text: str, tokens: int) -> str:
+    """截断长文本，保留开头并注明原长度"""
+    return f"{text[:TRUNCATE_KEEP_CHARS]}\n…[已截断，原约 {tokens} token]"
+
+
+# ==================== 研究数据裁剪 ====================
+
+
+def rank_entities(research: ResearchResult) -> List[int]:
+    """
+    按重要性给实体排序（返回下标，越靠前越重要）
+
+    被案例引用的次数优先，其次是别名数量（多处来源）和描述完整度
+    """
+    case_text = " ".join(str(v) for case in research.cases for v in case.model_dump().values())
+
+    def score(index: int) -> Tuple[int, int, int, int]:
+        entity = research.entities[index]
+        mentions = case_text.count(entity.name) if entity.name else 0
+        aliases = len(entity.aliases or [])
+        return (mentions, aliases, len(entity.issue or ""), -index)
+
+    return sorted(range(len(research.entities)), key=score, reverse=True)
+
+
+def rank_cases(research: ResearchResult, entity_names: Sequence[str]) -> List[int]:
+    """按重要性给案例排序：涉及保留实体的案例优先，其次是信息量"""
+    def score(index: int) -> Tuple[int, int, int]:
+        text = " ".join(str(v) for v in research.cases[index].model_dump().values())
+        linked = sum(1 for name in entity_names if name and name in text)
+        return (linked, len(text), -index)
+
+    return sorted(range(len(research.cases)), key=score, reverse=True)
+
+
+def fit_research(research: ResearchResult, max_tokens: int) -> Tuple[ResearchResult, int]:
+    """
+    把研究数据裁剪到预算内（按重要性保留实体和案例，保持原有顺序）
+
+    Args:
+        research: 研究结果
+        max_tokens: 研究数据部分的 token 预算
+
+    Returns:
+        (裁剪后的研究结果, 裁剪前的估算 token 数)
+    """
+    original = estimate_tokens(format_research(research))
+    if original <= max_tokens:
+        return research, original
+
+    entity_order = rank_entities(research)
+    keep_entities = len(entity_order)
+    keep_cases = len(research.cases)
+
+    def build(n_entities: int, n_cases: int) -> ResearchResult:
+        kept = sorted(entity_order[:n_entities])
+        names = [research.entities[i].name or "" for i in kept]
+        case_kept = sorted(rank_cases(research, names)[:n_cases])
+        return research.model_copy(update={
+            "entities": [research.entities[i] for i in kept],
+            "cases": [research.cases[i] for i in case_kept],
+        })
+
+    trimmed = research
+    # 交替裁掉实体和案例中排名最低的一条，直到满足预算或达到最少保留数
+    while estimate_tokens(format_research(trimmed)) > max_tokens:
+        can_drop_entity = keep_entities > MIN_KEEP_ENTITIES
+        can_drop_case = keep_cases > MIN_KEEP_CASES
+        if not (can_drop_entity or can_drop_case):
+            break
+        if can_drop_entity and (not can_drop_case or keep_entities * 2 >= keep_cases * 3):
+            keep_entities -= 1
+        else:
+            keep_cases -= 1
+        trimmed = build(keep_entities, keep_cases)
+
+    # 仍超预算时截断摘要
+    if estimate_tokens(format_research(trimmed)) > max_tokens:
+        trimmed = trimmed.model_copy(update={"summary": trimmed.summary[:TRUNCATE_KEEP_CHARS]})
+    return trimmed, original
+
+
+# ==================== 预算检查 ====================
+
+
+@dataclass
+class BudgetStats:
+    """单个角色的预算检查统计"""
+
+    checks: int = 0
+    over_budget: int = 0
+    trimmed_tokens: int = 0
+    max_tokens: int = 0
+
+
+class TokenBudget:
+    """按角色的 token 预算"""
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None):
+        """
+        初始化预算
+
+        Args:
+            budgets: 覆盖默认的角色预算
+        """
+        self.budgets = {**DEFAULT_BUDGETS, **(budgets or {})}
+        self.stats: Dict[str, BudgetStats] = {}
+
+    def limit(self, role: str) -> int:
+        """角色的输入 token 预算"""
+        return self.budgets.get(role, DEFAULT_BUDGET)
+
+    def _record(self, role: str, tokens: int, trimmed: int = 0) -> None:
+        """记录一次检查"""
+        stats = self.stats.setdefault(role, BudgetStats())
+        stats.checks += 1
+        stats.max_tokens = max(stats.max_tokens, tokens)
+        if trimmed:
+            stats.over_budget += 1
+            stats.trimmed_tokens += trimmed
+
+    def fit_research(self, role: str, research: ResearchResult, reserved: int = 0) -> ResearchResult:
+        """
+        按角色预算裁剪提示词中的研究数据
+
+        Args:
+            role: 角色名
+            research: 研究结果
+            reserved: 提示词其余部分（系统提示词、模板、历史）占用的 token
+
+        Returns:
+            预算内的研究结果（未超预算时原样返回）
+        """
+        budget = max(self.limit(role) - reserved, 0)
+        trimmed, original = fit_research(research, budget)
+        if trimmed is research:
+            return research
+
+        after = estimate_tokens(format_research(trimmed))
+        self._record(f"{role}.research", original, original - after)
+        logfire.info(
+            "token budget: research trimmed for {role}",
+            role=role, budget=budget, before=original, after=after,
+            entities=len(trimmed.entities), cases=len(trimmed.cases)
+        )
+        note(
+            f"   ✂️  研究数据超出 {role} 预算（约 {original} > {budget} token），"
+            f"保留实体 {len(trimmed.entities)}/{len(research.entities)}、案例 {len(trimmed.cases)}/{len(research.cases)}"
+        )
+        return trimmed
+
+    def trim_messages(self, role: str, messages: List[ModelMessage]) -> List[ModelMessage]:
+        """
+        检查整段消息，超预算时从最早的工具返回 / 长文本开始截断
+
+        最后一条请求（本轮输入）最后才截断；工具调用与返回的配对保持不变
+
+        Args:
+            role: 角色名
+            messages: 即将发送的消息
+
+        Returns:
+            预算内的消息列表
+        """
+        budget = self.limit(role)
+        total = estimate_messages_tokens(messages)
+        if total <= budget:
+            self._record(role, total)
+            return messages
+
+        # 候选截断位置：(消息下标, part 下标, token 数)，旧消息在前，本轮输入在最后
+        candidates = []
+        for m_index, message in enumerate(messages):
+            for p_index, part in enumerate(message.parts):
+                if isinstance(part, (ToolReturnPart, UserPromptPart, TextPart)) and isinstance(part.content, str):
+                    tokens = estimate_tokens(part.content)
+                    if tokens > estimate_tokens(part.content[:TRUNCATE_KEEP_CHARS]) * 2:
+                        candidates.append((m_index, p_index, tokens))
+                elif isinstance(part, ToolReturnPart):
+                    tokens = estimate_content_tokens(part.content)
+                    if tokens > IMAGE_TOKENS:
+                        candidates.append((m_index, p_index, tokens))
+        last = len(messages) - 1
+        candidates.sort(key=lambda c: (c[0] == last, c[0]))
+
+        messages = list(messages)
+        excess = total - budget
+        trimmed = 0
+        for m_index, p_index, tokens in candidates:
+            if trimmed >= excess:
+                break
+            message = messages[m_index]
+            part = message.parts[p_index]
+            text = part.content if isinstance(part.content, str) else str(part.content)
+            new_part = dataclasses.replace(part, content=_truncate_text(text, tokens))
+            parts = list(message.parts)
+            parts[p_index] = new_part
+            messages[m_index] = dataclasses.replace(message, parts=parts)
+            trimmed += tokens - estimate_part_tokens(new_part)
+
+        self._record(role, total, trimmed)
+        logfire.info(
+            "token budget: messages trimmed for {role}",
+            role=role, budget=budget, before=total, after=total - trimmed
+        )
+        note(f"   ✂️  {role} 提示词约 {total} token 超出预算 {budget}，已截断约 {trimmed} token")
+        return messages
+
+    def history_processor(self, role: str) -> Callable[[List[ModelMessage]], Any]:
+        """
+        构建 Agent 的 history processor（每次模型请求前执行预算检查）
+
+        Args:
+            role: 角色名
+
+        Returns:
+            异步 history processor
+        """
+        async def processor(messages: List[ModelMessage]) -> List[ModelMessage]:
+            return self.trim_messages(role, messages)
+
+        return processor
+
+    def report(self) -> Dict[str, Any]:
+        """按角色汇总的预算检查统计"""
+        return {
+            role: {"budget": self.limit(role.removesuffix(".research")), **stats.__dict__}
+            for role, stats in sorted(self.stats.items())
+        }
+
+    def print_report(self) -> None:
+        """打印预算检查统计"""
+        if not self.stats:
+            return
+        print("\n📏 Token 预算检查:")
+        for role, stats in sorted(self.stats.items()):
+            print(
+                f"   - {role}: 检查 {stats.checks} 次，超预算 {stats.over_budget} 次，"
+                f"截断约 {stats.trimmed_tokens} token，最大约 {stats.max_tokens} token"
+            )
+
+
+# 全局共享的预算（各 Agent 共用，统计汇总到一处）
+_shared_budget: Optional[TokenBudget] = None
+
+
+def get_token_budget() -> TokenBudget:
+    """获取共享预算（未配置时使用默认预算）"""
+    global _shared_budget
+    if _shared_budget is None:
+        _shared_budget = TokenBudget()
+    return _shared_budget
+
+
+def set_token_budget(budget: TokenBudget) -> TokenBudget:
+    """替换共享预算（CLI 根据参数配置）"""
+    global _shared_budget
+    _shared_budget = budget
+    return budget
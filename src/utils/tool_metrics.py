@@ -0,0 +1,298 @@
+"""
+工具调用指标
+包装 Agent 的工具集（Playwright MCP、浏览器宏等函数工具），按工具名记录每次调用的
+耗时、结果大小、估算 token 数和错误次数，回答"browser_snapshot 的 p95 耗时和返回大小"这类问题
+
+- 直方图：HDR 风格的对数-线性分桶（每个 2 的幂区间再等分 SUB_BUCKETS 份），
+  内存固定、相对误差约 1/SUB_BUCKETS，可直接合并和求分位数
+- 每次调用同时发布 ToolCalled 进度事件（events.jsonl）
+- 导出：每次运行写入 metrics.json，同时通过 logfire 记录 OpenTelemetry 指标
+  （xhs.tool.duration / xhs.tool.result_size / xhs.tool.result_tokens 直方图和 xhs.tool.errors 计数）
+"""
+import json
+import math
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import logfire
+from pydantic_ai import RunContext
+from pydantic_ai.messages import BinaryContent
+from pydantic_ai.toolsets import AbstractToolset, ToolsetTool, WrapperToolset
+
+from .progress import ToolCalled, emit
+from .token_budget import estimate_content_tokens
+
+# 每个 2 的幂区间的子桶数（相对误差约 3%）
+SUB_BUCKETS = 32
+
+# 报告中的分位数
+PERCENTILES = (50, 90, 95, 99)
+
+# 打印时展示的工具数
+REPORT_TOP = 10
+
+
+class Histogram:
+    """HDR 风格的对数-线性直方图"""
+
+    def __init__(self, sub_buckets: int = SUB_BUCKETS):
+        """
+        初始化
+
+        Args:
+            sub_buckets: 每个 2 的幂区间的子桶数
+        """
+        self.sub_buckets = sub_buckets
+        self.counts: Dict[int, int] = defaultdict(int)
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def _index(self, value: float) -> int:
+        """值所在的桶"""
+        exponent = math.floor(math.log2(value))
+        fraction = value / 2 ** exponent - 1  # [0, 1)
+        return exponent * self.sub_buckets + min(int(fraction * self.sub_buckets), self.sub_buckets - 1)
+
+    def _upper(self, index: int) -> float:
+        """桶的上界"""
+        exponent, sub = divmod(index, self.sub_buckets)
+        return 2 ** exponent * (1 + (sub + 1) / self.sub_buckets)
+
+    def record(self, value: float) -> None:
+        """记录一个非负值"""
+        value = max(float(value), 0.0)
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value == 0:
+            self.zeros += 1
+        else:
+            self.counts[self._index(value)] += 1
+
+    def merge(self, other: "Histogram") -> None:
+        """合并另一个直方图（子桶数需一致）"""
+        if other.sub_buckets != self.sub_buckets:
+            raise ValueError("子桶数不同的直方图不能合并")
+        for index, count in other.counts.items():
+            self.counts[index] += count
+        self.zeros += other.zeros
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p: float) -> float:
+        """
+        分位数（返回所在桶的上界，不超过最大值）
+
+        Args:
+            p: 百分位（0-100）
+
+        Returns:
+            分位值，无数据时为 0
+        """
+        if not self.count:
+            return 0.0
+        rank = max(math.ceil(p / 100 * self.count), 1)
+        seen = self.zeros
+        if seen >= rank:
+            return 0.0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._upper(index), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        """统计值和分位数"""
+        if not self.count:
+            return {"count": 0}
+        summary = {
+            "count": self.count,
+            "min": round(self.min, 2),
+            "mean": round(self.total / self.count, 2),
+            "max": round(self.max, 2),
+            "sum": round(self.total, 2),
+        }
+        summary.update({f"p{p}": round(self.percentile(p), 2) for p in PERCENTILES})
+        return summary
+
+
+def payload_size(result: Any) -> int:
+    """工具结果的大小（字节；文本按 UTF-8，二进制按原始大小，其余按 JSON）"""
+    if isinstance(result, str):
+        return len(result.encode("utf-8"))
+    if isinstance(result, BinaryContent):
+        return len(result.data)
+    if isinstance(result, (list, tuple)):
+        return sum(payload_size(item) for item in result)
+    if result is None:
+        return 0
+    return len(json.dumps(result, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+@dataclass
+class ToolStats:
+    """单个工具的调用指标"""
+
+    toolset: str
+    calls: int = 0
+    errors: int = 0
+    latency_ms: Histogram = field(default_factory=Histogram)
+    result_bytes: Histogram = field(default_factory=Histogram)
+    result_tokens: Histogram = field(default_factory=Histogram)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化字典"""
+        return {
+            "toolset": self.toolset,
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.calls, 3) if self.calls else 0.0,
+            "latency_ms": self.latency_ms.to_dict(),
+            "result_bytes": self.result_bytes.to_dict(),
+            "result_tokens": self.result_tokens.to_dict(),
+        }
+
+
+class ToolMetrics:
+    """按工具名汇总的调用指标"""
+
+    def __init__(self):
+        """初始化指标和 OpenTelemetry 仪表"""
+        self.tools: Dict[str, ToolStats] = {}
+        self._duration = logfire.metric_histogram(
+            "xhs.tool.duration", unit="ms", description="Agent 工具调用耗时"
+        )
+        self._size = logfire.metric_histogram(
+            "xhs.tool.result_size", unit="By", description="Agent 工具调用结果大小"
+        )
+        self._tokens = logfire.metric_histogram(
+            "xhs.tool.result_tokens", unit="{token}", description="Agent 工具调用结果的估算 token 数"
+        )
+        self._errors = logfire.metric_counter(
+            "xhs.tool.errors", unit="{call}", description="Agent 工具调用错误次数"
+        )
+
+    def record(self, tool: str, toolset: str, latency: float, result: Any = None, error: bool = False) -> None:
+        """
+        记录一次工具调用
+
+        Args:
+            tool: 工具名（含前缀，与模型看到的名称一致）
+            toolset: 工具集标签（playwright / macros 等）
+            latency: 耗时（秒）
+            result: 工具结果（出错时为 None）
+            error: 是否出错（包括 ModelRetry）
+        """
+        stats = self.tools.setdefault(tool, ToolStats(toolset=toolset))
+        attributes = {"tool": tool, "toolset": toolset}
+        stats.calls += 1
+        stats.latency_ms.record(latency * 1000)
+        self._duration.record(latency * 1000, attributes)
+        if error:
+            stats.errors += 1
+            self._errors.add(1, attributes)
+            return
+
+        size = payload_size(result)
+        tokens = estimate_content_tokens(result)
+        stats.result_bytes.record(size)
+        stats.result_tokens.record(tokens)
+        self._size.record(size, attributes)
+        self._tokens.record(tokens, attributes)
+
+    def _ranked(self) -> List[tuple]:
+        """按总耗时降序的工具"""
+        return sorted(self.tools.items(), key=lambda item: item[1].latency_ms.total, reverse=True)
+
+    def report(self) -> Dict[str, Any]:
+        """按总耗时降序的各工具指标，以及各工具占总工具耗时的比例"""
+        total = sum(stats.latency_ms.total for stats in self.tools.values())
+        return {
+            "total_calls": sum(stats.calls for stats in self.tools.values()),
+            "total_latency_ms": round(total, 2),
+            "tools": {
+                tool: {**stats.to_dict(), "time_share": round(stats.latency_ms.total / total, 3) if total else 0.0}
+                for tool, stats in self._ranked()
+            },
+        }
+
+    def print_report(self, top: int = REPORT_TOP) -> None:
+        """打印耗时最多的工具"""
+        if not self.tools:
+            return
+        total = sum(stats.latency_ms.total for stats in self.tools.values())
+        print("\n🔧 工具调用（按总耗时）:")
+        for tool, stats in self._ranked()[:top]:
+            latency, size = stats.latency_ms, stats.result_bytes
+            share = latency.total / total if total else 0.0
+            print(
+                f"   - {tool}: {stats.calls} 次（错误 {stats.errors}），占 {share:.0%}，"
+                f"p50 {latency.percentile(50):.0f}ms / p95 {latency.percentile(95):.0f}ms，"
+                f"返回 p95 {size.percentile(95) / 1024:.1f}KB"
+            )
+
+
+@dataclass
+class InstrumentedToolset(WrapperToolset):
+    """记录每次工具调用指标的工具集包装"""
+
+    source: str = "tools"
+
+    async def call_tool(
+        self, name: str, tool_args: Dict[str, Any], ctx: RunContext[Any], tool: ToolsetTool[Any]
+    ) -> Any:
+        """调用被包装的工具集并记录耗时、结果大小和错误"""
+        metrics = get_tool_metrics()
+        start = time.perf_counter()
+        try:
+            result = await super().call_tool(name, tool_args, ctx, tool)
+        except Exception:
+            latency = time.perf_counter() - start
+            metrics.record(name, self.source, latency, error=True)
+            emit(ToolCalled(tool=name, toolset=self.source, latency=latency, error=True))
+            raise
+        latency = time.perf_counter() - start
+        metrics.record(name, self.source, latency, result)
+        emit(ToolCalled(tool=name, toolset=self.source, latency=latency))
+        return result
+
+
+def instrument_toolset(toolset: AbstractToolset[Any], source: str) -> InstrumentedToolset:
+    """
+    包装工具集以记录调用指标
+
+    Args:
+        toolset: MCP Server 或函数工具集
+        source: 工具集标签（出现在指标属性中）
+
+    Returns:
+        包装后的工具集（进入 / 退出等行为与原工具集一致）
+    """
+    return InstrumentedToolset(toolset, source=source)
+
+
+# 全局共享的指标（各 Agent 共用，每次运行由 CLI 重置）
+_shared_metrics: Optional[ToolMetrics] = None
+
+
+def get_tool_metrics() -> ToolMetrics:
+    """获取共享指标（未配置时创建）"""
+    global _shared_metrics
+    if _shared_metrics is None:
+        _shared_metrics = ToolMetrics()
+    return _shared_metrics
+
+
+def set_tool_metrics(metrics: ToolMetrics) -> ToolMetrics:
+    """替换共享指标（每次运行开始时重置）"""
+    global _shared_metrics
+    _shared_metrics = metrics
+    return metrics
@@ -0,0 +1,196 @@
+"""
+相似主题检索
+基于字符 n-gram TF-IDF 向量（NumPy 计算，无需外部 embedding 服务）
+为新主题找出最相似的历史运行，用于"补缺"模式热启动研究
+"""
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..models.schemas import ResearchResult
+from .entity_dedup import dedupe_research
+from .file_ops import load_json
+from .incremental import WATERMARK_FILE, merge_research
+from .research_table import ResearchTable
+
+# n-gram 长度范围（中文主题通常很短，1-3 字足够区分）
+NGRAM_RANGE = (1, 3)
+
+# 主题与受众的相似度权重
+TOPIC_WEIGHT = 0.8
+AUDIENCE_WEIGHT = 0.2
+
+# 低于此相似度的历史运行不用于热启动
+MIN_SCORE = 0.3
+
+
+@dataclass
+class RunInfo:
+    """一次历史运行的主题信息"""
+
+    run_dir: Path
+    topic: str
+    target_audience: str = ""
+
+
+@dataclass
+class SimilarRun:
+    """相似主题检索结果"""
+
+    run: RunInfo
+    score: float
+
+
+def _char_ngrams(text: str, ngram_range: Sequence[int] = NGRAM_RANGE) -> List[str]:
+    """字符 n-gram（去除空白）"""
+    text = "".join(text.lower().split())
+    low, high = ngram_range
+    return [
+        text[i:i + n]
+        for n in range(low, high + 1)
+        for i in range(len(text) - n + 1)
+    ]
+
+
+def load_runs(posts_dir: Path = Path("posts")) -> List[RunInfo]:
+    """
+    列出所有包含 research.json 的历史运行
+
+    主题和受众优先从 watermark.json 读取，旧目录从目录名推导
+
+    Args:
+        posts_dir: 输出根目录
+
+    Returns:
+        历史运行列表
+    """
+    runs = []
+    if not posts_dir.exists():
+        return runs
+
+    for run_dir in sorted(posts_dir.iterdir()):
+        if not (run_dir.is_dir() and (run_dir / "research.json").exists()):
+            continue
+        watermark = run_dir / WATERMARK_FILE
+        if watermark.exists():
+            data = load_json(watermark)
+            runs.append(RunInfo(run_dir, data.get("topic", ""), data.get("target_audience", "")))
+        else:
+            parts = run_dir.name.split("-", 2)
+            runs.append(RunInfo(run_dir, parts[2] if len(parts) == 3 else run_dir.name))
+    return runs
+
+
+class TopicIndex:
+    """历史主题的 TF-IDF 相似度索引"""
+
+    def __init__(self, runs: List[RunInfo]):
+        """
+        构建索引
+
+        Args:
+            runs: 历史运行列表
+        """
+        self.runs = runs
+
+        documents = [_char_ngrams(r.topic) for r in runs] + [_char_ngrams(r.target_audience) for r in runs]
+        self.vocab: Dict[str, int] = {}
+        for grams in documents:
+            for g in grams:
+                self.vocab.setdefault(g, len(self.vocab))
+
+        # 平滑 IDF：log((1 + N) / (1 + df)) + 1
+        df = np.zeros(len(self.vocab), dtype=np.float32)
+        for grams in documents:
+            for g in set(grams):
+                df[self.vocab[g]] += 1
+        n_docs = max(len(documents), 1)
+        self.idf = np.log((1 + n_docs) / (1 + df)) + 1
+
+        self.topic_matrix = self._vectorize([r.topic for r in runs])
+        self.audience_matrix = self._vectorize([r.target_audience for r in runs])
+
+    @classmethod
+    def from_posts(cls, posts_dir: Path = Path("posts")) -> "TopicIndex":
+        """从输出目录构建索引"""
+        return cls(load_runs(posts_dir))
+
+    def _vectorize(self, texts: List[str]) -> np.ndarray:
+        """文本 → L2 归一化的 TF-IDF 矩阵（未登录 n-gram 忽略）"""
+        matrix = np.zeros((len(texts), len(self.vocab)), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for g in _char_ngrams(text):
+                col = self.vocab.get(g)
+                if col is not None:
+                    matrix[row, col] += 1.0
+        matrix *= self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def query(
+        self,
+        topic: str,
+        target_audience: str = "",
+        k: int = 3,
+        min_score: float = MIN_SCORE,
+        exclude: Optional[Path] = None
+    ) -> List[SimilarRun]:
+        """
+        检索最相似的 top-k 历史运行
+
+        Args:
+            topic: 新主题
+            target_audience: 目标受众
+            k: 返回数量
+            min_score: 最低相似度
+            exclude: 排除的运行目录（如当前输出目录）
+
+        Returns:
+            相似运行列表（相似度从高到低）
+        """
+        if not self.runs or not self.vocab:
+            return []
+
+        topic_scores = self.topic_matrix @ self._vectorize([topic])[0]
+        if target_audience:
+            audience_scores = self.audience_matrix @ self._vectorize([target_audience])[0]
+            scores = TOPIC_WEIGHT * topic_scores + AUDIENCE_WEIGHT * audience_scores
+        else:
+            scores = topic_scores
+
+        # 相似度相同时优先较新的运行
+        order = np.lexsort((-np.arange(len(scores)), -scores))
+
+        results = []
+        for i in order:
+            score = float(scores[i])
+            if score < min_score or len(results) >= k:
+                break
+            if exclude is not None and self.runs[i].run_dir == exclude:
+                continue
+            results.append(SimilarRun(run=self.runs[i], score=score))
+        return results
+
+
+def warm_start_research(similar: List[SimilarRun]) -> Optional[ResearchResult]:
+    """
+    合并相似运行的研究结果，作为"补缺"模式的起点
+
+    Args:
+        similar: 相似运行列表
+
+    Returns:
+        合并去重后的研究结果，没有相似运行时返回 None
+    """
+    merged = None
+    for _, research in ResearchTable.from_files(item.run.run_dir / "research.json" for item in similar):
+        merged = research if merged is None else merge_research(merged, research)
+
+    if merged is None:
+        return None
+
+    merged, _ = dedupe_research(merged)
+    return merged